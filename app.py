@@ -349,7 +349,10 @@ import numpy as np
 import sys
 import os
 import threading
+import time
 import traceback
+import uuid
+import weakref
 
 # Add project root to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -367,16 +370,26 @@ except ImportError as e:
 try:
     from core.hand_detector import HandDetector
     from core.drawing_tools import DrawingTools
+    from core.frame_pipeline import FramePipeline
+    from core.detector_pool import DetectorPool, PooledBackend
+    from core.detection_service import DetectionService, ServiceBackend
+    from core.quality_controller import QualityController
+    from core.autosave import CanvasAutosave
+    from core.canvas_hub import CanvasHub, CanvasSync
     from utils.ui_helpers import UIHelpers
+    from utils.profiler import StageProfiler
+    from utils.frame_buffers import FrameBuffers
+    from config.resolution import ResolutionConfig
+    from config.settings import PROFILING, DETECTION_SERVICE, ADAPTIVE_QUALITY, AUTOSAVE, COLLABORATION
+    from config.settings import BRUSH_WIDTHS, MAX_LAYERS
     MODULES_AVAILABLE = True
 except ImportError as e:
     st.error(f"Failed to import modules: {e}")
     st.error("Please check your project structure and dependencies.")
     MODULES_AVAILABLE = False
 
-# Configuration
-WINDOW_WIDTH = 640
-WINDOW_HEIGHT = 480
+# Capture, canvas, detection and display resolutions from config/settings.py
+RESOLUTION = ResolutionConfig() if MODULES_AVAILABLE else None
 
 # WebRTC configuration for deployment
 RTC_CONFIGURATION = RTCConfiguration(
@@ -391,14 +404,58 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+@st.cache_resource
+def get_detector_pool():
+    """One detector pool for the whole server, shared by every session"""
+    return DetectorPool()
+
+@st.cache_resource
+def get_detection_service():
+    """Worker processes for detection, started once for the whole server"""
+    service = DetectionService(frame_size=RESOLUTION.detection_size)
+    service.start()
+    return service
+
+@st.cache_resource
+def get_canvas_hub():
+    """The shared board every session draws on when collaboration is enabled"""
+    return CanvasHub(*RESOLUTION.canvas_size)
+
+def create_session_backend():
+    """Detector backend of one session, borrowing models shared by the server"""
+    if DETECTION_SERVICE:
+        return ServiceBackend(get_detection_service())
+    return PooledBackend(get_detector_pool())
+
+def get_canvas_id():
+    """
+    Canvas id kept in the page URL, so a reload or reconnect finds the same drawing
+    Returns: hex id of this browser tab's canvas
+    """
+    canvas_id = st.query_params.get("canvas")
+    if not canvas_id or not all(c in "0123456789abcdef" for c in canvas_id):
+        canvas_id = uuid.uuid4().hex
+        st.query_params["canvas"] = canvas_id
+    return canvas_id
+
+def close_session(drawing_tools):
+    """Stop a session's board sharing and autosave, publishing and saving its last strokes"""
+    if drawing_tools.collab is not None:
+        drawing_tools.collab.close()
+    if drawing_tools.autosave is not None:
+        drawing_tools.autosave.close(drawing_tools)
+
 class VirtualDrawingTransformer(VideoTransformerBase):
-    def __init__(self):
+    def __init__(self, backend=None, canvas_id=None, hub=None):
         if not MODULES_AVAILABLE:
             raise ImportError("Required modules not available")
             
         try:
-            self.hand_detector = HandDetector()
-            self.drawing_tools = DrawingTools()
+            # Canvas and tool state are per session; the model is shared by the server
+            self.resolution = RESOLUTION
+            self.hand_detector = HandDetector(backend, adaptive_quality=ADAPTIVE_QUALITY,
+                                              detection_size=self.resolution.detection)
+            self.drawing_tools = DrawingTools(*self.resolution.canvas_size)
             self.ui_helpers = UIHelpers()
             self.tools_image = None
             
@@ -410,89 +467,141 @@ class VirtualDrawingTransformer(VideoTransformerBase):
             
             # State management
             self.frame_lock = threading.Lock()
-            self.current_tool_display = "select tool"
+            
+            # Per-stage timings, toggled from the sidebar
+            self.profiler = StageProfiler(enabled=PROFILING)
+            self.pipeline = FramePipeline(self.hand_detector, self.drawing_tools, self.ui_helpers,
+                                          profiler=self.profiler, resolution=self.resolution)
+            self.pipeline.tools_image = self.tools_image
+            
+            # Preallocated frame buffers reused by every frame of this session
+            self.frame_buffers = FrameBuffers(*self.resolution.canvas_size,
+                                              display_size=self.resolution.display_size)
+            
+            # Lowers detection quality when frames take longer than the budget
+            self.quality = QualityController(self.pipeline) if ADAPTIVE_QUALITY else None
+            
+            # Memory-mapped canvas file, restored when the same canvas id comes back,
+            # and the shared board: closed strokes go out, other sessions' changes come in
+            self.canvas_id = canvas_id
+            self.autosave = None
+            self.hub = hub
+            self.collab = None
+            self.open_session()
+            
+            # Closed when the stream ends, or at the latest when the session is dropped
+            weakref.finalize(self, close_session, self.drawing_tools)
             
         except Exception as e:
             st.error(f"Failed to initialize transformer: {e}")
             raise e
         
     def transform(self, frame):
+        profiler = self.profiler
+        start = time.perf_counter()
         try:
             img = frame.to_ndarray(format="bgr24")
             
-            # Resize to standard dimensions
-            img = cv2.resize(img, (WINDOW_WIDTH, WINDOW_HEIGHT))
+            # Fit to the canvas resolution and mirror into the session's reused buffer
+            with profiler.stage("flip"):
+                img = self.frame_buffers.prepare(img)
             
-            # Flip frame horizontally for mirror effect
-            img = cv2.flip(img, 1)
+            # Detect hands outside the lock; it only guards the drawing state
+            with profiler.stage("detect"):
+                results = self.hand_detector.detect_hands(img)
             
             with self.frame_lock:
-                # Detect hands
-                results = self.hand_detector.detect_hands(img)
-                
-                if results.multi_hand_landmarks:
-                    for hand_landmarks in results.multi_hand_landmarks:
-                        # Draw hand landmarks
-                        self.hand_detector.draw_landmarks(img, hand_landmarks)
-                        
-                        # Get finger positions
-                        finger_positions = self.hand_detector.get_finger_positions(hand_landmarks)
-                        x, y = finger_positions['index_tip']
-                        
-                        # Handle tool selection
-                        selected_tool, selection_indicator = self.ui_helpers.handle_tool_selection(
-                            x, y, self.drawing_tools.get_tool_from_position
-                        )
-                        
-                        if selected_tool:
-                            self.drawing_tools.set_current_tool(selected_tool)
-                            self.current_tool_display = selected_tool
-                        
-                        # Check if user is drawing (index finger raised)
-                        is_drawing = self.hand_detector.is_index_raised(
-                            finger_positions['middle_tip'][1],
-                            finger_positions['middle_pip']
-                        )
-                        
-                        # Process drawing
-                        self.drawing_tools.process_drawing(img, finger_positions, is_drawing)
-                        
-                        # Draw selection indicator if active
-                        if selection_indicator:
-                            x_sel, y_sel, radius = selection_indicator
-                            cv2.circle(img, (x_sel, y_sel), radius, (0, 255, 255), 2)
-                
-                # Apply drawing mask to frame
-                img = self.drawing_tools.apply_mask_to_frame(img)
-                
-                # Draw UI elements
-                self.ui_helpers.draw_ui_elements(
-                    img, self.tools_image, self.drawing_tools.current_tool
-                )
+                # Landmarks, drawing, in-place compositing and UI on the session buffer
+                img = self.pipeline.render(img, results)
                 
                 # Add simple tool indicator if tools_image not available
                 if self.tools_image is None:
                     cv2.putText(img, f"Tool: {self.drawing_tools.current_tool}", 
                                (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
             
+            # Scale to the display resolution when it differs from the canvas
+            img = self.frame_buffers.present(img)
+            
+            # End-to-end latency of this frame drives the next frame's quality
+            if self.quality is not None:
+                self.quality.update((time.perf_counter() - start) * 1000.0)
+            
             return img
             
         except Exception as e:
             # Return error frame
-            error_img = np.zeros((WINDOW_HEIGHT, WINDOW_WIDTH, 3), dtype=np.uint8)
+            width, height = self.resolution.display_size
+            error_img = np.zeros((height, width, 3), dtype=np.uint8)
             cv2.putText(error_img, f"Error: {str(e)}", (10, 50), 
                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1)
             return error_img
     
+    def open_session(self):
+        """
+        Start autosave and join the shared board unless they are running, e.g.
+        when a stopped stream restarts
+        Returns: self, so it can serve as the video processor factory
+        """
+        with self.frame_lock:
+            if self.canvas_id is not None and self.autosave is None:
+                self.autosave = CanvasAutosave(self.canvas_id)
+                self.autosave.attach(self.drawing_tools)
+            if self.hub is not None and self.collab is None:
+                self.collab = CanvasSync(self.hub)
+                self.collab.attach(self.drawing_tools)
+        return self
+    
+    def on_ended(self):
+        """The video stream ended: save, stop autosaving and leave the shared board until it starts again"""
+        with self.frame_lock:
+            close_session(self.drawing_tools)
+            self.autosave = self.collab = None
+    
     def clear_canvas(self):
         """Clear the drawing canvas"""
         try:
             with self.frame_lock:
-                self.drawing_tools.mask = np.ones((WINDOW_HEIGHT, WINDOW_WIDTH)) * 255
-                self.drawing_tools.mask = self.drawing_tools.mask.astype('uint8')
-                self.drawing_tools.var_inits = False
+                self.drawing_tools.clear()
         except Exception as e:
             st.error(f"Failed to clear canvas: {e}")
+    
+    def set_tool(self, tool):
+        """Switch to a tool chosen in the sidebar"""
+        with self.frame_lock:
+            self.drawing_tools.set_current_tool(tool)
+    
+    def undo(self):
+        """Undo the last drawing operation"""
+        with self.frame_lock:
+            return self.drawing_tools.undo()
+    
+    def redo(self):
+        """Redo the last undone drawing operation"""
+        with self.frame_lock:
+            return self.drawing_tools.redo()
+    
+    def set_brush(self, color, thickness):
+        """Set the color and width every hand draws with, if they changed"""
+        with self.frame_lock:
+            drawing_tools = self.drawing_tools
+            for hand_id, hand in list(drawing_tools.hands.items()):
+                drawing_tools.select_hand(hand_id)
+                if hand.color != color:
+                    drawing_tools.set_color(color)
+                if hand.thickness != thickness:
+                    drawing_tools.set_thickness(thickness)
+    
+    def update_layer(self, index, visible, opacity):
+        """Select a color layer and apply its visibility and opacity, if they changed"""
+        with self.frame_lock:
+            drawing_tools = self.drawing_tools
+            if index != drawing_tools.layers.active:
+                drawing_tools.select_layer(index)
+            layer = drawing_tools.layers.layers[index]
+            if layer.visible != visible:
+                drawing_tools.set_layer_visible(index, visible)
+            if layer.opacity != opacity:
+                drawing_tools.set_layer_opacity(index, opacity)
 
 def initialize_session_state():
     """Initialize session state variables"""
@@ -510,7 +619,9 @@ def get_transformer():
     if not st.session_state.transformer_initialized:
         try:
             if MODULES_AVAILABLE:
-                st.session_state.transformer = VirtualDrawingTransformer()
+                canvas_id = get_canvas_id() if AUTOSAVE else None
+                hub = get_canvas_hub() if COLLABORATION else None
+                st.session_state.transformer = VirtualDrawingTransformer(create_session_backend(), canvas_id, hub)
                 st.session_state.transformer_initialized = True
             else:
                 st.error("Cannot initialize transformer - modules not available")
@@ -608,12 +719,12 @@ def main():
         
         # Tool selection
         st.subheader("Select Tool")
-        tool_options = ["select tool", "line", "rectangle", "draw", "circle", "erase"]
+        tool_options = ["select tool", "line", "rectangle", "draw", "circle", "erase", "erase strokes", "move"]
         selected_tool = st.selectbox("Choose your tool:", tool_options, key="tool_selector")
         
-        # Update tool in transformer and session state
-        if selected_tool != "select tool" and transformer:
-            transformer.drawing_tools.set_current_tool(selected_tool)
+        # Switch tools only when the selection changes; switching ends open strokes
+        if selected_tool != "select tool" and selected_tool != st.session_state.current_tool and transformer:
+            transformer.set_tool(selected_tool)
             st.session_state.current_tool = selected_tool
         
         # Clear canvas button
@@ -624,6 +735,54 @@ def main():
             else:
                 st.error("Transformer not available")
         
+        # Undo / redo buttons
+        undo_col, redo_col = st.columns(2)
+        with undo_col:
+            if st.button("↩️ Undo", use_container_width=True) and transformer:
+                transformer.undo()
+        with redo_col:
+            if st.button("↪️ Redo", use_container_width=True) and transformer:
+                transformer.redo()
+        
+        # Brush color and width, and the layer strokes go into
+        layers = transformer.drawing_tools.layers
+        if layers is not None:
+            st.subheader("🎨 Color and Layers")
+            blue, green, red = transformer.drawing_tools.color
+            picked = st.color_picker("Brush color", f"#{red:02x}{green:02x}{blue:02x}")
+            color = (int(picked[5:7], 16), int(picked[3:5], 16), int(picked[1:3], 16))
+            thickness = st.select_slider("Brush width", BRUSH_WIDTHS, value=transformer.drawing_tools.thickness
+                                         if transformer.drawing_tools.thickness in BRUSH_WIDTHS else BRUSH_WIDTHS[0])
+            transformer.set_brush(color, thickness)
+            
+            count = min(len(layers.layers) + 1, MAX_LAYERS)
+            index = st.selectbox("Layer", range(count), index=layers.active,
+                                 format_func=lambda i: f"Layer {i + 1}" if i < len(layers.layers) else "➕ New layer")
+            layer = layers.layers[index] if index < len(layers.layers) else None
+            visible = st.checkbox("Show layer", value=layer.visible if layer else True)
+            opacity = st.slider("Layer opacity", 0.0, 1.0, layer.opacity if layer else 1.0, 0.05)
+            transformer.update_layer(index, visible, opacity)
+        
+        # Per-stage timings of the video pipeline
+        transformer.profiler.enabled = st.checkbox("⏱️ Profile pipeline", value=transformer.profiler.enabled)
+        if transformer.profiler.enabled:
+            stages = transformer.profiler.snapshot()["stages"]
+            if stages:
+                st.table([{"stage": name, "p50 ms": round(s["p50_ms"], 2), "p95 ms": round(s["p95_ms"], 2),
+                           "max ms": round(s["max_ms"], 2)} for name, s in stages.items()])
+        
+        # Adaptive quality level, 0 is full quality
+        if transformer.quality is not None:
+            quality = transformer.quality.metrics()
+            st.metric("🎚️ Quality level", f"{quality['quality_level']} / {quality['max_level']}",
+                      help=f"Frame latency {quality['latency_ms']:.1f} ms, budget {quality['budget_ms']:.0f} ms")
+        
+        # Sessions sharing the board and how far behind the slowest one is
+        if transformer.collab is not None:
+            hub = transformer.collab.hub.metrics()
+            st.metric("👥 Sessions on the board", hub["sessions"],
+                      help=f"Slowest session {hub['max_lag_ops']} operations behind, {hub['resyncs']} resyncs")
+        
         # Instructions
         st.markdown("---")
         st.subheader("📋 Instructions")
@@ -657,9 +816,13 @@ def main():
         try:
             webrtc_ctx = webrtc_streamer(
                 key="virtual-drawing",
-                video_processor_factory=lambda: transformer,
+                video_processor_factory=transformer.open_session,
                 rtc_configuration=RTC_CONFIGURATION,
-                media_stream_constraints={"video": True, "audio": False},
+                media_stream_constraints={
+                    "video": {"width": {"ideal": RESOLUTION.capture[0]},
+                              "height": {"ideal": RESOLUTION.capture[1]}},
+                    "audio": False,
+                },
                 async_processing=True,
             )
             
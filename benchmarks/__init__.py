@@ -0,0 +1,4 @@
+"""
+Benchmarks for the virtual drawing pipeline
+Run from the project root, e.g. python -m benchmarks.bench_backends
+"""
@@ -0,0 +1,78 @@
+"""
+Count frame-sized allocations on the per-frame path
+
+Runs the web transformer's frame path (resize + mirror, detection,
+landmarks, drawing, compositing, UI) on decoded camera frames, once the
+way it used to allocate and once through FrameBuffers, and uses
+tracemalloc to find the transient memory peak of every steady-state
+frame. A frame-sized allocation, however short-lived, raises that peak
+by at least one frame, so a peak below one frame proves there was none.
+Decoding (av's to_ndarray) is outside the measured path.
+
+Usage:
+    python -m benchmarks.bench_allocations [--frames N] [--camera 1280x720]
+"""
+import argparse
+import tracemalloc
+import cv2
+import numpy as np
+from core.detector_backends import ReplayBackend
+from core.hand_detector import HandDetector
+from core.frame_pipeline import FramePipeline
+from utils.frame_buffers import FrameBuffers
+from config.resolution import CANVAS_WIDTH, CANVAS_HEIGHT
+from benchmarks.landmark_data import generate_sequence
+
+WARMUP_FRAMES = 30
+
+def unbuffered_prepare(src):
+    """The previous transform: a new array from resize and another from flip"""
+    return cv2.flip(cv2.resize(src, (CANVAS_WIDTH, CANVAS_HEIGHT)), 1)
+
+def measure(prepare, decoded, frames):
+    """
+    Run the frame path and record each frame's transient allocation peak
+    Returns: array of peak bytes above the frame's starting usage
+    """
+    pipeline = FramePipeline(hand_detector=HandDetector(ReplayBackend(generate_sequence(frames))))
+    pipeline.drawing_tools.set_current_tool("draw")
+    peaks = np.empty(frames - WARMUP_FRAMES)
+    
+    tracemalloc.start()
+    try:
+        for i in range(frames):
+            start, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            
+            frame = prepare(decoded[i % len(decoded)])
+            pipeline.render(frame, pipeline.detect(frame))
+            
+            if i >= WARMUP_FRAMES:
+                _, peak = tracemalloc.get_traced_memory()
+                peaks[i - WARMUP_FRAMES] = peak - start
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+def main():
+    parser = argparse.ArgumentParser(description="Count frame-sized allocations per frame")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--camera", default="1280x720", help="decoded frame size, WIDTHxHEIGHT")
+    args = parser.parse_args()
+    
+    width, height = (int(v) for v in args.camera.split("x"))
+    rng = np.random.default_rng(0)
+    decoded = [rng.integers(0, 256, (height, width, 3), dtype=np.uint8) for _ in range(2)]
+    frame_bytes = CANVAS_WIDTH * CANVAS_HEIGHT * 3
+    
+    buffers = FrameBuffers()
+    print(f"Camera {width}x{height}, output frame {frame_bytes / 1024:.0f} KiB")
+    print(f"{'path':<12}{'mean peak':>12}{'max peak':>12}{'frames with frame-sized allocs':>33}")
+    for name, prepare in (("unbuffered", unbuffered_prepare), ("buffered", buffers.prepare)):
+        peaks = measure(prepare, decoded, args.frames)
+        over = int((peaks >= frame_bytes).sum())
+        print(f"{name:<12}{peaks.mean() / 1024:>10.1f}KiB{peaks.max() / 1024:>10.1f}KiB"
+              f"{over:>20} / {len(peaks)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Measure autosave overhead on the frame loop and reload time of large canvases
+
+The frame loop draws replayed freehand strokes through FramePipeline for
+a fixed time with and without a CanvasAutosave attached (best of a few
+interleaved runs) and reports the per-frame cost, the frame-thread cost
+of handing off saves, and the time each save takes on the background
+thread. Reload compares mapping a saved mask file against re-rasterizing
+the same strokes.
+
+Usage:
+    python -m benchmarks.bench_autosave [--seconds S] [--sizes 1920x1080 3840x2160]
+                                        [--strokes N] [--interval S]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+from core.autosave import CanvasAutosave
+from core.detector_backends import ReplayBackend
+from core.drawing_tools import DrawingTools
+from core.frame_pipeline import FramePipeline
+from core.hand_detector import HandDetector
+from core.stroke_store import FREEHAND
+from utils.profiler import StageProfiler
+from config.resolution import parse_resolution
+from benchmarks.landmark_data import generate_sequence
+
+def run_frames(seconds, directory, interval, autosave):
+    """
+    Draw through the pipeline until the time is up
+    Returns: (mean ms per frame, autosave stage summary or None, autosave instance or None)
+    """
+    # The pipeline times its autosave hand-off as a stage of its own
+    profiler = StageProfiler(enabled=True, window_size=1000000, log_interval=0, overlay=False)
+    pipeline = FramePipeline(hand_detector=HandDetector(ReplayBackend(generate_sequence(600, draw_period=60))),
+                             profiler=profiler)
+    pipeline.drawing_tools.set_current_tool("draw")
+    saver = None
+    if autosave:
+        saver = CanvasAutosave("frames", directory=directory, interval=interval)
+        saver.attach(pipeline.drawing_tools)
+    
+    frame = np.zeros((pipeline.drawing_tools.height, pipeline.drawing_tools.width, 3), dtype=np.uint8)
+    frames = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        frame[:] = 0
+        pipeline.render(frame, pipeline.detect(frame))
+        frames += 1
+    elapsed = time.perf_counter() - start
+    
+    if saver is not None:
+        saver.close(pipeline.drawing_tools)
+    return elapsed / frames * 1000.0, profiler.snapshot()["stages"].get("autosave"), saver
+
+def fill_canvas(drawing_tools, count, seed=0):
+    """Commit random freehand strokes across the whole canvas"""
+    rng = np.random.default_rng(seed)
+    width, height = drawing_tools.width, drawing_tools.height
+    for _ in range(count):
+        start = rng.uniform((0, 0), (width, height))
+        points = start + np.cumsum(rng.normal(0, 6, (12, 2)), axis=0)
+        drawing_tools.commit_stroke(FREEHAND, [tuple(p) for p in points], 3, 0)
+        drawing_tools.end_stroke()
+
+def measure_reload(width, height, strokes, directory):
+    """
+    Save a canvas, then time restoring it from the mapped file and from strokes only
+    Returns: (mapped reload ms, re-rasterized reload ms, mask file MiB)
+    """
+    drawing_tools = DrawingTools(width, height)
+    saver = CanvasAutosave("reload", directory=directory)
+    saver.attach(drawing_tools)
+    fill_canvas(drawing_tools, strokes)
+    saver.close(drawing_tools)
+    
+    mapped = DrawingTools(width, height)
+    start = time.perf_counter()
+    mapped_saver = CanvasAutosave("reload", directory=directory)
+    mapped_saver.attach(mapped)
+    mapped_ms = (time.perf_counter() - start) * 1000.0
+    assert mapped.mask is mapped_saver.mask
+    mapped_saver.close(mapped)
+    
+    # Without a usable mask file the strokes are rasterized again
+    mask_path = mapped_saver.mask_path
+    size_mib = os.path.getsize(mask_path) / (1024 * 1024)
+    os.remove(mask_path)
+    rebuilt = DrawingTools(width, height)
+    start = time.perf_counter()
+    rebuilt_saver = CanvasAutosave("reload", directory=directory)
+    rebuilt_saver.attach(rebuilt)
+    rebuilt_ms = (time.perf_counter() - start) * 1000.0
+    rebuilt_saver.close(rebuilt)
+    
+    if not np.array_equal(mapped.mask, rebuilt.mask):
+        print("  warning: mapped and rebuilt masks differ")
+    return mapped_ms, rebuilt_ms, size_mib
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark canvas autosave")
+    parser.add_argument("--seconds", type=float, default=5.0, help="length of each frame loop run")
+    parser.add_argument("--runs", type=int, default=3, help="interleaved runs per mode, best is kept")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between saves")
+    parser.add_argument("--sizes", type=parse_resolution, nargs="+",
+                        default=[(1920, 1080), (3840, 2160), (7680, 4320)])
+    parser.add_argument("--strokes", type=int, default=2000, help="strokes on each reload canvas")
+    args = parser.parse_args()
+    
+    directory = tempfile.mkdtemp(prefix="autosave-bench-")
+    try:
+        base_runs, saved_runs = [], []
+        for _ in range(args.runs):
+            base_runs.append(run_frames(args.seconds, directory, args.interval, autosave=False))
+            saved_runs.append(run_frames(args.seconds, directory, args.interval, autosave=True))
+        base_ms = min(run[0] for run in base_runs)
+        saved_ms, handoff, saver = min(saved_runs, key=lambda run: run[0])
+        print(f"Frame loop, {args.runs} x {args.seconds} s per mode, save every {args.interval} s")
+        print(f"  without autosave   {base_ms:8.3f} ms/frame")
+        print(f"  with autosave      {saved_ms:8.3f} ms/frame  ({saved_ms - base_ms:+.3f} ms)")
+        print(f"  save hand-off      {handoff['p95_ms']:8.3f} ms p95, {handoff['max_ms']:.3f} ms max, "
+              f"on the frame thread")
+        print(f"  background saves   {saver.saves:8d}       "
+              f"{saver.save_seconds / max(1, saver.saves) * 1000.0:.2f} ms each, off the frame thread")
+        
+        print(f"Reload with {args.strokes} strokes")
+        print(f"{'canvas':>12}{'mask MiB':>10}{'mapped ms':>12}{'rebuilt ms':>12}")
+        for width, height in args.sizes:
+            mapped_ms, rebuilt_ms, size_mib = measure_reload(width, height, args.strokes, directory)
+            print(f"{width:>6}x{height:<5}{size_mib:>10.1f}{mapped_ms:>12.2f}{rebuilt_ms:>12.2f}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
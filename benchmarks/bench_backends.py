@@ -0,0 +1,62 @@
+"""
+Compare detector backends through the full frame pipeline
+
+Usage:
+    python -m benchmarks.bench_backends [--frames N] [--landmarks PATH] [--backends replay mediapipe]
+"""
+import argparse
+import time
+import numpy as np
+from core.detector_backends import create_backend
+from core.hand_detector import HandDetector
+from core.frame_pipeline import FramePipeline
+from config.resolution import CANVAS_WIDTH, CANVAS_HEIGHT
+from benchmarks.landmark_data import generate_sequence
+
+def run_backend(backend, frames):
+    """
+    Time detection and rendering separately for each frame
+    Returns: (detect_ms, render_ms) arrays
+    """
+    pipeline = FramePipeline(hand_detector=HandDetector(backend))
+    base_frame = np.full((CANVAS_HEIGHT, CANVAS_WIDTH, 3), 127, dtype=np.uint8)
+    detect_ms = np.empty(frames)
+    render_ms = np.empty(frames)
+    
+    for i in range(frames):
+        frame = base_frame.copy()
+        start = time.perf_counter()
+        results = pipeline.detect(frame)
+        detected = time.perf_counter()
+        pipeline.render(frame, results)
+        detect_ms[i] = (detected - start) * 1000.0
+        render_ms[i] = (time.perf_counter() - detected) * 1000.0
+    
+    backend.close()
+    return detect_ms, render_ms
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark detector backends")
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--landmarks", help="recorded .npy landmarks for the replay backend")
+    parser.add_argument("--backends", nargs="+", default=["replay"])
+    args = parser.parse_args()
+    
+    landmarks = args.landmarks or generate_sequence(args.frames)
+    
+    print(f"{'backend':<12}{'detect p50':>12}{'render p50':>12}{'total p95':>12}{'fps':>10}")
+    for name in args.backends:
+        kwargs = {"source": landmarks} if name == "replay" else {}
+        try:
+            backend = create_backend(name, **kwargs)
+        except ImportError as e:
+            print(f"{name:<12}unavailable: {e}")
+            continue
+        
+        detect_ms, render_ms = run_backend(backend, args.frames)
+        total_ms = detect_ms + render_ms
+        print(f"{name:<12}{np.median(detect_ms):>10.3f}ms{np.median(render_ms):>10.3f}ms"
+              f"{np.percentile(total_ms, 95):>10.3f}ms{1000.0 / total_ms.mean():>10.1f}")
+
+if __name__ == "__main__":
+    main()
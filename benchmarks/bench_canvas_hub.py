@@ -0,0 +1,140 @@
+"""
+Measure broadcast latency and bandwidth of the shared canvas hub
+
+Each simulated session has its own DrawingTools attached to one
+CanvasHub through a CanvasSync and runs on a thread at a fixed frame
+rate, like one streamlit-webrtc connection. Every session draws
+freehand strokes of stroke_frames frames, lifting the pen in between,
+and ticks its sync once per frame. Reports publish-to-apply latency,
+the bytes each session received per second against shipping the full
+mask every frame, the cost of a tick and whether every canvas ended up
+identical. One extra run adds a session that only ticks a few times a
+second with a small log, to show slow sessions being resynced instead
+of holding back the others.
+
+Usage:
+    python -m benchmarks.bench_canvas_hub [--sessions 1 2 4 8] [--seconds S] [--fps N]
+"""
+import argparse
+import threading
+import time
+import numpy as np
+from core.canvas_hub import CanvasHub, CanvasSync
+from core.drawing_tools import DrawingTools
+from config.resolution import CANVAS_WIDTH, CANVAS_HEIGHT
+
+def run_session(hub, seconds, fps, stroke_frames, seed, start_event, stats):
+    """Draw random-walk strokes at a fixed frame rate, ticking the sync every frame"""
+    drawing_tools = DrawingTools(CANVAS_WIDTH, CANVAS_HEIGHT, tiled=False, smoothing=False)
+    drawing_tools.set_current_tool("draw")
+    sync = CanvasSync(hub)
+    sync.attach(drawing_tools)
+    rng = np.random.default_rng(seed)
+    position = rng.uniform((0, 0), (CANVAS_WIDTH, CANVAS_HEIGHT))
+    tick_times = []
+    start_event.wait()
+    
+    interval = 1.0 / fps
+    next_frame = time.perf_counter()
+    deadline = next_frame + seconds
+    frame = 0
+    while next_frame < deadline:
+        # Pen down for stroke_frames frames, then up for a few
+        step = frame % (stroke_frames + 5)
+        if step < stroke_frames:
+            new_position = np.clip(position + rng.normal(0, 8, 2), 0, (CANVAS_WIDTH - 1, CANVAS_HEIGHT - 1))
+            drawing_tools.draw_freehand(tuple(int(v) for v in position), tuple(int(v) for v in new_position))
+            position = new_position
+        elif step == stroke_frames:
+            drawing_tools.end_stroke()
+        
+        start = time.perf_counter()
+        sync.tick(drawing_tools)
+        tick_times.append(time.perf_counter() - start)
+        
+        frame += 1
+        next_frame += interval
+        time.sleep(max(0.0, next_frame - time.perf_counter()))
+    
+    drawing_tools.end_stroke()
+    stats.append((drawing_tools, sync, np.array(tick_times) * 1000.0, frame, fps))
+
+def run(sessions, seconds, fps, stroke_frames, slow_fps=None, log_bytes=None):
+    """
+    Run sessions on one hub until the time is up, then let them catch up
+    Returns: (hub, per-session (drawing tools, sync, tick ms, frames, fps) stats)
+    """
+    hub = CanvasHub(CANVAS_WIDTH, CANVAS_HEIGHT, tiled=False) if log_bytes is None else \
+        CanvasHub(CANVAS_WIDTH, CANVAS_HEIGHT, tiled=False, log_bytes=log_bytes)
+    start_event = threading.Event()
+    stats = []
+    rates = [fps] * sessions + ([slow_fps] if slow_fps else [])
+    threads = [threading.Thread(target=run_session,
+                                args=(hub, seconds, rate, stroke_frames, seed, start_event, stats))
+               for seed, rate in enumerate(rates)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)
+    start_event.set()
+    for thread in threads:
+        thread.join()
+    
+    # Last strokes out, then every session applies what is left
+    for drawing_tools, sync, _, _, _ in stats:
+        sync.publish_strokes(drawing_tools)
+    while any(sync.tick(drawing_tools) for drawing_tools, sync, _, _, _ in stats):
+        pass
+    return hub, stats
+
+def summarize(hub, stats, seconds):
+    """
+    Latency, bandwidth and tick cost over all sessions
+    Returns: dict of results
+    """
+    latencies = np.concatenate([np.array(sync.latencies) for _, sync, _, _, _ in stats]) * 1000.0
+    ticks = np.concatenate([tick_ms for _, _, tick_ms, _, _ in stats])
+    received = np.mean([sync.received_bytes for _, sync, _, _, _ in stats]) / seconds
+    frames = np.mean([frames for _, _, _, frames, _ in stats])
+    reference = stats[0][0].mask
+    identical = all(np.array_equal(drawing_tools.mask, reference) for drawing_tools, _, _, _, _ in stats)
+    return {
+        "latency_p50": np.percentile(latencies, 50) if len(latencies) else 0.0,
+        "latency_p95": np.percentile(latencies, 95) if len(latencies) else 0.0,
+        "published_kb_s": hub.published_bytes / seconds / 1024.0,
+        "received_kb_s": received / 1024.0,
+        "full_kb_s": CANVAS_WIDTH * CANVAS_HEIGHT * frames / seconds / 1024.0,
+        "tick_p50": np.percentile(ticks, 50),
+        "tick_p95": np.percentile(ticks, 95),
+        "identical": identical,
+        "resyncs": hub.resyncs,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the shared canvas hub")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--stroke-frames", type=int, default=20, help="frames per freehand stroke")
+    args = parser.parse_args()
+    
+    print(f"{'sessions':>9}{'lat p50 ms':>12}{'lat p95 ms':>12}{'pub KB/s':>10}{'recv KB/s':>11}"
+          f"{'full KB/s':>11}{'tick p50':>10}{'tick p95':>10}{'identical':>11}")
+    for sessions in args.sessions:
+        hub, stats = run(sessions, args.seconds, args.fps, args.stroke_frames)
+        r = summarize(hub, stats, args.seconds)
+        print(f"{sessions:>9}{r['latency_p50']:>12.2f}{r['latency_p95']:>12.2f}{r['published_kb_s']:>10.1f}"
+              f"{r['received_kb_s']:>11.1f}{r['full_kb_s']:>11.0f}{r['tick_p50']:>10.3f}{r['tick_p95']:>10.3f}"
+              f"{str(r['identical']):>11}")
+    
+    # A session ticking at 2 fps with a log too small to hold what it misses
+    sessions = max(args.sessions)
+    hub, stats = run(sessions, args.seconds, args.fps, args.stroke_frames, slow_fps=2, log_bytes=2048)
+    r = summarize(hub, stats, args.seconds)
+    fast = summarize(hub, [s for s in stats if s[4] == args.fps], args.seconds)
+    slow_ticks = np.concatenate([s[2] for s in stats if s[4] != args.fps])
+    print(f"\n{sessions} sessions + one at 2 fps, 2 KB log: {r['resyncs']} resyncs, "
+          f"slow session tick p95 {np.percentile(slow_ticks, 95):.2f} ms, "
+          f"others tick p95 {fast['tick_p95']:.3f} ms, identical {r['identical']}")
+
+if __name__ == "__main__":
+    main()
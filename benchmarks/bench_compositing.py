@@ -0,0 +1,92 @@
+"""
+Compare mask compositing against the original full-frame implementation
+
+Usage:
+    python -m benchmarks.bench_compositing [--frames N]
+"""
+import argparse
+import time
+import tracemalloc
+import cv2
+import numpy as np
+from core.drawing_tools import DrawingTools
+
+RESOLUTIONS = {"480p": (640, 480), "720p": (1280, 720), "1080p": (1920, 1080)}
+
+def original_apply(mask, frame):
+    """apply_mask_to_frame as it was before incremental compositing"""
+    masked_frame = cv2.bitwise_and(frame, frame, mask=mask)
+    frame[:, :, 1] = masked_frame[:, :, 1]
+    frame[:, :, 2] = masked_frame[:, :, 2]
+    return frame
+
+def make_canvas(width, height, seed=0):
+    """A canvas with a handful of freehand strokes and shapes"""
+    rng = np.random.default_rng(seed)
+    drawing_tools = DrawingTools(width, height)
+    drawing_tools.set_current_tool("draw")
+    x, y = width // 2, height // 2
+    for i in range(300):
+        x = int(np.clip(x + rng.integers(-12, 13), 0, width - 1))
+        y = int(np.clip(y + rng.integers(-12, 13), 0, height - 1))
+        drawing_tools.process_drawing(None, {'index_tip': (x, y)}, (i // 40) % 2 == 0)
+    drawing_tools.draw_circle(None, (width // 3, height // 3), height // 6)
+    drawing_tools.draw_rectangle(None, (width // 2, height // 2), (width - 20, height - 20))
+    return drawing_tools
+
+def measure(apply, frames, camera_frames):
+    """
+    Time apply(frame) over many frames
+    Returns: microseconds per frame
+    """
+    # Warm up caches before measuring
+    for frame in camera_frames[:2]:
+        apply(frame)
+    
+    start = time.perf_counter()
+    for i in range(frames):
+        apply(camera_frames[i % len(camera_frames)])
+    return (time.perf_counter() - start) * 1e6 / frames
+
+def count_allocations(apply, frames, camera_frames):
+    """
+    Allocations made while compositing, traced through tracemalloc
+    Returns: (peak bytes of a single frame, frame-sized allocations per frame)
+    """
+    frame_bytes = camera_frames[0].nbytes // 3
+    tracemalloc.start()
+    peak = 0
+    large = 0
+    for i in range(frames):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        apply(camera_frames[i % len(camera_frames)])
+        frame_peak = tracemalloc.get_traced_memory()[1] - before
+        peak = max(peak, frame_peak)
+        # Each single-channel frame-sized temporary adds at least frame_bytes to the peak
+        large += frame_peak // frame_bytes
+    tracemalloc.stop()
+    return peak, large / frames
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark mask compositing")
+    parser.add_argument("--frames", type=int, default=500)
+    args = parser.parse_args()
+    
+    print(f"{'resolution':<11}{'impl':<13}{'us/frame':>10}{'peak bytes/frame':>18}{'frame allocs':>14}")
+    for name, (width, height) in RESOLUTIONS.items():
+        drawing_tools = make_canvas(width, height)
+        rng = np.random.default_rng(1)
+        camera_frames = [rng.integers(0, 256, (height, width, 3), dtype=np.uint8) for _ in range(4)]
+        
+        implementations = {
+            "original": lambda frame: original_apply(drawing_tools.mask, frame),
+            "incremental": drawing_tools.apply_mask_to_frame,
+        }
+        for impl_name, apply in implementations.items():
+            us_per_frame = measure(apply, args.frames, camera_frames)
+            peak, frame_allocs = count_allocations(apply, 50, camera_frames)
+            print(f"{name:<11}{impl_name:<13}{us_per_frame:>10.1f}{peak:>18,}{frame_allocs:>14.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Compare in-process pooled detection with the process-pool detection service
+
+Inference is simulated by a replay backend that also spins the CPU for
+--detect-ms while holding the GIL, as pure-Python or GIL-bound work
+would. Client threads stand in for web sessions; each submits frames as
+fast as results come back.
+
+Usage:
+    python -m benchmarks.bench_detection_service [--workers 1 2 4] [--seconds S] [--detect-ms MS]
+"""
+import argparse
+import functools
+import os
+import threading
+import time
+import numpy as np
+from core.detector_backends import ReplayBackend
+from core.detector_pool import DetectorPool
+from core.detection_service import DetectionService
+from core.hand_detector import HandDetector
+from config.resolution import CANVAS_WIDTH, CANVAS_HEIGHT
+from benchmarks.landmark_data import generate_sequence
+
+class BusyReplayBackend(ReplayBackend):
+    """Replay backend that burns CPU time before every detection"""
+    name = "busy-replay"
+    
+    def __init__(self, source, busy_seconds):
+        super().__init__(source)
+        self.busy_seconds = busy_seconds
+    
+    def detect(self, frame):
+        # CPU time, so the spin costs the same however threads are scheduled
+        deadline = time.thread_time() + self.busy_seconds
+        while time.thread_time() < deadline:
+            pass
+        return super().detect(frame)
+
+def make_busy_detector(landmarks, busy_ms):
+    """Top-level factory so worker processes can rebuild it"""
+    return HandDetector(BusyReplayBackend(landmarks, busy_ms / 1000.0))
+
+def run_clients(detect, clients, seconds):
+    """
+    Call detect from several threads until the time is up
+    Returns: detections per second over all clients
+    """
+    counts = [0] * clients
+    frame = np.full((CANVAS_HEIGHT, CANVAS_WIDTH, 3), 127, dtype=np.uint8)
+    start_event = threading.Event()
+    
+    def client(slot):
+        start_event.wait()
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            detect(frame)
+            counts[slot] += 1
+    
+    threads = [threading.Thread(target=client, args=(slot,)) for slot in range(clients)]
+    for thread in threads:
+        thread.start()
+    start = time.perf_counter()
+    start_event.set()
+    for thread in threads:
+        thread.join()
+    return sum(counts) / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the process-pool detection service")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--detect-ms", type=float, default=10.0,
+                        help="CPU time each simulated detection holds the GIL for")
+    args = parser.parse_args()
+    
+    factory = functools.partial(make_busy_detector, generate_sequence(600), args.detect_ms)
+    print(f"{os.cpu_count()} CPU cores, {args.detect_ms} ms simulated inference, clients = 2 x workers")
+    print(f"{'workers':>8}{'threads fps':>14}{'processes fps':>16}{'speedup':>10}")
+    for workers in args.workers:
+        clients = 2 * workers
+        pool = DetectorPool(workers, factory)
+        thread_fps = run_clients(pool.detect, clients, args.seconds)
+        pool.close()
+        
+        service = DetectionService(workers, factory=factory)
+        service.start()
+        try:
+            process_fps = run_clients(service.detect, clients, args.seconds)
+        finally:
+            service.stop()
+        print(f"{workers:>8}{thread_fps:>14.1f}{process_fps:>16.1f}{process_fps / thread_fps:>9.2f}x")
+
+if __name__ == "__main__":
+    main()
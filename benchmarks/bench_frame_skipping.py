@@ -0,0 +1,73 @@
+"""
+Stroke error of frame-skipping detection against full-rate detection
+
+Usage:
+    python -m benchmarks.bench_frame_skipping [--frames N] [--landmarks PATH] [--skip-factors 1 2 4]
+"""
+import argparse
+import time
+import numpy as np
+from core.detector_backends import ReplayBackend
+from core.frame_skipping import FrameSkippingBackend
+from core.hand_detector import HandDetector
+from core.frame_pipeline import FramePipeline
+from config.resolution import CANVAS_WIDTH, CANVAS_HEIGHT
+from benchmarks.landmark_data import generate_sequence
+
+def run(landmarks, skip_factor=1, adaptive=False, tool="draw"):
+    """
+    Draw the whole sequence through the pipeline
+    Returns: (index tip per frame, final mask, inference calls, seconds)
+    """
+    replay = ReplayBackend(landmarks, loop=False)
+    backend = FrameSkippingBackend(replay, skip_factor, adaptive)
+    hand_detector = HandDetector(backend)
+    pipeline = FramePipeline(hand_detector=hand_detector)
+    pipeline.drawing_tools.set_current_tool(tool)
+    
+    frame = np.zeros((CANVAS_HEIGHT, CANVAS_WIDTH, 3), dtype=np.uint8)
+    tips = np.full((len(replay), 2), np.nan)
+    
+    start = time.perf_counter()
+    for i in range(len(replay)):
+        # Keep the replay in step with the camera even on skipped frames
+        replay.frame_index = i
+        frame[:] = 0
+        results = pipeline.detect(frame)
+        hands = hand_detector.get_landmarks(results)
+        if len(hands):
+            tips[i] = hand_detector.get_finger_positions(hands[0], CANVAS_WIDTH, CANVAS_HEIGHT)['index_tip']
+        pipeline.render(frame, results)
+    elapsed = time.perf_counter() - start
+    
+    return tips, pipeline.drawing_tools.mask.copy(), backend.detections, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark frame-skipping detection")
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--landmarks", help="recorded .npy landmarks, synthetic if omitted")
+    parser.add_argument("--skip-factors", type=int, nargs="+", default=[1, 2, 3, 4, 6, 8])
+    args = parser.parse_args()
+    
+    landmarks = np.load(args.landmarks) if args.landmarks else generate_sequence(args.frames)
+    reference_tips, reference_mask, _, _ = run(landmarks)
+    reference_ink = reference_mask == 0
+    
+    print(f"{'mode':<14}{'inference':>10}{'tip mean':>10}{'tip p95':>10}{'ink diff':>10}{'ms/frame':>10}")
+    modes = [(factor, False) for factor in args.skip_factors] + [(max(args.skip_factors), True)]
+    for skip_factor, adaptive in modes:
+        tips, mask, detections, elapsed = run(landmarks, skip_factor, adaptive)
+        
+        errors = np.hypot(*(tips - reference_tips).T)
+        errors = errors[~np.isnan(errors)]
+        ink = mask == 0
+        # Pixels inked in only one of the two canvases, relative to the reference ink
+        ink_diff = np.count_nonzero(ink ^ reference_ink) / max(1, np.count_nonzero(reference_ink))
+        
+        label = f"skip {skip_factor}" + (" adapt" if adaptive else "")
+        print(f"{label:<14}{detections / len(landmarks):>9.0%} {errors.mean():>8.2f}px"
+              f"{np.percentile(errors, 95):>8.2f}px{ink_diff:>10.1%}"
+              f"{elapsed * 1000.0 / len(landmarks):>10.3f}")
+
+if __name__ == "__main__":
+    main()
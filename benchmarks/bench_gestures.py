@@ -0,0 +1,88 @@
+"""
+Measure gesture recognition cost and accuracy on landmark sequences
+
+Runs GestureRecognizer.update on every frame of a landmark sequence and
+reports per-frame p50/p95/max time against the 0.2 ms budget. Synthetic
+sequences cycle each hand through every gesture and also report how
+often the recognized gesture matches the pose, both per frame and after
+debouncing (frames right after a pose change are skipped, since the
+debounced gesture lags by design). Recorded .npy landmarks are timed
+and their gesture counts shown.
+
+Usage:
+    python -m benchmarks.bench_gestures [--frames N] [--hands 1 2 4] [--landmarks FILE]
+"""
+import argparse
+import time
+import numpy as np
+from core.gestures import GestureRecognizer, GESTURE_NAMES
+from config.resolution import CANVAS_WIDTH, CANVAS_HEIGHT
+from benchmarks.landmark_data import generate_gesture_sequence
+
+BUDGET_MS = 0.2
+
+def run(sequence, labels=None):
+    """
+    Recognize every frame of a (frames, hands, 21, 3) sequence
+    Returns: (per-frame ms array, per-frame accuracy or None, debounced accuracy or None,
+              gesture name counts)
+    """
+    recognizer = GestureRecognizer(max_hands=sequence.shape[1])
+    times = np.empty(len(sequence))
+    counts = dict.fromkeys(GESTURE_NAMES, 0)
+    raw_hits = stable_hits = stable_total = 0
+    since_change = np.zeros(sequence.shape[1], dtype=int)
+    
+    for i, points in enumerate(sequence):
+        # Recorded frames without a hand are NaN, like results_to_array
+        points = points[~np.isnan(points).any(axis=(1, 2))]
+        start = time.perf_counter()
+        stable = recognizer.update(points, CANVAS_WIDTH, CANVAS_HEIGHT)
+        times[i] = (time.perf_counter() - start) * 1000.0
+        
+        for hand, gesture in enumerate(stable):
+            counts[GESTURE_NAMES[gesture]] += 1
+        if labels is None:
+            continue
+        
+        raw = recognizer.candidate[:len(points)]
+        changed = [i > 0 and labels[i][hand] != labels[i - 1][hand] for hand in range(len(points))]
+        since_change = np.where(changed, 0, since_change + 1)
+        for hand in range(len(points)):
+            raw_hits += GESTURE_NAMES[raw[hand]] == labels[i][hand]
+            if since_change[hand] >= recognizer.stable_frames:
+                stable_total += 1
+                stable_hits += GESTURE_NAMES[stable[hand]] == labels[i][hand]
+    
+    if labels is None:
+        return times, None, None, counts
+    return times, raw_hits / sequence[:, :, 0, 0].size, stable_hits / max(1, stable_total), counts
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark gesture recognition")
+    parser.add_argument("--frames", type=int, default=3000)
+    parser.add_argument("--hands", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--landmarks", help="recorded .npy landmarks, synthetic gestures if omitted")
+    args = parser.parse_args()
+    
+    print(f"{'hands':>6}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}{'budget':>8}{'frame acc':>11}{'stable acc':>12}")
+    if args.landmarks:
+        sequence = np.load(args.landmarks)
+        if sequence.ndim == 3:
+            sequence = sequence[:, np.newaxis]
+        runs = [(sequence.astype(np.float32, copy=False), None)]
+    else:
+        runs = [generate_gesture_sequence(args.frames, hands) for hands in args.hands]
+    
+    for sequence, labels in runs:
+        run(sequence[:100], labels)  # warm up
+        times, frame_accuracy, stable_accuracy, counts = run(sequence, labels)
+        p50, p95 = np.percentile(times, (50, 95))
+        within = "ok" if p95 < BUDGET_MS else "over"
+        accuracy = "" if labels is None else f"{frame_accuracy:>11.1%}{stable_accuracy:>12.1%}"
+        print(f"{sequence.shape[1]:>6}{p50:>9.3f}{p95:>9.3f}{times.max():>9.3f}{within:>8}{accuracy}")
+        if labels is None:
+            print("  " + ", ".join(f"{name} {count}" for name, count in counts.items()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Compare per-landmark and batched conversion of detection results
+
+Results are built from synthetic landmarks as plain landmark objects
+(standing in for MediaPipe's protobuf messages, which expose the same
+x/y/z attributes) and converted to a (hands, 21, 3) array three ways:
+one landmark at a time into a fresh array, as the conversion used to
+work; in one pass into a preallocated array; and from results that
+already carry their array, as replayed and predicted results do.
+
+Usage:
+    python -m benchmarks.bench_landmarks [--frames N] [--hands 1 2 4]
+"""
+import argparse
+import time
+import numpy as np
+from core.detector_backends import (
+    DetectionResults, HandLandmarks, NUM_LANDMARKS, extract_landmarks, array_to_results
+)
+from benchmarks.landmark_data import generate_sequence
+
+def per_landmark(results, max_hands):
+    """The previous conversion: one array write per landmark"""
+    points = np.full((max_hands, NUM_LANDMARKS, 3), np.nan, dtype=np.float32)
+    for hand_index, hand_landmarks in enumerate(results.multi_hand_landmarks[:max_hands]):
+        for i, lm in enumerate(hand_landmarks.landmark):
+            points[hand_index, i] = (lm.x, lm.y, lm.z)
+    return points
+
+def batched(results, out):
+    """Single-pass conversion into a reused array"""
+    count = extract_landmarks(results, out)
+    return out[:count]
+
+def make_results(frames, hands, seed=0):
+    """
+    Detection results with the given number of hands per frame
+    Returns: (results without arrays, results carrying their arrays)
+    """
+    sequence = generate_sequence(frames, num_hands=hands, seed=seed)
+    plain = [DetectionResults([HandLandmarks.from_array(hand) for hand in frame]) for frame in sequence]
+    cached = [array_to_results(frame) for frame in sequence]
+    return plain, cached
+
+def time_per_call(convert, results, repeats=3):
+    """
+    Best-of-repeats time of converting every result
+    Returns: microseconds per call
+    """
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for result in results:
+            convert(result)
+        best = min(best, time.perf_counter() - start)
+    return best / len(results) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark landmark extraction")
+    parser.add_argument("--frames", type=int, default=2000)
+    parser.add_argument("--hands", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+    
+    print(f"{'hands':>6}{'per-landmark us':>17}{'batched us':>12}{'cached us':>11}{'speedup':>9}")
+    for hands in args.hands:
+        plain, cached = make_results(args.frames, hands)
+        out = np.empty((hands, NUM_LANDMARKS, 3), dtype=np.float32)
+        
+        reference = per_landmark(plain[0], hands)
+        assert np.array_equal(batched(plain[0], out), reference)
+        assert np.array_equal(batched(cached[0], out), reference)
+        
+        slow = time_per_call(lambda r: per_landmark(r, hands), plain)
+        fast = time_per_call(lambda r: batched(r, out), plain)
+        from_array = time_per_call(lambda r: batched(r, out), cached)
+        print(f"{hands:>6}{slow:>17.1f}{fast:>12.1f}{from_array:>11.1f}{slow / fast:>8.1f}x")
+
+if __name__ == "__main__":
+    main()
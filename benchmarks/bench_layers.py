@@ -0,0 +1,108 @@
+"""
+Compare cached layer groups against blending every color layer per frame
+
+Draws colored freehand strokes on each layer of a LayeredCanvas, then
+composites camera-like frames two ways: blending every visible layer
+into the frame (what a layer stack costs without caching), and the
+canvas's own composite, which blends the two cached flattened groups
+and the active layer. Also times drawing a freehand segment, which only
+re-flattens the active layer inside the segment, against the mask-only
+canvas, and reports the largest pixel difference between both outputs.
+
+Usage:
+    python -m benchmarks.bench_layers [--frames N] [--layers 1 2 4 8]
+"""
+import argparse
+import time
+import numpy as np
+from core.drawing_tools import DrawingTools
+from config.settings import PALETTE
+from config.resolution import CANVAS_WIDTH, CANVAS_HEIGHT
+
+def draw_layers(drawing_tools, layers, seed=0):
+    """Freehand strokes in a different color on every layer, the middle layer left active"""
+    rng = np.random.default_rng(seed)
+    colors = list(PALETTE.values())
+    drawing_tools.set_current_tool("draw")
+    for layer in range(layers):
+        drawing_tools.select_layer(layer)
+        drawing_tools.set_color(colors[layer % len(colors)])
+        drawing_tools.set_thickness(int(rng.integers(2, 12)))
+        x, y = rng.integers(0, (CANVAS_WIDTH, CANVAS_HEIGHT))
+        for i in range(200):
+            x = int(np.clip(x + rng.integers(-15, 16), 0, CANVAS_WIDTH - 1))
+            y = int(np.clip(y + rng.integers(-15, 16), 0, CANVAS_HEIGHT - 1))
+            drawing_tools.process_drawing(None, {"index_tip": (x, y)}, (i // 50) % 2 == 0)
+        drawing_tools.end_stroke()
+    if layers > 2:
+        drawing_tools.set_layer_opacity(0, 0.5)
+    drawing_tools.select_layer(layers // 2)
+
+def blend_every_layer(layer_canvas, frame):
+    """Blend each visible layer into the frame in turn, without any cache"""
+    blended = frame.astype(np.float32)
+    for layer in layer_canvas.layers:
+        if not layer.visible:
+            continue
+        alpha = layer.image[:, :, 3:] * np.float32(layer.opacity / 255.0)
+        blended *= 1.0 - alpha
+        blended += layer.image[:, :, :3] * alpha
+    frame[:] = np.rint(blended)
+    return frame
+
+def measure(apply, frames, camera_frames):
+    """
+    Time apply(frame) over many frames
+    Returns: milliseconds per frame
+    """
+    apply(camera_frames[0].copy())
+    start = time.perf_counter()
+    for i in range(frames):
+        apply(camera_frames[i % len(camera_frames)].copy())
+    return (time.perf_counter() - start) * 1000.0 / frames
+
+def time_segments(drawing_tools, segments=200):
+    """
+    Time drawing freehand segments on the active layer
+    Returns: milliseconds per segment
+    """
+    drawing_tools.set_current_tool("draw")
+    x, y = CANVAS_WIDTH // 2, CANVAS_HEIGHT // 2
+    drawing_tools.process_drawing(None, {"index_tip": (x, y)}, False)
+    start = time.perf_counter()
+    for i in range(segments):
+        x = (x + 7) % CANVAS_WIDTH
+        y = (y + 3) % CANVAS_HEIGHT
+        drawing_tools.process_drawing(None, {"index_tip": (x, y)}, True)
+    elapsed = time.perf_counter() - start
+    drawing_tools.end_stroke()
+    return elapsed * 1000.0 / segments
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark compositing of color layers")
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--layers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+    
+    rng = np.random.default_rng(1)
+    camera_frames = [rng.integers(0, 255, (CANVAS_HEIGHT, CANVAS_WIDTH, 3), dtype=np.uint8) for _ in range(4)]
+    mask_tools = DrawingTools(CANVAS_WIDTH, CANVAS_HEIGHT, tiled=False, smoothing=False)
+    mask_segment = time_segments(mask_tools)
+    
+    print(f"{'layers':>7}{'every layer ms':>16}{'cached ms':>11}{'speedup':>9}"
+          f"{'segment ms':>12}{'mask seg ms':>13}{'max diff':>10}")
+    for layers in args.layers:
+        drawing_tools = DrawingTools(CANVAS_WIDTH, CANVAS_HEIGHT, tiled=False, smoothing=False, color=True)
+        draw_layers(drawing_tools, layers)
+        layer_canvas = drawing_tools.layers
+        
+        every = measure(lambda frame: blend_every_layer(layer_canvas, frame), args.frames, camera_frames)
+        cached = measure(drawing_tools.apply_mask_to_frame, args.frames, camera_frames)
+        difference = np.abs(blend_every_layer(layer_canvas, camera_frames[0].copy()).astype(int) -
+                            drawing_tools.apply_mask_to_frame(camera_frames[0].copy())).max()
+        segment = time_segments(drawing_tools)
+        print(f"{layers:>7}{every:>16.3f}{cached:>11.3f}{every / cached:>8.1f}x"
+              f"{segment:>12.3f}{mask_segment:>13.3f}{difference:>10}")
+
+if __name__ == "__main__":
+    main()
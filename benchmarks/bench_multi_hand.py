@@ -0,0 +1,115 @@
+"""
+Measure per-frame cost and identity stability with several hands drawing
+
+Synthetic hands trace separate curves and draw with the freehand tool
+into one shared canvas through FramePipeline. The detector reports the
+hands in a random order every frame, as real detectors may, so hand
+ids only stay stable if the tracker matches them. Reports ms per frame,
+ms per hand, the per-hand stages (landmark drawing, tracking and drawing;
+close to linear in the number of hands), the tracking stage on its own
+and how often a hand's id changed. First checks that two hands drawing
+at once each get one full-length stroke, with and without smoothing.
+
+Usage:
+    python -m benchmarks.bench_multi_hand [--frames N] [--hands 1 2 4] [--runs N]
+"""
+import argparse
+import time
+import numpy as np
+from core.detector_backends import ReplayBackend
+from core.hand_detector import HandDetector
+from core.frame_pipeline import FramePipeline
+from core.drawing_tools import DrawingTools
+from utils.profiler import StageProfiler
+from config.resolution import CANVAS_WIDTH, CANVAS_HEIGHT
+from benchmarks.landmark_data import generate_sequence
+
+def shuffled_sequence(frames, hands, seed=0):
+    """
+    Landmarks with the hand order shuffled every frame
+    Returns: (sequence (frames, hands, 21, 3), original hand index of each entry (frames, hands))
+    """
+    sequence = generate_sequence(frames, num_hands=hands, seed=seed)
+    rng = np.random.default_rng(seed + 1)
+    order = np.array([rng.permutation(hands) for _ in range(frames)])
+    return np.take_along_axis(sequence, order[:, :, None, None], axis=1), order
+
+def two_hand_strokes(frames, smoothing):
+    """
+    Two hands draw parallel horizontal lines at the same time, frame by frame
+    Returns: (number of strokes, width in pixels of each stroke's extent)
+    """
+    drawing_tools = DrawingTools(CANVAS_WIDTH, CANVAS_HEIGHT, tiled=False, smoothing=smoothing, color=False)
+    step = (CANVAS_WIDTH - 200) // frames
+    for i in range(frames):
+        for hand_id in range(2):
+            drawing_tools.select_hand(hand_id)
+            x, y = 100 + step * i, CANVAS_HEIGHT // 3 * (hand_id + 1)
+            drawing_tools.draw_freehand((x - step, y), (x, y))
+    for hand_id in range(2):
+        drawing_tools.lift_hand(hand_id)
+    strokes = drawing_tools.strokes
+    extents = strokes.extents.view()
+    return len(strokes), (extents[:, 2] - extents[:, 0]).tolist()
+
+def run(sequence, order):
+    """
+    Draw every frame of the sequence with all hands on the freehand tool
+    Returns: (ms per frame, per-hand stages ms, tracking stage ms, id changes, strokes)
+    """
+    frames, hands = order.shape
+    profiler = StageProfiler(enabled=True, window_size=frames * hands, log_interval=0, overlay=False)
+    hand_detector = HandDetector(ReplayBackend(sequence, loop=False), max_hands=hands)
+    pipeline = FramePipeline(hand_detector=hand_detector, profiler=profiler)
+    for hand_id in range(hands):
+        pipeline.drawing_tools.select_hand(hand_id)
+        pipeline.drawing_tools.set_current_tool("draw")
+    
+    frame = np.zeros((CANVAS_HEIGHT, CANVAS_WIDTH, 3), dtype=np.uint8)
+    last_ids = np.full(hands, -1)
+    id_changes = 0
+    start = time.perf_counter()
+    for i in range(frames):
+        frame[:] = 0
+        pipeline.render(frame, pipeline.detect(frame))
+        
+        # Id of each original hand this frame
+        ids = np.empty(hands, dtype=int)
+        ids[order[i]] = pipeline.hand_ids
+        id_changes += int(np.count_nonzero((last_ids >= 0) & (ids != last_ids)))
+        last_ids = ids
+    elapsed = time.perf_counter() - start
+    
+    # Stages run once per hand, plus tracking which sees all hands at once
+    stages = profiler.snapshot()["stages"]
+    per_frame = {name: stages[name]["mean_ms"] * stages[name]["count"] / frames
+                 for name in ("landmarks", "tracking", "drawing")}
+    hand_stages = sum(per_frame.values())
+    return (elapsed / frames * 1000.0, hand_stages, per_frame["tracking"], id_changes,
+            len(pipeline.drawing_tools.strokes))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark multi-hand drawing")
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--hands", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--runs", type=int, default=3, help="runs per hand count, best is kept")
+    args = parser.parse_args()
+    
+    for smoothing in (False, True):
+        count, widths = two_hand_strokes(30, smoothing)
+        status = "ok" if count == 2 and min(widths) >= max(widths) - 30 else "FAILED"
+        print(f"two hands, 30 frames, smoothing {'on' if smoothing else 'off'}: "
+              f"{count} strokes, widths {widths} px ({status})")
+    print()
+    
+    print(f"{'hands':>6}{'ms/frame':>10}{'ms/hand':>9}{'hand stages ms':>16}{'tracking ms':>13}"
+          f"{'id changes':>12}{'strokes':>9}")
+    for hands in args.hands:
+        sequence, order = shuffled_sequence(args.frames, hands)
+        results = [run(sequence, order) for _ in range(args.runs)]
+        ms, hand_stages, tracking, id_changes, strokes = min(results)
+        print(f"{hands:>6}{ms:>10.3f}{ms / hands:>9.3f}{hand_stages:>16.3f}{tracking:>13.3f}"
+              f"{id_changes:>12}{strokes:>9}")
+
+if __name__ == "__main__":
+    main()
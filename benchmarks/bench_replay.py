@@ -0,0 +1,95 @@
+"""
+Compare session recordings with video and time deterministic replay
+
+Runs FramePipeline on synthetic landmarks with a SessionRecorder
+attached, drawing with the freehand tool, and also encodes the
+composited frames as an mp4v video, the alternative way to keep a
+session. The frames are a textured background with light sensor noise
+standing in for a camera; real camera video is usually larger still.
+Reports the recording and video sizes, how long the live pipeline and
+a full-speed replay take per frame, and whether the replayed canvas
+matched the recorded checksum.
+
+Usage:
+    python -m benchmarks.bench_replay [--frames N] [--hands 1 2] [--smooth]
+"""
+import argparse
+import os
+import tempfile
+import time
+import cv2
+import numpy as np
+from core.detector_backends import ReplayBackend
+from core.hand_detector import HandDetector
+from core.drawing_tools import DrawingTools
+from core.frame_pipeline import FramePipeline
+from core.session_recording import SessionRecorder, SessionRecording, SessionReplay
+from config.resolution import CANVAS_WIDTH, CANVAS_HEIGHT
+from benchmarks.landmark_data import generate_sequence
+
+def camera_frames(count, seed=0):
+    """
+    Camera-like frames: a fixed texture plus per-frame noise
+    Yields: BGR frames of the canvas size
+    """
+    rng = np.random.default_rng(seed)
+    texture = cv2.GaussianBlur(rng.integers(0, 255, (CANVAS_HEIGHT, CANVAS_WIDTH, 3), dtype=np.uint8), (31, 31), 0)
+    for _ in range(count):
+        noise = rng.integers(-4, 5, texture.shape, dtype=np.int16)
+        yield np.clip(texture + noise, 0, 255).astype(np.uint8)
+
+def record(sequence, path, video_path, smoothing):
+    """
+    Draw the sequence through the pipeline, recording it and encoding the output
+    Returns: live ms per frame
+    """
+    hands = sequence.shape[1]
+    hand_detector = HandDetector(ReplayBackend(sequence, loop=False), max_hands=hands)
+    drawing_tools = DrawingTools(CANVAS_WIDTH, CANVAS_HEIGHT, tiled=False, smoothing=smoothing)
+    pipeline = FramePipeline(hand_detector=hand_detector, drawing_tools=drawing_tools)
+    recorder = SessionRecorder()
+    recorder.attach(drawing_tools)
+    for hand_id in range(hands):
+        drawing_tools.select_hand(hand_id)
+        drawing_tools.set_current_tool("draw")
+    
+    video = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*"mp4v"), 30.0, (CANVAS_WIDTH, CANVAS_HEIGHT))
+    live = 0.0
+    for frame in camera_frames(len(sequence)):
+        start = time.perf_counter()
+        frame = pipeline.render(frame, pipeline.detect(frame))
+        live += time.perf_counter() - start
+        video.write(frame)
+    video.release()
+    recorder.save(path)
+    return live / len(sequence) * 1000.0
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark session recording and replay")
+    parser.add_argument("--frames", type=int, default=900)
+    parser.add_argument("--hands", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--smooth", action="store_true", help="record with stroke smoothing on")
+    args = parser.parse_args()
+    
+    directory = tempfile.mkdtemp(prefix="replay-bench-")
+    print(f"{'hands':>6}{'recording KB':>14}{'video KB':>10}{'ratio':>8}{'B/s @30fps':>12}"
+          f"{'live ms':>9}{'replay ms':>11}{'identical':>11}")
+    for hands in args.hands:
+        path = os.path.join(directory, f"session{hands}.npz")
+        video_path = os.path.join(directory, f"session{hands}.mp4")
+        sequence = generate_sequence(args.frames, num_hands=hands)
+        live_ms = record(sequence, path, video_path, args.smooth)
+        
+        replay = SessionReplay(SessionRecording(path))
+        start = time.perf_counter()
+        drawing_tools = replay.run()
+        replay_ms = (time.perf_counter() - start) / args.frames * 1000.0
+        
+        size = os.path.getsize(path)
+        video_size = os.path.getsize(video_path)
+        print(f"{hands:>6}{size / 1024:>14.1f}{video_size / 1024:>10.0f}{video_size / size:>7.0f}x"
+              f"{size / (args.frames / 30.0):>12.0f}{live_ms:>9.3f}{replay_ms:>11.3f}"
+              f"{str(replay.verify(drawing_tools)):>11}")
+
+if __name__ == "__main__":
+    main()
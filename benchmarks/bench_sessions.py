@@ -0,0 +1,114 @@
+"""
+Load test of many drawing sessions sharing one detector pool
+
+Each simulated session runs its own FramePipeline (canvas, tools, UI) on
+a thread, like one streamlit-webrtc connection, and detects through a
+PooledBackend. Reports aggregate and per-session FPS for each session
+count, plus how many detectors were built.
+
+Usage:
+    python -m benchmarks.bench_sessions [--sessions 1 2 4 8] [--seconds S] [--pool-size N]
+                                        [--backend replay|mediapipe] [--detect-ms MS]
+"""
+import argparse
+import threading
+import time
+import numpy as np
+from core.detector_backends import DetectorBackend, create_backend
+from core.detector_pool import DetectorPool, PooledBackend, default_pool_size
+from core.hand_detector import HandDetector
+from core.frame_pipeline import FramePipeline
+from config.resolution import CANVAS_WIDTH, CANVAS_HEIGHT
+from benchmarks.landmark_data import generate_sequence
+
+class DelayedBackend(DetectorBackend):
+    """Adds a fixed GIL-releasing delay per detection, standing in for model inference"""
+    name = "delayed"
+    
+    def __init__(self, backend, delay):
+        self.backend = backend
+        self.delay = delay
+    
+    def detect(self, frame):
+        time.sleep(self.delay)
+        return self.backend.detect(frame)
+    
+    def draw_landmarks(self, frame, hand_landmarks):
+        self.backend.draw_landmarks(frame, hand_landmarks)
+
+def make_factory(args, landmarks):
+    """Detector factory for the pool"""
+    def factory():
+        kwargs = {"source": landmarks} if args.backend == "replay" else {}
+        backend = create_backend(args.backend, **kwargs)
+        if args.detect_ms:
+            backend = DelayedBackend(backend, args.detect_ms / 1000.0)
+        return HandDetector(backend)
+    return factory
+
+def run_session(pool, seconds, frame_counts, slot, start_event):
+    """Process frames until the time is up, counting them"""
+    pipeline = FramePipeline(hand_detector=HandDetector(PooledBackend(pool)))
+    base_frame = np.full((CANVAS_HEIGHT, CANVAS_WIDTH, 3), 127, dtype=np.uint8)
+    start_event.wait()
+    
+    deadline = time.perf_counter() + seconds
+    frames = 0
+    while time.perf_counter() < deadline:
+        frame = pipeline.mirror(base_frame.copy())
+        pipeline.render(frame, pipeline.detect(frame))
+        frames += 1
+    frame_counts[slot] = frames
+
+def run_load(pool, sessions, seconds):
+    """
+    Run the given number of sessions concurrently
+    Returns: (aggregate fps, per-session fps array)
+    """
+    frame_counts = [0] * sessions
+    start_event = threading.Event()
+    threads = [
+        threading.Thread(target=run_session, args=(pool, seconds, frame_counts, slot, start_event))
+        for slot in range(sessions)
+    ]
+    for thread in threads:
+        thread.start()
+    
+    start = time.perf_counter()
+    start_event.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    
+    per_session = np.array(frame_counts) / elapsed
+    return per_session.sum(), per_session
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent sessions on a shared detector pool")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--pool-size", type=int, default=default_pool_size())
+    parser.add_argument("--backend", default="replay")
+    parser.add_argument("--detect-ms", type=float, default=0.0,
+                        help="extra per-detection delay simulating model inference")
+    args = parser.parse_args()
+    
+    landmarks = generate_sequence(600)
+    factory = make_factory(args, landmarks)
+    try:
+        factory().close()
+    except ImportError as e:
+        print(f"{args.backend} unavailable: {e}")
+        return
+    
+    print(f"Pool size {args.pool_size}, backend {args.backend}, detect delay {args.detect_ms} ms")
+    print(f"{'sessions':>8}{'aggregate fps':>15}{'min fps':>10}{'max fps':>10}{'detectors':>11}{'waits':>8}")
+    for sessions in args.sessions:
+        pool = DetectorPool(args.pool_size, factory)
+        aggregate, per_session = run_load(pool, sessions, args.seconds)
+        print(f"{sessions:>8}{aggregate:>15.1f}{per_session.min():>10.1f}{per_session.max():>10.1f}"
+              f"{len(pool.detectors):>11}{pool.waits:>8}")
+        pool.close()
+
+if __name__ == "__main__":
+    main()
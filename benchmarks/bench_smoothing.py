@@ -0,0 +1,99 @@
+"""
+Compare raw and smoothed freehand drawing
+
+Index-tip paths from the synthetic landmark sequence, with extra
+detector-like jitter, are drawn through DrawingTools at a nominal 30 FPS,
+once connecting raw samples and once through the StrokeSmoother. Reports
+line segments rasterized per second of drawing, the drawing cost per
+frame and how much longer than the generated path the drawn path is,
+which grows with jitter and overdraw.
+
+Usage:
+    python -m benchmarks.bench_smoothing [--frames N] [--jitter PX] [--runs N]
+"""
+import argparse
+import time
+import numpy as np
+from core.drawing_tools import DrawingTools
+from config.resolution import CANVAS_WIDTH, CANVAS_HEIGHT
+from benchmarks.landmark_data import generate_sequence
+
+FRAME_RATE = 30.0
+INDEX_TIP = 8
+
+def make_paths(frames, jitter, seed=0):
+    """
+    Generated and jittered index-tip pixel paths plus the drawing flag of each frame
+    Returns: (reference (n, 2), noisy (n, 2), drawing (n,) bool)
+    """
+    sequence = generate_sequence(frames, seed=seed, draw_period=90)
+    reference = sequence[:, 0, INDEX_TIP, :2] * (CANVAS_WIDTH, CANVAS_HEIGHT)
+    rng = np.random.default_rng(seed + 1)
+    noisy = reference + rng.normal(0, jitter, reference.shape)
+    drawing = (np.arange(frames) // 90) % 2 == 0
+    return reference, noisy, drawing
+
+def draw(path, drawing, smoothing):
+    """
+    Draw a path through the freehand tool
+    Returns: (DrawingTools, seconds spent drawing)
+    """
+    drawing_tools = DrawingTools(smoothing=smoothing)
+    drawing_tools.set_current_tool("draw")
+    start = time.perf_counter()
+    for (x, y), is_drawing in zip(path, drawing):
+        position = (int(round(x)), int(round(y)))
+        drawing_tools.process_drawing(None, {'index_tip': position}, is_drawing)
+    drawing_tools.end_stroke()
+    return drawing_tools, time.perf_counter() - start
+
+def path_length(points):
+    """Length of a polyline"""
+    return float(np.linalg.norm(np.diff(points, axis=0), axis=1).sum()) if len(points) > 1 else 0.0
+
+def summarize(drawing_tools, seconds, reference, drawing, runs):
+    """
+    Segment counts and path-length excess of a drawing
+    Returns: dict of results
+    """
+    strokes = drawing_tools.strokes
+    segments = sum(max(0, int(strokes.counts.data[i]) - 1) for i in range(len(strokes)))
+    drawn = sum(path_length(strokes.get_points(i)) for i in range(len(strokes)))
+    
+    # Generated length of the same drawing periods
+    reference_length = 0.0
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], drawing.astype(np.int8), [0]))))
+    for start, end in zip(edges[::2], edges[1::2]):
+        reference_length += path_length(reference[start:end])
+    
+    drawing_seconds = drawing.sum() / FRAME_RATE
+    return {
+        "strokes": len(strokes),
+        "segments": segments,
+        "segments_per_second": segments / drawing_seconds,
+        "ms_per_frame": seconds / runs / len(drawing) * 1000.0,
+        "length_excess": drawn / reference_length - 1.0,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark freehand stroke smoothing")
+    parser.add_argument("--frames", type=int, default=1800)
+    parser.add_argument("--jitter", type=float, default=1.5, help="extra fingertip noise, pixels (sigma)")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+    
+    reference, noisy, drawing = make_paths(args.frames, args.jitter)
+    print(f"{args.frames} frames at {FRAME_RATE:.0f} FPS, {drawing.sum() / FRAME_RATE:.0f} s of drawing, "
+          f"jitter {args.jitter} px")
+    print(f"{'mode':<10}{'strokes':>8}{'segments':>10}{'segments/s':>12}{'ms/frame':>10}{'length excess':>15}")
+    for name, smoothing in (("raw", False), ("smoothed", True)):
+        seconds = 0.0
+        for _ in range(args.runs):
+            drawing_tools, elapsed = draw(noisy, drawing, smoothing)
+            seconds += elapsed
+        result = summarize(drawing_tools, seconds, reference, drawing, args.runs)
+        print(f"{name:<10}{result['strokes']:>8}{result['segments']:>10}{result['segments_per_second']:>12.1f}"
+              f"{result['ms_per_frame']:>10.3f}{result['length_excess']:>14.1%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Compare grid-indexed stroke hit tests against scanning every stroke
+
+Fills a StrokeStore with short freehand strokes plus some lines,
+rectangles and circles, then hit-tests random fingertip positions two
+ways, best of three calls each: through the store's grid index, and by
+measuring the distance to every stroke in one vectorized pass (what
+picking a stroke costs without an index). Both must return the same
+strokes. Also times the stroke eraser removing the strokes under a
+point, which only redraws the bounds of each removed stroke, against
+re-rasterizing the whole mask. Hit tests must stay under 1 ms at p95
+and an erase within the per-frame latency budget.
+
+Usage:
+    python -m benchmarks.bench_stroke_index [--strokes 10000 50000] [--queries N]
+"""
+import argparse
+import time
+import numpy as np
+from core.drawing_tools import DrawingTools
+from core.stroke_store import CIRCLE, ERASE, FREEHAND, LINE, RECTANGLE
+from config.settings import HIT_RADIUS, QUALITY_LATENCY_BUDGET
+from config.resolution import CANVAS_WIDTH, CANVAS_HEIGHT
+
+# Budgets checked for every board size, milliseconds
+HIT_TEST_BUDGET = 1.0
+ERASE_BUDGET = QUALITY_LATENCY_BUDGET
+
+def fill_strokes(drawing_tools, count, seed=0):
+    """Add count random strokes straight to the store, then rasterize the mask once"""
+    rng = np.random.default_rng(seed)
+    strokes = drawing_tools.strokes
+    size = np.array((CANVAS_WIDTH, CANVAS_HEIGHT))
+    for i in range(count):
+        start = rng.uniform(0, size)
+        kind = (FREEHAND, FREEHAND, FREEHAND, LINE, RECTANGLE, CIRCLE)[i % 6]
+        if kind == FREEHAND:
+            points = np.clip(start + np.cumsum(rng.uniform(-6, 6, (12, 2)), axis=0), 0, size - 1)
+        else:
+            points = np.array((start, np.clip(start + rng.uniform(-40, 40, 2), 0, size - 1)))
+        radius = float(rng.uniform(5, 30)) if kind == CIRCLE else 0.0
+        strokes.add_stroke(kind, points[:1] if kind == CIRCLE else points, int(rng.integers(2, 8)), 255, radius)
+    drawing_tools.rebuild_mask()
+
+def scan_hits(strokes, x, y, radius):
+    """
+    Hit test without the index: distance to every visible stroke at once
+    Returns: int array of stroke indices, newest last
+    """
+    indices = np.flatnonzero((strokes.kinds.view() != ERASE) & ~strokes.hidden.view())
+    reach = radius + strokes.thicknesses.data[indices] / 2.0
+    return indices[strokes.distances(indices, x, y) <= reach]
+
+def best_time(function, *args, repeats=3):
+    """
+    Fastest of a few calls, so one scheduler hiccup does not count as a slow query
+    Returns: seconds
+    """
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def percentiles(times):
+    """
+    p50 and p95 of a list of durations in seconds
+    Returns: (p50 ms, p95 ms)
+    """
+    return tuple(float(v) * 1000.0 for v in np.percentile(times, (50, 95)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the stroke index against a linear scan")
+    parser.add_argument("--strokes", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    
+    print(f"{'strokes':>8}{'grid p50':>10}{'grid p95':>10}{'scan p50':>10}{'scan p95':>10}"
+          f"{'erase ms':>10}{'full raster ms':>16}{'same hits':>11}{'in budget':>11}")
+    for count in args.strokes:
+        drawing_tools = DrawingTools(CANVAS_WIDTH, CANVAS_HEIGHT, tiled=False, smoothing=False)
+        fill_strokes(drawing_tools, count)
+        strokes = drawing_tools.strokes
+        rng = np.random.default_rng(1)
+        positions = rng.integers(0, (CANVAS_WIDTH, CANVAS_HEIGHT), (args.queries, 2))
+        
+        grid_times = [best_time(strokes.hit_test, x, y, HIT_RADIUS) for x, y in positions.tolist()]
+        scan_times = [best_time(scan_hits, strokes, x, y, HIT_RADIUS) for x, y in positions.tolist()]
+        same = all(np.array_equal(scan_hits(strokes, x, y, HIT_RADIUS), strokes.hit_test(x, y, HIT_RADIUS))
+                   for x, y in positions.tolist())
+        
+        # Each erase is undone again so every position hits the full store
+        erase_times = []
+        for x, y in positions[:50].tolist():
+            start = time.perf_counter()
+            drawing_tools.erase_strokes((x, y))
+            drawing_tools.end_stroke()
+            erase_times.append(time.perf_counter() - start)
+            if drawing_tools.history.can_undo():
+                drawing_tools.undo()
+        start = time.perf_counter()
+        strokes.rasterize()
+        full = (time.perf_counter() - start) * 1000.0
+        
+        grid_p50, grid_p95 = percentiles(grid_times)
+        scan_p50, scan_p95 = percentiles(scan_times)
+        erase = np.median(erase_times) * 1000.0
+        in_budget = grid_p95 < HIT_TEST_BUDGET and erase < ERASE_BUDGET
+        print(f"{count:>8}{grid_p50:>10.3f}{grid_p95:>10.3f}{scan_p50:>10.3f}{scan_p95:>10.3f}"
+              f"{erase:>10.3f}{full:>16.1f}{str(same):>11}{str(in_budget):>11}")
+    print(f"Budgets: hit test p95 {HIT_TEST_BUDGET:.1f} ms, erase {ERASE_BUDGET:.1f} ms")
+
+if __name__ == "__main__":
+    main()
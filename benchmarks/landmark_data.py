@@ -0,0 +1,101 @@
+"""
+Deterministic synthetic landmark sequences for benchmarks
+"""
+import numpy as np
+from core.detector_backends import NUM_LANDMARKS
+
+# Joint offsets of an open hand relative to the wrist, normalized units
+FINGER_ANGLES = (-2.3, -1.85, -1.57, -1.3, -1.05)  # thumb .. pinky, radians
+JOINT_SPACING = 0.035
+
+# Curled fingers (0 = thumb) and thumb-to-index pinch of each gesture
+GESTURE_POSES = {
+    "point": ((0, 2, 3, 4), False),
+    "pinch": ((), True),
+    "open palm": ((), False),
+    "fist": ((0, 1, 2, 3, 4), False),
+    "two fingers": ((0, 3, 4), False),
+}
+
+def make_hand(center_x, center_y, drawing=True, curled=None, pinch=False):
+    """
+    Build one hand pointing up with the index tip at (center_x, center_y)
+    curled lists the fingers (0 = thumb) folded back toward the palm; by
+    default only the middle finger curls, when the hand is not drawing.
+    pinch moves the thumb tip onto the index tip.
+    Returns: (21, 3) float32 array of normalized landmarks
+    """
+    if curled is None:
+        curled = () if drawing else (2,)
+    points = np.zeros((NUM_LANDMARKS, 3), dtype=np.float32)
+    wrist_x, wrist_y = center_x, center_y + 4.5 * JOINT_SPACING
+    points[0, :2] = (wrist_x, wrist_y)
+    
+    for finger, angle in enumerate(FINGER_ANGLES):
+        dx, dy = np.cos(angle), np.sin(angle)
+        for joint in range(4):
+            index = 1 + finger * 4 + joint
+            distance = (1.2 + joint) * JOINT_SPACING
+            # Curled fingers fold back from their middle joint
+            if finger in curled and joint >= 2:
+                distance = 1.2 * JOINT_SPACING
+            points[index, 0] = wrist_x + dx * distance
+            points[index, 1] = wrist_y + dy * distance
+    
+    if pinch:
+        points[4] = points[8] + (0.15 * JOINT_SPACING, 0.0, 0.0)
+    
+    # Index tip is the drawing position
+    points[:, 0] += center_x - points[8, 0]
+    points[:, 1] += center_y - points[8, 1]
+    return points
+
+def generate_sequence(num_frames=600, num_hands=1, seed=0, draw_period=45):
+    """
+    Generate hands tracing smooth Lissajous curves below the toolbar
+    Returns: (num_frames, num_hands, 21, 3) float32 array
+    """
+    rng = np.random.default_rng(seed)
+    sequence = np.zeros((num_frames, num_hands, NUM_LANDMARKS, 3), dtype=np.float32)
+    phases = rng.uniform(0, 2 * np.pi, size=(num_hands, 2))
+    
+    for frame in range(num_frames):
+        t = frame / 60.0
+        drawing = (frame // draw_period) % 2 == 0
+        for hand in range(num_hands):
+            x = 0.5 + 0.3 * np.sin(1.3 * t + phases[hand, 0])
+            y = 0.55 + 0.25 * np.sin(0.9 * t + phases[hand, 1])
+            sequence[frame, hand] = make_hand(x, y, drawing)
+    
+    # Small jitter like a real detector
+    sequence[..., :2] += rng.normal(0, 0.001, size=sequence[..., :2].shape).astype(np.float32)
+    return sequence
+
+def generate_gesture_sequence(num_frames=600, num_hands=1, seed=0, hold=30):
+    """
+    Hands moving like generate_sequence while cycling through gestures
+    Each hand holds every pose of GESTURE_POSES for hold frames, offset
+    from the other hands.
+    Returns: ((num_frames, num_hands, 21, 3) float32 array,
+              (num_frames, num_hands) list of gesture names)
+    """
+    rng = np.random.default_rng(seed)
+    names = list(GESTURE_POSES)
+    sequence = np.zeros((num_frames, num_hands, NUM_LANDMARKS, 3), dtype=np.float32)
+    labels = []
+    phases = rng.uniform(0, 2 * np.pi, size=(num_hands, 2))
+    
+    for frame in range(num_frames):
+        t = frame / 60.0
+        frame_labels = []
+        for hand in range(num_hands):
+            name = names[(frame // hold + hand) % len(names)]
+            curled, pinch = GESTURE_POSES[name]
+            x = 0.5 + 0.3 * np.sin(1.3 * t + phases[hand, 0])
+            y = 0.55 + 0.25 * np.sin(0.9 * t + phases[hand, 1])
+            sequence[frame, hand] = make_hand(x, y, curled=curled, pinch=pinch)
+            frame_labels.append(name)
+        labels.append(frame_labels)
+    
+    sequence[..., :2] += rng.normal(0, 0.001, size=sequence[..., :2].shape).astype(np.float32)
+    return sequence, labels
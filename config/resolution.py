@@ -0,0 +1,72 @@
+"""
+Runtime resolution configuration for capture, detection, canvas and display
+"""
+from config.settings import CAPTURE_RESOLUTION, CANVAS_RESOLUTION, DETECTION_RESOLUTION, DISPLAY_RESOLUTION
+
+def parse_resolution(text):
+    """
+    Parse a WIDTHxHEIGHT string such as "1920x1080"
+    Returns: (width, height) tuple, None for an empty string or "none"
+    """
+    if not text or text.lower() == "none":
+        return None
+    try:
+        width, height = (int(v) for v in text.lower().split("x"))
+    except ValueError:
+        raise ValueError(f"Expected a resolution like 1280x720, got {text!r}")
+    if width <= 0 or height <= 0:
+        raise ValueError(f"Resolution must be positive, got {text!r}")
+    return width, height
+
+class ResolutionConfig:
+    """
+    Independent resolutions of each stage of the frame path
+    Capture is what is requested from the camera. Frames are drawn on
+    and composited at the canvas resolution, hands are detected on a
+    copy no larger than the detection resolution, and the result is
+    shown or streamed at the display resolution. Landmarks stay
+    normalized until they are mapped to canvas pixels, so each stage
+    can change without touching the others. A stage left as None
+    follows the one it derives from: canvas follows capture, detection
+    and display follow canvas. Capture derives from nothing, so None
+    requests CAPTURE_RESOLUTION.
+    """
+    
+    def __init__(self, capture=CAPTURE_RESOLUTION, canvas=CANVAS_RESOLUTION,
+                 detection=DETECTION_RESOLUTION, display=DISPLAY_RESOLUTION):
+        self.capture = tuple(capture or CAPTURE_RESOLUTION)
+        self.canvas = tuple(canvas) if canvas else None
+        self.detection = tuple(detection) if detection else None
+        self.display = tuple(display) if display else None
+    
+    @property
+    def canvas_size(self):
+        """(width, height) drawn on and composited at"""
+        return self.canvas or self.capture
+    
+    @property
+    def detection_size(self):
+        """(width, height) bound of the frames fed to the detector"""
+        return self.detection or self.canvas_size
+    
+    @property
+    def display_size(self):
+        """(width, height) of the frames shown or streamed"""
+        return self.display or self.canvas_size
+    
+    def with_capture(self, capture):
+        """
+        Copy of this configuration for the resolution a camera actually delivers
+        Returns: new ResolutionConfig; unset stages follow the new capture size
+        """
+        return ResolutionConfig(capture, self.canvas, self.detection, self.display)
+    
+    def describe(self):
+        """One-line summary of every stage"""
+        return ", ".join(f"{name} {w}x{h}" for name, (w, h) in (
+            ("capture", self.capture), ("canvas", self.canvas_size),
+            ("detection", self.detection_size), ("display", self.display_size),
+        ))
+
+# Canvas size of the default configuration, for components built without one
+CANVAS_WIDTH, CANVAS_HEIGHT = ResolutionConfig().canvas_size
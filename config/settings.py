@@ -55,19 +55,56 @@
 Configuration settings for the Virtual Drawing Application
 """
 
-# Window dimensions
-WINDOW_WIDTH = 640
-WINDOW_HEIGHT = 480
+# Resolutions as (width, height), see config/resolution.py
+CAPTURE_RESOLUTION = (640, 480)  # Requested from the camera
+CANVAS_RESOLUTION = None         # Drawing and compositing, None = capture
+DETECTION_RESOLUTION = None      # Largest detector input, None = canvas
+DISPLAY_RESOLUTION = None        # Shown or streamed frames, None = canvas
 
 # Hand detection parameters
 MIN_DETECTION_CONFIDENCE = 0.5
 MIN_TRACKING_CONFIDENCE = 0.5
 MAX_NUM_HANDS = 1
+HAND_MATCH_DISTANCE = 0.25  # Farthest a wrist may move between frames and keep its id, fraction of frame diagonal
+HAND_LOST_FRAMES = 15       # Frames an unseen hand keeps its id before it is released
 
 # Drawing parameters
 DEFAULT_THICKNESS = 3
 ERASER_RADIUS = 20
-INDEX_FINGER_THRESHOLD = 30
+INDEX_FINGER_THRESHOLD = 0.0625  # Middle tip above its PIP joint, fraction of frame height
+MASK_BACKGROUND = 255  # Mask value where nothing is drawn
+MASK_INK = 0           # Mask value of committed strokes
+COMPOSITE_TILE_SIZE = 32  # Tile size used to skip empty canvas regions when compositing
+HISTORY_TILE_SIZE = 64    # Tile size of undo/redo deltas
+HISTORY_MEMORY_BUDGET = 8 * 1024 * 1024  # Bytes of undo history kept per canvas
+STROKE_INDEX_CELL_SIZE = 32  # Grid cell size of the stroke index used for hit tests, pixels
+HIT_RADIUS = 12              # Fingertip reach of the stroke eraser and the move tool, pixels
+
+# Freehand stroke smoothing
+STROKE_SMOOTHING = False          # Filter and spline-fit freehand samples before drawing
+SMOOTHING_MIN_CUTOFF = 1.5        # One-Euro cutoff at rest, Hz
+SMOOTHING_BETA = 0.05             # One-Euro cutoff increase per pixel/second of speed
+SMOOTHING_DERIVATIVE_CUTOFF = 1.0  # One-Euro cutoff of the speed estimate, Hz
+SMOOTHING_FRAME_RATE = 30.0       # Nominal sample rate when no timestamps are given
+SMOOTHING_MIN_DISTANCE = 3.0      # Filtered moves shorter than this are dropped, pixels
+SPLINE_TOLERANCE = 0.5            # Largest gap between a spline and its line segments, pixels
+SPLINE_MAX_SUBDIVISIONS = 8       # Line segments per spline segment at most
+
+# Gesture control
+GESTURE_CONTROL = False         # Drive drawing with hand gestures instead of the raised finger
+GESTURE_BEND_THRESHOLD = 90.0   # Fingers bent less than this in total count as extended, degrees
+GESTURE_PINCH_THRESHOLD = 0.35  # Thumb-index tip gap of a pinch, fraction of palm length
+GESTURE_PINCH_REACH = 1.2       # Index tip distance from the wrist in a pinch, palm lengths
+GESTURE_STABLE_FRAMES = 3       # Frames a gesture must last before it takes effect
+GESTURE_CLEAR_FRAMES = 20       # Frames a fist must be held to clear the canvas
+
+# Infinite canvas parameters
+TILED_CANVAS = False   # Draw on an unbounded, lazily allocated tiled canvas
+CANVAS_TILE_SIZE = 128  # Tile size of the tiled canvas (also its undo tile size)
+MIN_ZOOM = 0.25
+MAX_ZOOM = 4.0
+PAN_STEP = 40          # Screen pixels moved per pan key press
+ZOOM_STEP = 1.25       # Zoom factor per zoom key press
 
 # Tool positioning
 TOOL_MARGIN_LEFT = 50
@@ -79,14 +116,80 @@ COLORS = {
     "line_preview": (255, 0, 0),        # Blue
     "rectangle_preview": (0, 255, 0),   # Green
     "circle_preview": (0, 0, 255),      # Red
-    "circle_mask": (0, 0, 0),           # Black for mask
-    "eraser": (255, 255, 255),          # White
     "ui_background": (50, 50, 50),      # Dark gray
     "ui_text": (255, 255, 255),         # White
     "ui_active": (0, 255, 255),         # Yellow
 }
 
+# Color layers
+COLOR_CANVAS = False               # Draw in colors on a stack of RGBA layers (fixed canvas only)
+DEFAULT_STROKE_COLOR = (255, 0, 0)  # BGR color of strokes drawn without choosing one, blue
+PALETTE = {                        # Colors offered by main.py and app.py, BGR
+    "blue": (255, 0, 0),
+    "red": (0, 0, 255),
+    "green": (0, 160, 0),
+    "yellow": (0, 220, 255),
+    "purple": (200, 0, 150),
+    "black": (0, 0, 0),
+}
+BRUSH_WIDTHS = [2, 3, 6, 12]       # Brush widths offered by main.py, pixels
+MAX_LAYERS = 8                     # Layers a canvas may hold
+
 # UI settings
 UI_HEADER_HEIGHT = 80
 UI_TOOL_SIZE = 50
-UI_SPACING = 10
\ No newline at end of file
+UI_SPACING = 10
+
+# Pipeline settings
+PIPELINED_DETECTION = False  # Run hand detection on a background thread
+FPS_WINDOW_SIZE = 30         # Frames averaged by the FPS counters
+PROFILING = False            # Time each pipeline stage (overlay, log line, snapshot)
+PROFILE_WINDOW_SIZE = 120    # Frames kept in each stage's rolling histogram
+PROFILE_LOG_INTERVAL = 5.0   # Seconds between profile log lines, 0 disables them
+DETECTOR_BACKEND = "mediapipe"          # "mediapipe" or "replay"
+REPLAY_LANDMARKS_PATH = "landmarks.npy"  # Recorded landmarks for the replay backend
+DETECTOR_POOL_SIZE = 0                   # Detectors shared by web sessions, 0 = one per CPU core
+
+# Out-of-process detection service for the web app
+DETECTION_SERVICE = False        # Detect in worker processes instead of the detector pool
+DETECTION_SERVICE_WORKERS = 0    # Worker processes, 0 = one per CPU core
+DETECTION_SERVICE_SLOTS = 2      # Shared-memory frame slots per worker
+DETECTION_SERVICE_TIMEOUT = 2.0  # Seconds to wait for a worker before giving up
+
+# Region-of-interest tracking
+ROI_TRACKING = False       # Detect on a crop around the previous hand
+ROI_EXPANSION = 1.6        # Crop side relative to the landmark bounding box
+ROI_INFERENCE_SIZE = 256   # Longest crop side fed to the detector, pixels
+ROI_MIN_SIZE = 96          # Smallest crop side, pixels
+ROI_RESCAN_INTERVAL = 15   # Frames between full scans while fewer than the maximum hands are tracked
+
+# Frame-skipping detection
+DETECTION_SKIP_FACTOR = 1   # Run inference every N frames, 1 disables skipping
+ADAPTIVE_SKIP = False       # Also run inference early on fast motion
+SKIP_MOTION_THRESHOLD = 12  # Predicted index tip motion that forces inference, pixels
+
+# Adaptive quality for the web app
+ADAPTIVE_QUALITY = False        # Trade detection quality for latency under load
+QUALITY_LATENCY_BUDGET = 50.0   # Target transform latency, milliseconds
+QUALITY_RECOVER_RATIO = 0.6     # Restore quality only below this fraction of the budget
+QUALITY_DEGRADE_FRAMES = 15     # Frames over budget before lowering quality
+QUALITY_RECOVER_FRAMES = 90     # Frames under the recover threshold before raising it
+QUALITY_SMOOTHING = 0.1         # Weight of the newest frame in the latency average
+QUALITY_LEVELS = [              # Best first: detection scale, skip factor, skeleton drawing
+    (1.0, 1, True),
+    (1.0, 1, False),
+    (0.75, 2, False),
+    (0.5, 2, False),
+    (0.5, 3, False),
+]
+
+# Canvas autosave
+AUTOSAVE = False          # Keep each canvas in a memory-mapped file and restore it on restart
+AUTOSAVE_DIR = "autosave"  # Directory of the per-session canvas files
+AUTOSAVE_INTERVAL = 1.0   # Seconds between background saves
+AUTOSAVE_BAND_ROWS = 32   # Mask rows per dirty band synced to disk
+
+# Collaborative canvas for the web app
+COLLABORATION = False                  # Every session of app.py draws on one shared board
+COLLAB_LOG_BYTES = 4 * 1024 * 1024     # Operation log kept for sessions that fall behind
+COLLAB_POLL_BYTES = 256 * 1024         # Operation bytes a session applies per frame at most
@@ -0,0 +1,306 @@
+"""
+Crash-safe canvas autosave backed by a memory-mapped file
+"""
+import mmap
+import os
+import queue
+import threading
+import time
+import numpy as np
+from core.stroke_store import StrokeStore, STROKE_ARRAYS
+from config.settings import AUTOSAVE_DIR, AUTOSAVE_INTERVAL, AUTOSAVE_BAND_ROWS, MASK_BACKGROUND
+
+# Header page of the mask file, as uint64 words
+HEADER_SIZE = mmap.PAGESIZE
+MAGIC = int.from_bytes(b"VDCANVAS", "little")
+VERSION = 1
+MAGIC_WORD, VERSION_WORD, WIDTH_WORD, HEIGHT_WORD, SEQUENCE_WORD, SYNCED_WORD = range(6)
+
+def session_paths(session_id, directory=AUTOSAVE_DIR):
+    """
+    Files holding one session's canvas
+    Returns: (mask file path, strokes file path)
+    """
+    base = os.path.join(directory, session_id)
+    return base + ".mask", base + ".strokes.npz"
+
+class CanvasAutosave:
+    """
+    Keeps a session's canvas on disk without slowing down the frame loop
+    The fixed drawing mask is a view of a memory-mapped file, so every
+    stroke is in the OS page cache the moment it is drawn and survives a
+    crash of the process. The frame loop only flags dirty bands of rows
+    and bumps a change counter in the file header; every interval a
+    background thread msyncs the dirty bands and atomically replaces the
+    vector strokes file. On reload the mapped mask is used as-is when its
+    live and synced counters both match the strokes file, otherwise it is
+    re-rasterized from the strokes, so a half-written save is never
+    trusted. Tiled canvases only persist their strokes and redraw tiles
+    on reload.
+    """
+    
+    def __init__(self, session_id, directory=AUTOSAVE_DIR, interval=AUTOSAVE_INTERVAL,
+                 band_rows=AUTOSAVE_BAND_ROWS):
+        self.mask_path, self.strokes_path = session_paths(session_id, directory)
+        self.directory = directory
+        self.interval = interval
+        self.band_rows = band_rows
+        
+        self.mmap = None
+        self.header = None
+        self.mask = None
+        self.dirty_bands = np.zeros(0, dtype=bool)
+        self.sequence = 0
+        self.saved_sequence = 0
+        self.last_save = time.monotonic()
+        
+        # One save in flight at most; the frame loop never waits for it
+        self.jobs = queue.Queue(maxsize=1)
+        self.idle = threading.Event()
+        self.idle.set()
+        self.saves = 0
+        self.save_seconds = 0.0
+        self.thread = None
+    
+    def attach(self, drawing_tools):
+        """
+        Restore a saved canvas into drawing_tools and start autosaving it
+        Returns: True if a previous drawing was restored
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        drawing_tools.end_all_strokes()
+        restored = self.restore(drawing_tools)
+        drawing_tools.autosave = self
+        
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        if not restored:
+            self.save_now(drawing_tools.strokes)
+        return restored
+    
+    def restore(self, drawing_tools):
+        """
+        Load the strokes file and map the mask file, if they exist
+        Returns: True if strokes were restored
+        """
+        strokes, sequence = None, None
+        if os.path.exists(self.strokes_path):
+            try:
+                strokes, sequence = self.load_strokes(self.strokes_path)
+                self.sequence = self.saved_sequence = sequence
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Ignoring unreadable autosave {self.strokes_path}: {e}")
+        
+        if drawing_tools.canvas is not None:
+            if strokes is not None:
+                drawing_tools.strokes = strokes
+                drawing_tools.rebuild_tiles()
+            return strokes is not None
+        
+        width, height = drawing_tools.width, drawing_tools.height
+        if strokes is not None and (strokes.width, strokes.height) != (width, height):
+            strokes.rescale(width, height)
+        
+        # The mapped mask is only trusted when nothing was drawn after the last save
+        if strokes is None:
+            self.map(width, height)
+            self.mask[:] = drawing_tools.mask
+            self.mark_all_dirty()
+        elif not self.map_existing(width, height, sequence):
+            self.map(width, height)
+            strokes.rasterize(mask=self.mask)
+            self.mark_all_dirty()
+        
+        if strokes is not None:
+            drawing_tools.strokes = strokes
+            drawing_tools.history.clear()
+        drawing_tools.mask = self.mask
+        drawing_tools.compositor.mark_all_dirty()
+        drawing_tools.rebuild_layers()
+        return strokes is not None
+    
+    def load_strokes(self, path):
+        """
+        Read a strokes file written by a save
+        Returns: (StrokeStore, change counter it was saved at)
+        """
+        with np.load(path) as data:
+            width, height = (int(v) for v in data["size"])
+            strokes = StrokeStore(width, height)
+            strokes.restore({name: data[name] for name in STROKE_ARRAYS if name in data})
+            return strokes, int(data["sequence"])
+    
+    def map_existing(self, width, height, sequence):
+        """
+        Map the mask file left by an earlier run
+        Returns: True if it matches the canvas size and the saved strokes
+        """
+        if not os.path.exists(self.mask_path):
+            return False
+        if os.path.getsize(self.mask_path) != HEADER_SIZE + width * height:
+            return False
+        with open(self.mask_path, "r+b") as f:
+            mapping = mmap.mmap(f.fileno(), 0)
+        header = np.ndarray((8,), dtype=np.uint64, buffer=mapping)
+        expected = (MAGIC, VERSION, width, height, sequence, sequence)
+        if tuple(int(v) for v in header[:6]) != expected:
+            del header
+            mapping.close()
+            return False
+        
+        self.use_mapping(mapping, header, width, height)
+        self.sequence = self.saved_sequence = sequence
+        return True
+    
+    def map(self, width, height):
+        """
+        Back the mask with a new blank file of the given size
+        Returns: the mapped mask
+        """
+        # A new file replaces the old one, so views of the old mapping stay valid
+        temp_path = self.mask_path + ".tmp"
+        with open(temp_path, "w+b") as f:
+            f.truncate(HEADER_SIZE + width * height)
+            mapping = mmap.mmap(f.fileno(), 0)
+        os.replace(temp_path, self.mask_path)
+        
+        header = np.ndarray((8,), dtype=np.uint64, buffer=mapping)
+        header[:4] = (MAGIC, VERSION, width, height)
+        self.use_mapping(mapping, header, width, height)
+        self.mask.fill(MASK_BACKGROUND)
+        header[SEQUENCE_WORD] = self.sequence
+        return self.mask
+    
+    def use_mapping(self, mapping, header, width, height):
+        """Switch to a mapped file; the previous mapping closes once unused"""
+        self.mmap = mapping
+        self.header = header
+        self.mask = np.ndarray((height, width), dtype=np.uint8, buffer=mapping, offset=HEADER_SIZE)
+        self.dirty_bands = np.zeros((height + self.band_rows - 1) // self.band_rows, dtype=bool)
+    
+    def mark_dirty(self, x1, y1, x2, y2):
+        """Record a changed region of the canvas (frame thread, no I/O)"""
+        self.sequence += 1
+        if self.header is None:
+            return
+        self.header[SEQUENCE_WORD] = self.sequence
+        y1 = max(0, int(y1)) // self.band_rows
+        y2 = (min(self.mask.shape[0], int(y2)) + self.band_rows - 1) // self.band_rows
+        self.dirty_bands[y1:y2] = True
+    
+    def mark_all_dirty(self):
+        """Record that the whole canvas changed"""
+        self.sequence += 1
+        if self.header is not None:
+            self.header[SEQUENCE_WORD] = self.sequence
+            self.dirty_bands[:] = True
+    
+    def remap(self, width, height):
+        """
+        Map a blank mask of a new size for a rebuilt canvas
+        Returns: the mapped mask
+        """
+        mask = self.map(width, height)
+        self.mark_all_dirty()
+        return mask
+    
+    def tick(self, strokes):
+        """
+        Hand a save to the background thread when one is due (frame thread)
+        Never blocks: a due save is skipped while the previous one runs.
+        """
+        if self.sequence == self.saved_sequence or not self.idle.is_set():
+            return
+        now = time.monotonic()
+        if now - self.last_save < self.interval:
+            return
+        self.last_save = now
+        self.submit(strokes)
+    
+    def submit(self, strokes):
+        """Snapshot the strokes and dirty bands and queue them for saving"""
+        bands = np.flatnonzero(self.dirty_bands)
+        self.dirty_bands[:] = False
+        job = (strokes.snapshot(), (strokes.width, strokes.height), bands, self.sequence, self.mmap,
+               self.header)
+        self.saved_sequence = self.sequence
+        self.idle.clear()
+        self.jobs.put_nowait(job)
+    
+    def save_now(self, strokes):
+        """Save synchronously, waiting for any save already in flight"""
+        self.idle.wait()
+        self.submit(strokes)
+        self.idle.wait()
+    
+    def _run(self):
+        """Background thread: write queued saves"""
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            start = time.perf_counter()
+            try:
+                self.write(*job)
+            except OSError as e:
+                print(f"Autosave failed: {e}")
+            self.save_seconds += time.perf_counter() - start
+            self.saves += 1
+            self.idle.set()
+    
+    def write(self, snapshot, size, bands, sequence, mapping, header):
+        """Sync the dirty mask bands, then atomically replace the strokes file"""
+        if mapping is not None and len(bands):
+            width = int(header[WIDTH_WORD])
+            page = mmap.PAGESIZE
+            for first, last in self.band_runs(bands):
+                start = HEADER_SIZE + first * self.band_rows * width
+                end = min(len(mapping), HEADER_SIZE + (last + 1) * self.band_rows * width)
+                aligned = start - start % page
+                mapping.flush(aligned, end - aligned)
+        
+        temp_path = self.strokes_path + ".tmp.npz"
+        np.savez(temp_path, size=np.array(size), sequence=np.array(sequence), **snapshot)
+        with open(temp_path, "rb") as f:
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.strokes_path)
+        
+        # Written last, so a synced counter means the mask file is complete on disk
+        if header is not None:
+            header[SYNCED_WORD] = sequence
+            mapping.flush(0, HEADER_SIZE)
+    
+    def band_runs(self, bands):
+        """
+        Group sorted band indices into consecutive runs
+        Yields: (first band, last band) pairs
+        """
+        first = last = int(bands[0])
+        for band in bands[1:]:
+            band = int(band)
+            if band != last + 1:
+                yield first, last
+                first = band
+            last = band
+        yield first, last
+    
+    def close(self, drawing_tools=None):
+        """Save outstanding changes, stop the thread and release the mapping"""
+        if self.thread is None:
+            return
+        if drawing_tools is not None:
+            drawing_tools.end_all_strokes()
+            if self.sequence != self.saved_sequence:
+                self.save_now(drawing_tools.strokes)
+        self.idle.wait()
+        self.jobs.put(None)
+        self.thread.join()
+        self.thread = None
+        
+        # The drawing keeps working from memory once the file is released
+        if drawing_tools is not None:
+            if self.mask is not None and drawing_tools.mask is self.mask:
+                drawing_tools.mask = self.mask.copy()
+            drawing_tools.autosave = None
+        self.mask = self.header = None
+        self.mmap = None
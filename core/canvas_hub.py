@@ -0,0 +1,404 @@
+"""
+Shared drawing board: sessions exchange canvas changes through a hub
+"""
+import struct
+import threading
+import time
+from collections import deque
+import numpy as np
+from core.drawing_tools import DrawingTools
+from core.history import compress_tile, decompress_tile
+from config.settings import (
+    COLLAB_LOG_BYTES, COLLAB_POLL_BYTES, MASK_BACKGROUND, TILED_CANVAS
+)
+
+# Operation kinds
+STROKES, TILES, CLEAR = range(3)
+OP_NAMES = ("strokes", "tiles", "clear")
+
+# Per-stroke arrays of a stroke snapshot, in payload order, their types and values per stroke
+STROKE_FIELDS = (("counts", np.int32, 1), ("kinds", np.uint8, 1), ("thicknesses", np.uint16, 1),
+                 ("values", np.uint8, 1), ("radii", np.float32, 1), ("colors", np.uint8, 3),
+                 ("layers", np.uint8, 1), ("hidden", np.bool_, 1))
+TILE_HEADER = struct.Struct("<iiHHI")
+
+def encode_strokes(snapshot):
+    """
+    Pack a stroke snapshot into bytes
+    Returns: bytes of a STROKES payload
+    """
+    counts = snapshot["counts"]
+    parts = [struct.pack("<II", len(counts), len(snapshot["points"]))]
+    for name, dtype, _ in STROKE_FIELDS:
+        parts.append(np.asarray(snapshot[name], dtype=dtype).tobytes())
+    parts.append(np.asarray(snapshot["points"], dtype=np.float32).tobytes())
+    return b"".join(parts)
+
+def decode_strokes(payload):
+    """
+    Inverse of encode_strokes
+    Returns: dict of arrays accepted by StrokeStore.restore()
+    """
+    strokes, points = struct.unpack_from("<II", payload)
+    offset = 8
+    snapshot = {}
+    for name, dtype, width in STROKE_FIELDS:
+        snapshot[name] = np.frombuffer(payload, dtype=dtype, count=strokes * width, offset=offset)
+        if width > 1:
+            snapshot[name] = snapshot[name].reshape(strokes, width)
+        offset += strokes * width * np.dtype(dtype).itemsize
+    snapshot["points"] = np.frombuffer(payload, dtype=np.float32, count=points * 2,
+                                       offset=offset).reshape(points, 2)
+    return snapshot
+
+def encode_tiles(history, surface, keys):
+    """
+    Pack the current contents of surface tiles, zlib-compressed
+    Returns: bytes of a TILES payload
+    """
+    parts = [struct.pack("<II", history.tile_size, len(keys))]
+    for row, col in keys:
+        data = history.read_tile(surface, row, col)
+        height, width = (0, 0) if data is None else data.shape
+        compressed = compress_tile(data)
+        parts.append(TILE_HEADER.pack(row, col, height, width, len(compressed)))
+        parts.append(compressed)
+    return b"".join(parts)
+
+def decode_tiles(payload):
+    """
+    Inverse of encode_tiles
+    Returns: (tile size, list of (row, col, shape, compressed data))
+    """
+    tile_size, count = struct.unpack_from("<II", payload)
+    offset = 8
+    tiles = []
+    for _ in range(count):
+        row, col, height, width, length = TILE_HEADER.unpack_from(payload, offset)
+        offset += TILE_HEADER.size
+        tiles.append((row, col, (height, width), payload[offset:offset + length]))
+        offset += length
+    return tile_size, tiles
+
+def tile_keys(tile_size, rects):
+    """(row, col) of every tile covered by a list of (x1, y1, x2, y2) rectangles"""
+    keys = []
+    for x1, y1, x2, y2 in rects:
+        for row in range(int(y1) // tile_size, (int(y2) - 1) // tile_size + 1):
+            for col in range(int(x1) // tile_size, (int(x2) - 1) // tile_size + 1):
+                if (row, col) not in keys:
+                    keys.append((row, col))
+    return keys
+
+def strokes_open(drawing_tools):
+    """True while any hand of drawing_tools has a freehand or erase stroke open"""
+    return any(hand.active_stroke is not None for hand in drawing_tools.hands.values())
+
+def apply_op(drawing_tools, kind, payload, record=True):
+    """
+    Apply a hub operation to a canvas
+    With record, the change becomes an undo step of the canvas, or joins
+    the step in progress while a local stroke is open.
+    Returns: True if the operation could be applied
+    """
+    history = drawing_tools.history
+    strokes = drawing_tools.strokes
+    if kind == CLEAR:
+        if record:
+            drawing_tools.clear()
+        else:
+            strokes.clear()
+            if drawing_tools.canvas is not None:
+                drawing_tools.canvas.clear()
+            else:
+                drawing_tools.mask.fill(MASK_BACKGROUND)
+            if drawing_tools.layers is not None:
+                drawing_tools.layers.clear()
+        return True
+    
+    if kind == TILES:
+        tile_size, tiles = decode_tiles(payload)
+        if tile_size != history.tile_size:
+            print(f"Ignoring tiles of size {tile_size}, this canvas uses {history.tile_size}")
+            return False
+    
+    if record:
+        history.begin(strokes)
+    if kind == STROKES:
+        first = len(strokes)
+        strokes.restore(decode_strokes(payload))
+        for index in range(first, len(strokes)):
+            drawing_tools.render_stroke(index)
+    else:
+        surface = drawing_tools.surface
+        rects = []
+        for row, col, shape, data in tiles:
+            rect = (col * tile_size, row * tile_size, col * tile_size + shape[1], row * tile_size + shape[0])
+            history.capture(surface, *rect)
+            history.write_tile(surface, row, col, decompress_tile(data, shape))
+            drawing_tools.mark_dirty(*rect)
+            rects.append(rect)
+        drawing_tools.refresh_layers(rects)
+    if record and not strokes_open(drawing_tools):
+        history.commit(drawing_tools.surface, strokes)
+    return True
+
+class HubOp:
+    """One published change of the board"""
+    __slots__ = ("sequence", "session_id", "kind", "payload", "time")
+    
+    def __init__(self, sequence, session_id, kind, payload):
+        self.sequence = sequence
+        self.session_id = session_id
+        self.kind = kind
+        self.payload = payload
+        self.time = time.perf_counter()
+
+class CanvasHub:
+    """
+    In-process hub sharing one drawing board between sessions
+    Sessions publish what changed on their canvas as small operations:
+    committed strokes as vector primitives, and the tiles an undo or redo
+    rewrote. Operations are appended to one log under a lock and every
+    subscriber keeps a cursor into it, pulling what it has not seen yet,
+    at most poll_bytes per poll. Publishing never waits for subscribers:
+    the log is trimmed to log_bytes, and a subscriber whose cursor fell
+    off the trimmed log is resynchronized from the hub's own copy of the
+    board instead of replaying what it missed. Full canvases are only
+    shipped for such a resync and to sessions joining a drawn board.
+    """
+    
+    def __init__(self, width, height, tiled=TILED_CANVAS, log_bytes=COLLAB_LOG_BYTES,
+                 poll_bytes=COLLAB_POLL_BYTES):
+        self.log_bytes = log_bytes
+        self.poll_bytes = poll_bytes
+        self.lock = threading.Lock()
+        
+        self.log = deque()
+        self.logged_bytes = 0
+        self.next_sequence = 0
+        self.cursors = {}
+        self.next_session = 0
+        
+        # The board as every op so far left it, for resyncs; vector while no
+        # tile op came in since the last clear, so resyncs can ship strokes
+        self.board = DrawingTools(width, height, tiled=tiled, smoothing=False, color=False)
+        self.board_is_vector = True
+        
+        # Totals for metrics
+        self.published_bytes = 0
+        self.delivered_bytes = 0
+        self.resyncs = 0
+    
+    def subscribe(self):
+        """
+        Register a session; its first poll brings the current board
+        Returns: session id
+        """
+        with self.lock:
+            session_id = self.next_session
+            self.next_session += 1
+            self.cursors[session_id] = -1
+            return session_id
+    
+    def unsubscribe(self, session_id):
+        """Forget a session"""
+        with self.lock:
+            self.cursors.pop(session_id, None)
+    
+    def publish(self, session_id, kind, payload=b""):
+        """Append an operation to the log and apply it to the board (never blocks on subscribers)"""
+        with self.lock:
+            op = HubOp(self.next_sequence, session_id, kind, payload)
+            self.next_sequence += 1
+            self.log.append(op)
+            self.logged_bytes += len(payload)
+            self.published_bytes += len(payload)
+            
+            apply_op(self.board, kind, payload, record=False)
+            if kind == TILES:
+                self.board_is_vector = False
+            elif kind == CLEAR:
+                self.board_is_vector = True
+            
+            # Keep the newest operation even when it alone is over budget
+            while self.logged_bytes > self.log_bytes and len(self.log) > 1:
+                self.logged_bytes -= len(self.log.popleft().payload)
+            return op.sequence
+    
+    def poll(self, session_id):
+        """
+        Operations a session has not seen yet, skipping its own
+        A session that fell behind the trimmed log (or has just joined)
+        gets a resync instead: a clear followed by the board's strokes,
+        or its tiles once undo tile deltas made strokes incomplete.
+        Returns: list of HubOp
+        """
+        with self.lock:
+            cursor = self.cursors.get(session_id)
+            if cursor is None:
+                return []
+            
+            first = self.log[0].sequence if self.log else self.next_sequence
+            if cursor < first:
+                self.cursors[session_id] = self.next_sequence
+                ops = self.board_ops(session_id, joining=cursor < 0)
+                self.delivered_bytes += sum(len(op.payload) for op in ops)
+                return ops
+            
+            ops, size = [], 0
+            for op in self.log_from(cursor - first):
+                if ops and size + len(op.payload) > self.poll_bytes:
+                    break
+                self.cursors[session_id] = op.sequence + 1
+                if op.session_id != session_id:
+                    ops.append(op)
+                    size += len(op.payload)
+            self.delivered_bytes += size
+            return ops
+    
+    def log_from(self, index):
+        """Iterate the log from a position without copying it"""
+        for i in range(index, len(self.log)):
+            yield self.log[i]
+    
+    def board_ops(self, session_id, joining):
+        """
+        Operations that rebuild the whole board on a canvas
+        Returns: list of HubOp
+        """
+        if not joining:
+            self.resyncs += 1
+        ops = [HubOp(self.next_sequence - 1, None, CLEAR, b"")]
+        board = self.board
+        if not len(board.strokes) and self.board_is_vector:
+            return ops if not joining else []
+        if self.board_is_vector:
+            payload = encode_strokes(board.strokes.snapshot())
+            ops.append(HubOp(self.next_sequence - 1, None, STROKES, payload))
+            return ops
+        
+        # Only tiles holding ink; the clear leaves the rest blank
+        if board.canvas is not None:
+            keys = list(board.canvas.tiles)
+        else:
+            tile = board.history.tile_size
+            height, width = board.mask.shape
+            keys = [(row, col) for row in range((height + tile - 1) // tile)
+                    for col in range((width + tile - 1) // tile)
+                    if (board.mask[row * tile:(row + 1) * tile, col * tile:(col + 1) * tile]
+                        != MASK_BACKGROUND).any()]
+        ops.append(HubOp(self.next_sequence - 1, None, TILES,
+                         encode_tiles(board.history, board.surface, keys)))
+        return ops
+    
+    def metrics(self):
+        """
+        Sessions, log size and traffic of the hub
+        Returns: dict of counters
+        """
+        with self.lock:
+            lag = [self.next_sequence - max(0, cursor) for cursor in self.cursors.values()]
+            return {
+                "sessions": len(self.cursors),
+                "log_ops": len(self.log),
+                "log_bytes": self.logged_bytes,
+                "published_bytes": self.published_bytes,
+                "delivered_bytes": self.delivered_bytes,
+                "max_lag_ops": max(lag, default=0),
+                "resyncs": self.resyncs,
+            }
+
+class CanvasSync:
+    """
+    Connects one session's DrawingTools to a CanvasHub
+    Local strokes are published once closed (shapes right away, freehand
+    and erase strokes when the finger is lowered), undo and redo publish
+    the tiles they rewrote and clearing publishes a clear. Once per frame
+    tick() publishes what was closed and applies the other sessions'
+    operations to the canvas incrementally.
+    """
+    
+    def __init__(self, hub):
+        self.hub = hub
+        self.session_id = hub.subscribe()
+        self.drawing_tools = None
+        
+        # Local strokes not published yet, and set while applying remote operations
+        self.pending = []
+        self.applying = False
+        
+        # Publish-to-apply latency of received operations, seconds
+        self.latencies = deque(maxlen=256)
+        self.received_ops = 0
+        self.received_bytes = 0
+    
+    def attach(self, drawing_tools):
+        """Start sharing drawing_tools; the board's current drawing arrives with the first tick"""
+        drawing_tools.end_all_strokes()
+        drawing_tools.collab = self
+        self.drawing_tools = drawing_tools
+    
+    def stroke_added(self, index):
+        """A local stroke was started (called by DrawingTools)"""
+        if not self.applying:
+            self.pending.append(index)
+    
+    def publish_strokes(self, drawing_tools):
+        """Publish pending local strokes that are no longer being drawn"""
+        if self.applying:
+            # A remote clear is wiping them anyway
+            self.pending = []
+            return
+        if not self.pending:
+            return
+        open_strokes = {hand.active_stroke for hand in drawing_tools.hands.values()}
+        ready = [index for index in self.pending if index not in open_strokes]
+        if not ready:
+            return
+        self.pending = [index for index in self.pending if index in open_strokes]
+        self.hub.publish(self.session_id, STROKES, encode_strokes(drawing_tools.strokes.select(ready)))
+    
+    def tiles_changed(self, drawing_tools, rects):
+        """Publish the tiles an undo or redo rewrote"""
+        if self.applying or not rects:
+            return
+        history = drawing_tools.history
+        keys = tile_keys(history.tile_size, rects)
+        self.hub.publish(self.session_id, TILES, encode_tiles(history, drawing_tools.surface, keys))
+    
+    def cleared(self):
+        """Publish a local clear"""
+        if not self.applying:
+            self.hub.publish(self.session_id, CLEAR)
+    
+    def tick(self, drawing_tools=None):
+        """
+        Publish closed local strokes and apply other sessions' operations (frame thread)
+        Returns: number of operations applied
+        """
+        drawing_tools = drawing_tools or self.drawing_tools
+        self.publish_strokes(drawing_tools)
+        ops = self.hub.poll(self.session_id)
+        if not ops:
+            return 0
+        
+        self.applying = True
+        try:
+            for op in ops:
+                apply_op(drawing_tools, op.kind, op.payload)
+                self.latencies.append(time.perf_counter() - op.time)
+                self.received_bytes += len(op.payload)
+        finally:
+            self.applying = False
+        self.received_ops += len(ops)
+        return len(ops)
+    
+    def close(self):
+        """Stop sharing"""
+        if self.drawing_tools is not None:
+            self.drawing_tools.end_all_strokes()
+            self.publish_strokes(self.drawing_tools)
+            self.drawing_tools.collab = None
+            self.drawing_tools = None
+        self.hub.unsubscribe(self.session_id)
@@ -0,0 +1,93 @@
+"""
+Incremental compositing of the drawing mask over camera frames
+"""
+import cv2
+import numpy as np
+from config.settings import COMPOSITE_TILE_SIZE, MASK_BACKGROUND
+
+class CanvasCompositor:
+    """
+    Keeps a precomputed 3-channel overlay of the mask and blends it in place
+    The overlay holds 255 in the blue channel and the mask value in the
+    green and red channels, so a single bitwise AND reproduces the
+    original "darken green and red where ink is" look. Only regions
+    marked dirty are refreshed from the mask, and only tile rows that
+    contain ink are touched when blending.
+    """
+    
+    def __init__(self, width, height, tile_size=COMPOSITE_TILE_SIZE):
+        self.width = width
+        self.height = height
+        self.tile_size = tile_size
+        
+        self.overlay = np.full((height, width, 3), MASK_BACKGROUND, dtype=np.uint8)
+        self.overlay[:, :, 0] = 255
+        rows = (height + tile_size - 1) // tile_size
+        cols = (width + tile_size - 1) // tile_size
+        self.tile_ink = np.zeros((rows, cols), dtype=bool)
+        
+        # Per tile row: (x1, x2) pixel span covering all ink tiles, or None
+        self.row_spans = [None] * rows
+        
+        self.dirty = []
+        self.source = None
+    
+    def mark_dirty(self, x1, y1, x2, y2):
+        """Record that the mask changed inside the given pixel rectangle"""
+        x1, y1 = max(0, int(x1)), max(0, int(y1))
+        x2, y2 = min(self.width, int(x2)), min(self.height, int(y2))
+        if x2 > x1 and y2 > y1:
+            self.dirty.append((x1, y1, x2, y2))
+    
+    def mark_all_dirty(self):
+        """Record that the whole mask changed"""
+        self.dirty = [(0, 0, self.width, self.height)]
+    
+    def flush(self, mask):
+        """Refresh the overlay and ink tiles for every dirty region"""
+        # A replaced mask array invalidates everything
+        if mask is not self.source:
+            self.source = mask
+            self.mark_all_dirty()
+        if not self.dirty:
+            return
+        
+        tile = self.tile_size
+        touched_rows = set()
+        for x1, y1, x2, y2 in self.dirty:
+            self.overlay[y1:y2, x1:x2, 1] = mask[y1:y2, x1:x2]
+            self.overlay[y1:y2, x1:x2, 2] = mask[y1:y2, x1:x2]
+            
+            # Re-check ink in every tile overlapping the region; 255 is a no-op for AND
+            row1, row2 = y1 // tile, (y2 - 1) // tile + 1
+            col1, col2 = x1 // tile, (x2 - 1) // tile + 1
+            block = mask[row1 * tile:row2 * tile, col1 * tile:col2 * tile]
+            tile_min = np.minimum.reduceat(block, np.arange(0, block.shape[0], tile), axis=0)
+            tile_min = np.minimum.reduceat(tile_min, np.arange(0, block.shape[1], tile), axis=1)
+            self.tile_ink[row1:row2, col1:col2] = tile_min != 255
+            touched_rows.update(range(row1, row2))
+        self.dirty = []
+        
+        for row in touched_rows:
+            cols = np.flatnonzero(self.tile_ink[row])
+            if len(cols):
+                self.row_spans[row] = (cols[0] * tile, min(self.width, (cols[-1] + 1) * tile))
+            else:
+                self.row_spans[row] = None
+    
+    def composite(self, frame, mask):
+        """
+        Blend the mask into the frame in place
+        Returns: the same frame object
+        """
+        self.flush(mask)
+        
+        tile = self.tile_size
+        for row, span in enumerate(self.row_spans):
+            if span is None:
+                continue
+            y1, y2 = row * tile, min(self.height, (row + 1) * tile)
+            x1, x2 = span
+            region = frame[y1:y2, x1:x2]
+            cv2.bitwise_and(region, self.overlay[y1:y2, x1:x2], dst=region)
+        return frame
@@ -0,0 +1,346 @@
+"""
+Out-of-process hand detection fed through shared-memory ring buffers
+"""
+import os
+import queue
+import threading
+import time
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+import numpy as np
+from core.detector_backends import DetectorBackend, NUM_LANDMARKS, results_to_array, array_to_results
+from core.detector_pool import create_pooled_detector
+from config.resolution import ResolutionConfig
+from config.settings import (
+    MAX_NUM_HANDS, DETECTION_SERVICE_WORKERS, DETECTION_SERVICE_SLOTS,
+    DETECTION_SERVICE_TIMEOUT
+)
+
+# Slot number a worker reports once its detector is loaded
+READY = -1
+
+# Seconds allowed for a worker to import and load its model
+WORKER_START_TIMEOUT = 60.0
+
+# Seconds between checks that every worker process is still alive
+WORKER_CHECK_INTERVAL = 0.5
+
+def run_worker(frames_name, results_name, frame_shape, result_shape, tasks, done, factory,
+               busy, finished, index):
+    """
+    Worker process loop: detect on frames named by slot index
+    Frames and landmark results live in shared memory; only slot numbers
+    and frame sizes travel through the task queue and this worker's own
+    done pipe, which has no lock a dying process could leave held.
+    busy[index] holds the slot
+    being detected and finished[slot] the generation of the last frame
+    detected in it, so slots can be recovered if this process dies.
+    """
+    frames_memory = shared_memory.SharedMemory(name=frames_name)
+    results_memory = shared_memory.SharedMemory(name=results_name)
+    frames = np.ndarray(frame_shape, dtype=np.uint8, buffer=frames_memory.buf)
+    results = np.ndarray(result_shape, dtype=np.float32, buffer=results_memory.buf)
+    hand_detector = factory()
+    max_hands = result_shape[1]
+    done.send(READY)
+    
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            slot, height, width, generation = task
+            busy[index] = slot
+            try:
+                frame = frames[slot, :height, :width]
+                results_to_array(hand_detector.detect_hands(frame), max_hands, out=results[slot])
+            except Exception as e:
+                print(f"Detection worker {os.getpid()} failed: {e}")
+                results[slot] = np.nan
+            
+            # Written to shared memory first, in case the process dies before sending
+            finished[slot] = generation
+            busy[index] = -1
+            done.send((slot, generation))
+    finally:
+        hand_detector.close()
+        del frames, results
+        frames_memory.close()
+        results_memory.close()
+
+class DetectionService:
+    """
+    Pool of worker processes, each owning a HandDetector
+    Callers copy a frame into a free slot of a shared-memory ring buffer
+    and block until a worker has written that slot's landmarks into a
+    second shared buffer, so frames are never pickled and inference runs
+    outside this process's GIL. Slots are sized for frame_size; smaller
+    frames fill the top-left corner of a slot. Safe to call from many
+    threads.
+    
+    A caller never waits longer than DETECTION_SERVICE_TIMEOUT, for a
+    slot or for its result; it gets "no hands" instead. A slot given up
+    on is returned to the ring once its late result arrives, and worker
+    processes that die are replaced, completing the slot they held.
+    """
+    
+    def __init__(self, num_workers=DETECTION_SERVICE_WORKERS, slots=None,
+                 frame_size=None, max_hands=MAX_NUM_HANDS, factory=create_pooled_detector):
+        self.num_workers = num_workers or os.cpu_count() or 1
+        
+        # Two slots per worker keep every worker busy while frames are copied in
+        self.slots = slots or DETECTION_SERVICE_SLOTS * self.num_workers
+        width, height = frame_size or ResolutionConfig().detection_size
+        self.frame_shape = (self.slots, height, width, 3)
+        self.result_shape = (self.slots, max_hands, NUM_LANDMARKS, 3)
+        self.factory = factory
+        
+        self.frames_memory = None
+        self.results_memory = None
+        self.processes = []
+        self.collector = None
+        self.running = False
+        
+        # Counters for metrics
+        self.timeouts = 0
+        self.restarts = 0
+    
+    def start(self):
+        """Allocate the ring buffers and start the worker processes"""
+        if self.running:
+            return
+        frame_bytes = int(np.prod(self.frame_shape))
+        result_bytes = int(np.prod(self.result_shape)) * 4
+        self.frames_memory = shared_memory.SharedMemory(create=True, size=frame_bytes)
+        self.results_memory = shared_memory.SharedMemory(create=True, size=result_bytes)
+        self.frames = np.ndarray(self.frame_shape, dtype=np.uint8, buffer=self.frames_memory.buf)
+        self.results = np.ndarray(self.result_shape, dtype=np.float32, buffer=self.results_memory.buf)
+        
+        # Spawned workers do not inherit threads or model state from this process
+        context = mp.get_context("spawn")
+        self.tasks = context.Queue()
+        self.free_slots = queue.Queue()
+        for slot in range(self.slots):
+            self.free_slots.put(slot)
+        self.slot_events = [threading.Event() for _ in range(self.slots)]
+        
+        # Generation of the frame each submitted slot waits for, and the
+        # slots whose caller gave up waiting, freed when their result comes in
+        self.slot_lock = threading.Lock()
+        self.generation = 0
+        self.pending = {}
+        self.abandoned = set()
+        
+        # Slot each worker is detecting on (-1 when idle), and the
+        # generation of the last frame finished in each slot
+        self.context = context
+        self.busy = context.Array("i", [-1] * self.num_workers, lock=False)
+        self.finished = context.Array("q", [0] * self.slots, lock=False)
+        
+        # Each worker reports finished slots through its own pipe
+        self.processes = [None] * self.num_workers
+        self.connections = [None] * self.num_workers
+        for index in range(self.num_workers):
+            self.spawn_worker(index)
+        
+        # Model loading can take seconds; wait so no frame times out behind it
+        self.running = True
+        if not self.wait_ready():
+            self.stop()
+            raise RuntimeError("Detection workers failed to start")
+        
+        self.collector = threading.Thread(target=self._collect, daemon=True)
+        self.collector.start()
+    
+    def spawn_worker(self, index):
+        """Start worker process number index with a new done pipe"""
+        receiver, sender = self.context.Pipe(duplex=False)
+        process = self.context.Process(
+            target=run_worker,
+            args=(self.frames_memory.name, self.results_memory.name, self.frame_shape,
+                  self.result_shape, self.tasks, sender, self.factory, self.busy, self.finished, index),
+            daemon=True,
+        )
+        process.start()
+        
+        # Only the worker holds the sending end, so its death closes the pipe
+        sender.close()
+        self.processes[index] = process
+        self.connections[index] = receiver
+    
+    def stop(self):
+        """Stop the workers and free the shared memory"""
+        if not self.running:
+            return
+        self.running = False
+        
+        # The collector goes first so it does not replace workers being stopped
+        if self.collector is not None:
+            self.collector.join(timeout=WORKER_CHECK_INTERVAL * 4)
+            self.collector = None
+        
+        for _ in self.processes:
+            self.tasks.put(None)
+        for process in self.processes:
+            process.join(timeout=5.0)
+            if process.is_alive():
+                process.terminate()
+        for connection in self.connections:
+            connection.close()
+        self.processes = []
+        self.connections = []
+        
+        del self.frames, self.results
+        for memory in (self.frames_memory, self.results_memory):
+            memory.close()
+            memory.unlink()
+        self.frames_memory = self.results_memory = None
+    
+    def wait_ready(self):
+        """
+        Wait for every worker to load its detector
+        Returns: False if a worker died or the start timeout passed
+        """
+        deadline = time.monotonic() + WORKER_START_TIMEOUT
+        waiting = list(self.connections)
+        while waiting:
+            if time.monotonic() > deadline:
+                return False
+            for connection in wait(waiting, timeout=0.5):
+                try:
+                    connection.recv()
+                except EOFError:
+                    return False
+                waiting.remove(connection)
+        return True
+    
+    def detect_array(self, frame):
+        """
+        Detect hands on a worker process
+        Returns: (max_hands, 21, 3) float32 landmarks, NaN where no hand was
+        found, or all NaN if no worker answered within DETECTION_SERVICE_TIMEOUT
+        """
+        if not self.running:
+            raise RuntimeError("Detection service is not running")
+        height, width = frame.shape[:2]
+        _, max_height, max_width, channels = self.frame_shape
+        if height > max_height or width > max_width or frame.shape[2:] != (channels,):
+            raise ValueError(f"Expected a frame of at most shape {self.frame_shape[1:]}, got {frame.shape}")
+        
+        try:
+            slot = self.free_slots.get(timeout=DETECTION_SERVICE_TIMEOUT)
+        except queue.Empty:
+            return self.no_detection()
+        with self.slot_lock:
+            self.generation += 1
+            generation = self.pending[slot] = self.generation
+        event = self.slot_events[slot]
+        event.clear()
+        self.frames[slot, :height, :width] = frame
+        self.tasks.put((slot, height, width, generation))
+        
+        # A slot that timed out stays out of the ring until its late result
+        # arrives, so that result cannot reach another caller
+        if not event.wait(DETECTION_SERVICE_TIMEOUT):
+            with self.slot_lock:
+                if not event.is_set():
+                    self.abandoned.add(slot)
+                    return self.no_detection()
+        points = self.results[slot].copy()
+        self.free_slots.put(slot)
+        return points
+    
+    def no_detection(self):
+        """
+        Result for a frame no worker answered in time
+        Returns: all-NaN landmarks, i.e. no hands
+        """
+        self.timeouts += 1
+        return np.full(self.result_shape[1:], np.nan, dtype=np.float32)
+    
+    def detect(self, frame):
+        """Detect hands on a worker process, as DetectionResults"""
+        return array_to_results(self.detect_array(frame))
+    
+    def complete(self, slot, generation):
+        """Hand a finished slot to its waiting caller, or back to the ring if it gave up"""
+        with self.slot_lock:
+            # Each frame completes once, whether by message or by recovery
+            if self.pending.get(slot) != generation:
+                return
+            del self.pending[slot]
+            if slot in self.abandoned:
+                self.abandoned.discard(slot)
+                self.free_slots.put(slot)
+            else:
+                self.slot_events[slot].set()
+    
+    def drain(self, connection):
+        """
+        Complete every slot a worker has reported on its pipe so far
+        Returns: False once the worker has exited and closed the pipe
+        """
+        try:
+            while connection.poll():
+                message = connection.recv()
+                if message != READY:
+                    self.complete(*message)
+        except (EOFError, OSError):
+            return False
+        return True
+    
+    def replace_worker(self, index):
+        """Respawn a worker that died, failing the frame it was detecting"""
+        process = self.processes[index]
+        process.join(timeout=1.0)
+        print(f"Detection worker {process.pid} died (exit code {process.exitcode}), restarting")
+        self.drain(self.connections[index])
+        self.connections[index].close()
+        
+        slot = self.busy[index]
+        self.busy[index] = -1
+        with self.slot_lock:
+            generation = self.pending.get(slot)
+        if generation is not None and self.finished[slot] != generation:
+            self.results[slot] = np.nan
+            self.complete(slot, generation)
+        
+        # Frames finished just before the process died, without being reported
+        with self.slot_lock:
+            pending = list(self.pending.items())
+        for slot, generation in pending:
+            if self.finished[slot] == generation:
+                self.complete(slot, generation)
+        
+        self.spawn_worker(index)
+        self.restarts += 1
+    
+    def _collect(self):
+        """Wake the caller waiting on each slot a worker finished, and replace dead workers"""
+        next_check = time.monotonic() + WORKER_CHECK_INTERVAL
+        while self.running:
+            for connection in wait(self.connections, timeout=WORKER_CHECK_INTERVAL):
+                if not self.drain(connection) and self.running:
+                    self.replace_worker(self.connections.index(connection))
+            
+            # Also poll the processes, in case a pipe outlives its worker
+            if time.monotonic() >= next_check:
+                for index, process in enumerate(self.processes):
+                    if not process.is_alive() and self.running:
+                        self.replace_worker(index)
+                next_check = time.monotonic() + WORKER_CHECK_INTERVAL
+
+class ServiceBackend(DetectorBackend):
+    """Backend of a per-session HandDetector that detects on a DetectionService"""
+    name = "service"
+    
+    def __init__(self, service):
+        self.service = service
+    
+    def detect(self, frame):
+        return self.service.detect(frame)
+    
+    def close(self):
+        # The service outlives its sessions
+        pass
@@ -0,0 +1,84 @@
+"""
+Background hand detection decoupled from the render loop
+"""
+import queue
+import threading
+from utils.fps_counter import FPSCounter
+
+class DetectionWorker:
+    def __init__(self, hand_detector):
+        self.hand_detector = hand_detector
+        
+        # Depth 1 so the detector always sees the newest frame
+        self.frame_queue = queue.Queue(maxsize=1)
+        self.results_lock = threading.Lock()
+        self.latest_results = None
+        self.sequence = 0
+        self.dropped_frames = 0
+        self.fps_counter = FPSCounter()
+        
+        self.running = False
+        self.thread = None
+    
+    def start(self):
+        """Start the detection thread"""
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        """Stop the detection thread and wait for it to finish"""
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+            self.thread = None
+    
+    def submit(self, frame):
+        """
+        Offer a frame to the detector without blocking
+        A frame still waiting in the queue is replaced, so frames the
+        detector cannot keep up with are dropped instead of queued.
+        """
+        try:
+            self.frame_queue.put_nowait(frame)
+        except queue.Full:
+            try:
+                self.frame_queue.get_nowait()
+                self.dropped_frames += 1
+            except queue.Empty:
+                pass
+            try:
+                self.frame_queue.put_nowait(frame)
+            except queue.Full:
+                self.dropped_frames += 1
+    
+    def get_latest_results(self):
+        """
+        Get the most recently published detection results
+        The sequence number grows by one per detection, so callers can
+        tell new results from ones they have already applied.
+        Returns: (MediaPipe results, sequence number), or (None, 0) before the first detection
+        """
+        with self.results_lock:
+            return self.latest_results, self.sequence
+    
+    def get_fps(self):
+        """Detection rate in frames per second"""
+        return self.fps_counter.get_fps()
+    
+    def _run(self):
+        """Detection loop consuming the newest queued frame"""
+        while self.running:
+            try:
+                frame = self.frame_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            
+            results = self.hand_detector.detect_hands(frame)
+            
+            with self.results_lock:
+                self.latest_results = results
+                self.sequence += 1
+            self.fps_counter.tick()
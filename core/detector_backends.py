@@ -0,0 +1,245 @@
+"""
+Hand detection backends used by HandDetector
+"""
+import cv2
+import numpy as np
+from utils.profiler import StageProfiler
+from config.settings import (
+    MIN_DETECTION_CONFIDENCE, MIN_TRACKING_CONFIDENCE, MAX_NUM_HANDS, REPLAY_LANDMARKS_PATH
+)
+
+NUM_LANDMARKS = 21
+
+# Landmark indices used by the drawing gestures
+WRIST = 0
+INDEX_TIP = 8
+MIDDLE_MCP = 9
+MIDDLE_TIP = 12
+
+# Same topology as mp.solutions.hands.HAND_CONNECTIONS
+HAND_CONNECTIONS = (
+    (0, 1), (1, 2), (2, 3), (3, 4),
+    (0, 5), (5, 6), (6, 7), (7, 8),
+    (5, 9), (9, 10), (10, 11), (11, 12),
+    (9, 13), (13, 14), (14, 15), (15, 16),
+    (13, 17), (0, 17), (17, 18), (18, 19), (19, 20),
+)
+
+class Landmark:
+    __slots__ = ("x", "y", "z")
+    
+    def __init__(self, x, y, z=0.0):
+        self.x = x
+        self.y = y
+        self.z = z
+
+class HandLandmarks:
+    """Minimal stand-in for MediaPipe's NormalizedLandmarkList"""
+    __slots__ = ("landmark",)
+    
+    def __init__(self, landmark):
+        self.landmark = landmark
+    
+    @classmethod
+    def from_array(cls, points):
+        """Build from a (21, 3) array of normalized coordinates"""
+        return cls([Landmark(float(x), float(y), float(z)) for x, y, z in points])
+
+class DetectionResults:
+    """
+    Minimal stand-in for MediaPipe's hand detection results
+    Results built from an array keep it as points, (hands, 21, 3), so
+    converting them back to an array needs no per-landmark access.
+    """
+    __slots__ = ("multi_hand_landmarks", "points")
+    
+    def __init__(self, multi_hand_landmarks=None, points=None):
+        self.multi_hand_landmarks = multi_hand_landmarks or None
+        self.points = points
+
+def extract_landmarks(results, out):
+    """
+    Copy the landmarks of every detected hand into a preallocated array
+    out has shape (max_hands, 21, 3); hands beyond max_hands are dropped
+    and rows past the detected hands are left untouched.
+    Returns: number of hands written
+    """
+    if results is None or not results.multi_hand_landmarks:
+        return 0
+    points = getattr(results, "points", None)
+    if points is not None:
+        count = min(len(points), len(out))
+        out[:count] = points[:count]
+        return count
+    
+    # One flat list for all hands, converted by a single array assignment
+    hands = results.multi_hand_landmarks[:len(out)]
+    values = [value for hand_landmarks in hands for lm in hand_landmarks.landmark
+              for value in (lm.x, lm.y, lm.z)]
+    out[:len(hands)] = np.reshape(values, (len(hands), NUM_LANDMARKS, 3))
+    return len(hands)
+
+def results_to_array(results, max_hands=MAX_NUM_HANDS, out=None):
+    """
+    Convert detection results into a fixed-size landmark array
+    Fills out when given instead of allocating a new array.
+    Returns: (max_hands, 21, 3) float32 array, NaN where no hand was found
+    """
+    if out is None:
+        out = np.empty((max_hands, NUM_LANDMARKS, 3), dtype=np.float32)
+    count = extract_landmarks(results, out)
+    out[count:] = np.nan
+    return out
+
+def array_to_results(points):
+    """Inverse of results_to_array; hands containing NaN are skipped"""
+    points = points[~np.isnan(points).any(axis=(1, 2))]
+    hands = [HandLandmarks.from_array(hand) for hand in points]
+    return DetectionResults(hands, points)
+
+class DetectorBackend:
+    """Interface every hand detection backend implements"""
+    name = "base"
+    
+    # Replaced by HandDetector.set_profiler; disabled by default
+    profiler = StageProfiler()
+    
+    def detect(self, frame):
+        """
+        Detect hands in a BGR frame
+        Returns: results exposing multi_hand_landmarks like MediaPipe's
+        """
+        raise NotImplementedError
+    
+    def draw_landmarks(self, frame, hand_landmarks):
+        """Draw the hand skeleton with plain OpenCV calls"""
+        height, width = frame.shape[:2]
+        points = [(int(lm.x * width), int(lm.y * height)) for lm in hand_landmarks.landmark]
+        for start, end in HAND_CONNECTIONS:
+            cv2.line(frame, points[start], points[end], (224, 224, 224), 2)
+        for point in points:
+            cv2.circle(frame, point, 3, (0, 0, 255), -1)
+    
+    def close(self):
+        """Release backend resources"""
+        pass
+
+class MediaPipeBackend(DetectorBackend):
+    name = "mediapipe"
+    
+    def __init__(self, min_detection_confidence=MIN_DETECTION_CONFIDENCE,
+                 min_tracking_confidence=MIN_TRACKING_CONFIDENCE, max_num_hands=MAX_NUM_HANDS,
+                 static_image_mode=False):
+        # Imported here so other backends work without MediaPipe installed
+        import mediapipe as mp
+        
+        # Static image mode detects every frame afresh instead of tracking
+        # the hands of the previous one, for a graph fed unrelated frames
+        self.hands = mp.solutions.hands
+        self.hand_landmark = self.hands.Hands(
+            static_image_mode=static_image_mode,
+            min_detection_confidence=min_detection_confidence,
+            min_tracking_confidence=min_tracking_confidence,
+            max_num_hands=max_num_hands
+        )
+        self.draw_utils = mp.solutions.drawing_utils
+        
+        # RGB conversion target, reused while the frame size stays the same
+        self.rgb_frame = None
+    
+    def detect(self, frame):
+        with self.profiler.stage("color"):
+            if self.rgb_frame is None or self.rgb_frame.shape != frame.shape:
+                self.rgb_frame = np.empty_like(frame)
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self.rgb_frame)
+        return self.hand_landmark.process(self.rgb_frame)
+    
+    def draw_landmarks(self, frame, hand_landmarks):
+        self.draw_utils.draw_landmarks(
+            frame, hand_landmarks, self.hands.HAND_CONNECTIONS
+        )
+    
+    def close(self):
+        self.hand_landmark.close()
+
+class ReplayBackend(DetectorBackend):
+    """
+    Replays recorded landmarks instead of running a model
+    Accepts a .npy path or an array of shape (frames, 21, 3) or
+    (frames, hands, 21, 3) in normalized coordinates. Frames filled
+    with NaN replay as "no hand detected". max_num_hands keeps only
+    the first hands of each frame, like the live detector's limit;
+    None replays every recorded hand.
+    """
+    name = "replay"
+    
+    def __init__(self, source=REPLAY_LANDMARKS_PATH, loop=True, max_num_hands=None):
+        points = np.load(source) if isinstance(source, str) else np.asarray(source)
+        if points.ndim == 3:
+            points = points[:, np.newaxis]
+        if points.ndim != 4 or points.shape[2:] != (NUM_LANDMARKS, 3):
+            raise ValueError(f"Expected landmarks of shape (frames, [hands,] 21, 3), got {points.shape}")
+        if max_num_hands is not None:
+            points = points[:, :max_num_hands]
+        
+        self.points = points.astype(np.float32, copy=False)
+        self.loop = loop
+        self.frame_index = 0
+        
+        # Build results up front so replay cost does not depend on the file
+        self.results = [array_to_results(frame_points) for frame_points in self.points]
+    
+    def __len__(self):
+        return len(self.results)
+    
+    def reset(self):
+        """Restart playback from the first frame"""
+        self.frame_index = 0
+    
+    def detect(self, frame):
+        if self.frame_index >= len(self.results):
+            if not self.loop:
+                return DetectionResults()
+            self.frame_index = 0
+        results = self.results[self.frame_index]
+        self.frame_index += 1
+        return results
+
+class RecordingBackend(DetectorBackend):
+    """Wraps another backend and records its landmarks for later replay"""
+    name = "recording"
+    
+    def __init__(self, backend, max_hands=MAX_NUM_HANDS):
+        self.backend = backend
+        self.max_hands = max_hands
+        self.frames = []
+    
+    def detect(self, frame):
+        results = self.backend.detect(frame)
+        self.frames.append(results_to_array(results, self.max_hands))
+        return results
+    
+    def draw_landmarks(self, frame, hand_landmarks):
+        self.backend.draw_landmarks(frame, hand_landmarks)
+    
+    def save(self, path):
+        """Save recorded landmarks as a (frames, hands, 21, 3) .npy file"""
+        if self.frames:
+            points = np.stack(self.frames)
+        else:
+            points = np.empty((0, self.max_hands, NUM_LANDMARKS, 3), dtype=np.float32)
+        np.save(path, points)
+    
+    def close(self):
+        self.backend.close()
+
+BACKENDS = {
+    MediaPipeBackend.name: MediaPipeBackend,
+    ReplayBackend.name: ReplayBackend,
+}
+
+def create_backend(name, **kwargs):
+    """Create a detector backend by name"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown detector backend: {name}")
+    return BACKENDS[name](**kwargs)
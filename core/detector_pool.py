@@ -0,0 +1,111 @@
+"""
+Server-wide pool of hand detectors shared by many drawing sessions
+"""
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from core.detector_backends import DetectorBackend, MediaPipeBackend, create_backend
+from core.hand_detector import HandDetector
+from config.settings import DETECTOR_POOL_SIZE, DETECTOR_BACKEND, MAX_NUM_HANDS
+
+def default_pool_size():
+    """Pool size from DETECTOR_POOL_SIZE, or one detector per CPU core"""
+    return DETECTOR_POOL_SIZE or os.cpu_count() or 1
+
+def create_pooled_detector():
+    """
+    Plain detector for the pool; per-session tracking lives in PooledBackend users
+    A pooled detector sees a different session's frame every time it is
+    borrowed, so MediaPipe runs in static image mode: tracking from one
+    session's frame must not seed the next session's.
+    """
+    options = {"static_image_mode": True} if DETECTOR_BACKEND == MediaPipeBackend.name else {}
+    backend = create_backend(DETECTOR_BACKEND, max_num_hands=MAX_NUM_HANDS, **options)
+    return HandDetector(backend, roi_tracking=False, skip_factor=1, adaptive_skip=False)
+
+class DetectorPool:
+    """
+    Fixed-size pool of HandDetector instances lent out one frame at a time
+    Detectors are created lazily, so the number of model graphs follows
+    the number of frames being detected concurrently, up to size. A
+    borrower blocks while every detector is busy.
+    """
+    
+    def __init__(self, size=None, factory=create_pooled_detector):
+        self.size = size or default_pool_size()
+        self.factory = factory
+        
+        # Most recently returned detector first, so idle ones stay idle
+        self.idle = queue.LifoQueue()
+        self.detectors = []
+        self.lock = threading.Lock()
+        self.waits = 0
+        
+        # Plain OpenCV drawing until the first detector exists
+        self.fallback = DetectorBackend()
+    
+    @contextmanager
+    def borrow(self):
+        """Context manager lending a detector for exclusive use"""
+        detector = self.acquire()
+        try:
+            yield detector
+        finally:
+            self.idle.put(detector)
+    
+    def acquire(self):
+        """Take an idle detector, creating one if the pool is not full yet"""
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        
+        with self.lock:
+            if len(self.detectors) < self.size:
+                detector = self.factory()
+                self.detectors.append(detector)
+                return detector
+            self.waits += 1
+        return self.idle.get()
+    
+    def detect(self, frame):
+        """Run detection on a borrowed detector"""
+        with self.borrow() as detector:
+            return detector.detect_hands(frame)
+    
+    def draw_landmarks(self, frame, hand_landmarks):
+        """Draw landmarks with the first detector; drawing keeps no state"""
+        if self.detectors:
+            self.detectors[0].draw_landmarks(frame, hand_landmarks)
+        else:
+            self.fallback.draw_landmarks(frame, hand_landmarks)
+    
+    def close(self):
+        """Release every detector that was created"""
+        with self.lock:
+            for detector in self.detectors:
+                detector.close()
+            self.detectors = []
+            self.idle = queue.LifoQueue()
+
+class PooledBackend(DetectorBackend):
+    """
+    Backend of a per-session HandDetector that detects on a shared pool
+    The session keeps its own HandDetector (and any ROI or frame-skipping
+    wrappers around this backend); only the model itself is shared.
+    """
+    name = "pooled"
+    
+    def __init__(self, pool):
+        self.pool = pool
+    
+    def detect(self, frame):
+        return self.pool.detect(frame)
+    
+    def draw_landmarks(self, frame, hand_landmarks):
+        self.pool.draw_landmarks(frame, hand_landmarks)
+    
+    def close(self):
+        # The pool outlives its sessions
+        pass
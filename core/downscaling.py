@@ -0,0 +1,44 @@
+"""
+Reduced-resolution hand detection
+"""
+import cv2
+import numpy as np
+from core.detector_backends import DetectorBackend
+
+class DownscalingBackend(DetectorBackend):
+    """
+    Wraps a backend and detects on a downscaled copy of the frame
+    Frames are fitted inside size (the detection resolution, keeping the
+    aspect ratio) and then multiplied by scale, which the adaptive quality
+    controller lowers under load. Landmarks are normalized to the frame,
+    so the wrapped backend's results need no mapping back. Frames that
+    already fit pass through untouched; resized ones go into a buffer
+    reused while the target size stays the same.
+    """
+    name = "downscale"
+    
+    def __init__(self, backend, size=None, scale=1.0):
+        self.backend = backend
+        self.size = size
+        self.scale = scale
+        self.buffer = None
+    
+    def detect(self, frame):
+        frame_height, frame_width = frame.shape[:2]
+        factor = self.scale
+        if self.size is not None:
+            factor *= min(self.size[0] / frame_width, self.size[1] / frame_height)
+        if factor >= 1.0:
+            return self.backend.detect(frame)
+        
+        width = max(1, int(frame_width * factor))
+        height = max(1, int(frame_height * factor))
+        if self.buffer is None or self.buffer.shape != (height, width) + frame.shape[2:]:
+            self.buffer = np.empty((height, width) + frame.shape[2:], dtype=frame.dtype)
+        
+        with self.profiler.stage("downscale"):
+            small = cv2.resize(frame, (width, height), dst=self.buffer, interpolation=cv2.INTER_AREA)
+        return self.backend.detect(small)
+    
+    def close(self):
+        self.backend.close()
@@ -4,17 +4,140 @@ Drawing tools and operations for virtual drawing
 import cv2
 import numpy as np
 from config.settings import *
+from config.resolution import CANVAS_WIDTH, CANVAS_HEIGHT
+from core.stroke_store import StrokeStore, LINE, RECTANGLE, CIRCLE, FREEHAND, ERASE
+from core.compositor import CanvasCompositor
+from core.layered_canvas import LayeredCanvas
+from core.history import CanvasHistory
+from core.tiled_canvas import Viewport, TiledCanvas
+from core.stroke_smoothing import StrokeSmoother
 
-class DrawingTools:
-    def __init__(self):
+class HandState:
+    """Tool state of one hand; every hand draws into the same canvas"""
+    
+    def __init__(self, smoothing=STROKE_SMOOTHING):
         self.current_tool = "select tool"
+        self.color = DEFAULT_STROKE_COLOR
+        self.thickness = DEFAULT_THICKNESS
         self.var_inits = False
+        self.selection = None
         self.prev_x, self.prev_y = 0, 0
         self.start_x, self.start_y = 0, 0
         
+        # Open freehand or erase stroke of this hand
+        self.active_stroke = None
+        
+        # Optional filter turning raw freehand samples into smooth strokes
+        self.smoother = StrokeSmoother() if smoothing else None
+
+def hand_attribute(name):
+    """Property forwarding to the selected hand's HandState"""
+    return property(lambda self: getattr(self.hand, name),
+                    lambda self, value: setattr(self.hand, name, value))
+
+class DrawingTools:
+    # Per-hand tool state, read and written through the selected hand
+    current_tool = hand_attribute("current_tool")
+    color = hand_attribute("color")
+    thickness = hand_attribute("thickness")
+    var_inits = hand_attribute("var_inits")
+    selection = hand_attribute("selection")
+    prev_x = hand_attribute("prev_x")
+    prev_y = hand_attribute("prev_y")
+    start_x = hand_attribute("start_x")
+    start_y = hand_attribute("start_y")
+    active_stroke = hand_attribute("active_stroke")
+    smoother = hand_attribute("smoother")
+    
+    def __init__(self, width=CANVAS_WIDTH, height=CANVAS_HEIGHT, tiled=TILED_CANVAS,
+                 smoothing=STROKE_SMOOTHING, color=COLOR_CANVAS):
+        # Each hand keeps its own tool and stroke; hand 0 is selected until told otherwise
+        self.smoothing = smoothing
+        self.hands = {0: HandState(smoothing)}
+        self.hand = self.hands[0]
+        self.hand_id = 0
+        
+        # Committed strokes; the mask is a raster cache derived from them
+        self.width, self.height = width, height
+        self.strokes = StrokeStore(width, height)
+        
+        # Infinite canvas: strokes live in world coordinates and are drawn
+        # into tiles allocated on first use instead of a fixed mask
+        self.canvas = TiledCanvas(Viewport(width, height)) if tiled else None
+        
         # Initialize mask for drawing
-        self.mask = np.ones((WINDOW_HEIGHT, WINDOW_WIDTH)) * 255
-        self.mask = self.mask.astype('uint8')
+        self.mask = None if tiled else np.full((height, width), MASK_BACKGROUND, dtype=np.uint8)
+        
+        # Cached overlay that only refreshes the regions strokes touched
+        self.compositor = CanvasCompositor(width, height)
+        
+        # Colored layers shown instead of the mask overlay; the mask stays
+        # the coverage raster that undo, autosave and sharing work on
+        if color and tiled:
+            print("Color layers need a fixed canvas, drawing in one color")
+            color = False
+        self.layers = LayeredCanvas(width, height) if color else None
+        
+        # Undo/redo of committed operations
+        self.history = CanvasHistory(tile_size=self.canvas.tile_size) if tiled else CanvasHistory()
+        
+        # Optional CanvasAutosave, set by its attach()
+        self.autosave = None
+        
+        # Optional CanvasSync sharing the canvas with other sessions, set by its attach()
+        self.collab = None
+        
+        # Optional SessionRecorder logging every input, set by its attach()
+        self.recorder = None
+    
+    @property
+    def surface(self):
+        """The raster strokes are drawn into: the mask or the tiled canvas"""
+        return self.mask if self.canvas is None else self.canvas
+    
+    def to_canvas(self, points, size=0):
+        """
+        Map screen points (and a screen-space size) to canvas coordinates
+        Returns: (list of points, scaled size)
+        """
+        if self.canvas is None:
+            return points, size
+        viewport = self.canvas.viewport
+        points = [viewport.to_world(x, y) for x, y in points]
+        return points, size / viewport.zoom
+    
+    def select_hand(self, hand_id):
+        """
+        Make a hand's tool state the one the drawing methods use
+        Returns: the hand's HandState, created on first use
+        """
+        hand = self.hands.get(hand_id)
+        if hand is None:
+            hand = self.hands[hand_id] = HandState(self.smoothing)
+        self.hand = hand
+        self.hand_id = hand_id
+        return hand
+    
+    def lift_hand(self, hand_id):
+        """Close a hand's stroke and drop its shape in progress; it keeps its tool"""
+        if hand_id not in self.hands:
+            return
+        self.record("lift", hand=hand_id)
+        selected, selected_id = self.hand, self.hand_id
+        self.select_hand(hand_id)
+        self.end_stroke()
+        self.var_inits = False
+        self.hand, self.hand_id = selected, selected_id
+    
+    def end_all_strokes(self, cancel_shapes=False):
+        """Close the open stroke of every hand, optionally dropping shapes in progress"""
+        selected = self.hand
+        for hand in self.hands.values():
+            self.hand = hand
+            self.end_stroke()
+            if cancel_shapes:
+                hand.var_inits = False
+        self.hand = selected
     
     def get_tool_from_position(self, x):
         """Determine which tool is selected based on x position"""
@@ -33,45 +156,418 @@ class DrawingTools:
     
     def set_current_tool(self, tool):
         """Set the current drawing tool"""
+        self.record("tool", x=tool)
         self.current_tool = tool
         self.var_inits = False  # Reset initialization state
+        self.end_stroke()
     
     def draw_line(self, frame, start_pos, end_pos, preview=False):
         """Draw a line on frame or mask"""
-        target = frame if preview else self.mask
-        color = COLORS["line_preview"] if preview else 0
-        cv2.line(target, start_pos, end_pos, color, DEFAULT_THICKNESS)
+        if preview:
+            cv2.line(frame, start_pos, end_pos, COLORS["line_preview"], self.thickness)
+        else:
+            self.commit_stroke(LINE, [start_pos, end_pos], self.thickness, MASK_INK)
     
     def draw_rectangle(self, frame, start_pos, end_pos, preview=False):
         """Draw a rectangle on frame or mask"""
-        target = frame if preview else self.mask
-        color = COLORS["rectangle_preview"] if preview else 0
-        cv2.rectangle(target, start_pos, end_pos, color, DEFAULT_THICKNESS)
+        if preview:
+            cv2.rectangle(frame, start_pos, end_pos, COLORS["rectangle_preview"], self.thickness)
+        else:
+            self.commit_stroke(RECTANGLE, [start_pos, end_pos], self.thickness, MASK_INK)
     
     def draw_circle(self, frame, center, radius, preview=False):
         """Draw a circle on frame or mask"""
-        target = frame if preview else self.mask
-        color = COLORS["circle_preview"] if preview else COLORS["circle_mask"]
-        cv2.circle(target, center, radius, color, DEFAULT_THICKNESS)
+        if preview:
+            cv2.circle(frame, center, radius, COLORS["circle_preview"], self.thickness)
+        else:
+            self.commit_stroke(CIRCLE, [center], self.thickness, MASK_INK, radius)
     
     def draw_freehand(self, start_pos, end_pos):
         """Draw freehand line on mask"""
-        cv2.line(self.mask, start_pos, end_pos, 0, DEFAULT_THICKNESS)
+        if self.smoother is not None:
+            return self.draw_smoothed(end_pos)
+        if self.continues_active_stroke(FREEHAND, start_pos):
+            self.extend_active_stroke(end_pos)
+        else:
+            self.active_stroke = self.commit_stroke(
+                FREEHAND, [start_pos, end_pos], self.thickness, MASK_INK
+            )
+    
+    def draw_smoothed(self, position):
+        """Feed a fingertip sample through the smoother and draw what it commits"""
+        starting = not self.smoother.active
+        points = self.smoother.add(position)
+        if starting:
+            self.active_stroke = self.commit_stroke(
+                FREEHAND, [points[0], points[0]], self.thickness, MASK_INK
+            )
+        elif points and self.continues_active_stroke(FREEHAND):
+            self.extend_active_stroke(*points)
     
     def erase(self, frame, position):
         """Erase at given position"""
-        cv2.circle(frame, position, ERASER_RADIUS, COLORS["eraser"], -1)
-        cv2.circle(self.mask, position, ERASER_RADIUS, 255, -1)
+        if self.continues_active_stroke(ERASE):
+            self.extend_active_stroke(position)
+        else:
+            self.active_stroke = self.commit_stroke(
+                ERASE, [position], 0, MASK_BACKGROUND, ERASER_RADIUS
+            )
+    
+    def strokes_under(self, position):
+        """
+        Closed strokes within HIT_RADIUS of a screen position, found through the stroke index
+        Returns: int array of stroke indices, newest last
+        """
+        (point,), radius = self.to_canvas([position], HIT_RADIUS)
+        hits = self.strokes.hit_test(point[0], point[1], radius)
+        open_strokes = [hand.active_stroke for hand in self.hands.values() if hand.active_stroke is not None]
+        if open_strokes and len(hits):
+            hits = hits[~np.isin(hits, open_strokes)]
+        return hits
+    
+    def erase_strokes(self, position):
+        """Remove every whole stroke under the fingertip (object eraser)"""
+        hits = self.strokes_under(position)
+        if not len(hits):
+            return
+        self.share_strokes()
+        
+        # The operation stays open until the finger is lowered, like an erase stroke
+        self.history.begin(self.strokes)
+        self.history.hide(self.strokes, hits)
+        
+        # Only the area each hit stroke covered is redrawn
+        rects = [tuple(extent) for extent in self.strokes.extents.data[hits].tolist()]
+        self.redraw_regions(rects)
+        if self.collab is not None:
+            self.collab.tiles_changed(self, rects)
+    
+    def preview_move(self, frame, index, dx, dy):
+        """Outline a stroke being moved by a screen distance on the frame"""
+        if frame is None:
+            return
+        if self.canvas is None:
+            self.strokes.rasterize_stroke(frame, index, offset=(-dx, -dy), value=COLORS["ui_active"])
+            return
+        viewport = self.canvas.viewport
+        zoom = viewport.zoom
+        self.strokes.rasterize_stroke(frame, index, zoom, zoom, value=COLORS["ui_active"],
+                                      offset=(viewport.offset_x * zoom - dx, viewport.offset_y * zoom - dy))
+    
+    def move_stroke(self, index, dx, dy):
+        """
+        Move a stroke by a screen distance as one undoable operation
+        The stroke is hidden and a moved copy is added on top; only the
+        regions it left and entered are redrawn.
+        """
+        if self.canvas is not None:
+            dx, dy = dx / self.canvas.viewport.zoom, dy / self.canvas.viewport.zoom
+        if dx == 0 and dy == 0:
+            return
+        self.share_strokes()
+        moved = self.strokes.select([index])
+        moved["points"] = moved["points"] + np.array((dx, dy), dtype=np.float32)
+        
+        self.history.begin(self.strokes)
+        left = tuple(int(v) for v in self.strokes.extents.data[index])
+        self.history.hide(self.strokes, [index])
+        self.redraw_regions([left])
+        self.strokes.restore(moved)
+        added = len(self.strokes) - 1
+        self.render_stroke(added)
+        self.history.commit(self.surface, self.strokes)
+        if self.collab is not None:
+            self.collab.tiles_changed(self, [left, tuple(int(v) for v in self.strokes.extents.data[added])])
+    
+    def redraw_regions(self, rects):
+        """Redraw the canvas inside each rectangle from the visible strokes, saving undo tiles first"""
+        for rect in rects:
+            self.history.capture(self.surface, *rect)
+            self.mark_dirty(*rect)
+        if self.canvas is not None:
+            for rect in rects:
+                self.canvas.redraw(self.strokes, self.strokes.query(*rect), *rect)
+        else:
+            self.strokes.redraw_regions(self.mask, rects)
+        
+        # The layers redraw whole strokes per rectangle, so overlapping rectangles share one box
+        if self.layers is not None and len(rects) > 1:
+            rects = np.array(rects)
+            rects = [(*rects[:, :2].min(axis=0), *rects[:, 2:].max(axis=0))]
+        self.refresh_layers(rects)
+    
+    def commit_stroke(self, kind, points, thickness, value, radius=0):
+        """
+        Record a stroke and rasterize it into the mask cache
+        Returns: index of the stroke in the stroke store
+        """
+        points, radius = self.to_canvas(points, radius)
+        if self.canvas is not None and thickness:
+            thickness = max(1, int(round(thickness / self.canvas.viewport.zoom)))
+        
+        self.history.begin(self.strokes)
+        layer = self.layers.active if self.layers is not None else 0
+        index = self.strokes.add_stroke(kind, points, thickness, value, radius, self.color, layer)
+        self.render_stroke(index)
+        if self.collab is not None:
+            self.collab.stroke_added(index)
+        
+        # Freehand and erase strokes stay open until the finger is lowered
+        if kind != FREEHAND and kind != ERASE:
+            self.history.commit(self.surface, self.strokes)
+        return index
+    
+    def render_stroke(self, index, first_point=0):
+        """Rasterize a stroke (or its tail) into the surface, saving undo tiles first"""
+        bounds = self.strokes.bounds(index, first_point)
+        self.history.capture(self.surface, *bounds)
+        if self.canvas is not None:
+            self.canvas.draw_stroke(self.strokes, index, first_point)
+        else:
+            self.strokes.rasterize_stroke(self.mask, index, first_point=first_point)
+        if self.layers is not None:
+            self.layers.draw_stroke(self.strokes, index, first_point)
+        self.mark_dirty(*bounds)
+    
+    def mark_dirty(self, x1, y1, x2, y2):
+        """Flag a changed canvas region for the compositor and autosave"""
+        if self.canvas is None:
+            self.compositor.mark_dirty(x1, y1, x2, y2)
+        if self.autosave is not None:
+            self.autosave.mark_dirty(x1, y1, x2, y2)
+    
+    def continues_active_stroke(self, kind, start_pos=None):
+        """Check whether the selected hand's open stroke can be extended with this kind"""
+        if self.active_stroke is None or self.active_stroke >= len(self.strokes):
+            return False
+        if self.strokes.kinds.data[self.active_stroke] != kind:
+            return False
+        if start_pos is not None:
+            (start,), _ = self.to_canvas([start_pos])
+            return np.allclose(self.strokes.get_points(self.active_stroke)[-1], start, atol=0.5)
+        return True
+    
+    def extend_active_stroke(self, *points):
+        """Append points to the open stroke and rasterize the new part"""
+        index = self.active_stroke
+        points, _ = self.to_canvas(points)
+        for point in points:
+            self.strokes.extend_stroke(index, point)
+        
+        # Only the newest segments (or eraser stamps) change
+        first_point = -len(points) if self.strokes.kinds.data[index] == ERASE else -len(points) - 1
+        self.render_stroke(index, first_point)
+    
+    def end_stroke(self):
+        """Close the selected hand's open freehand or erase stroke"""
+        # Draw the smoothed tail that was waiting for another sample
+        if self.smoother is not None and self.smoother.active:
+            points = self.smoother.finish()
+            if points and self.continues_active_stroke(FREEHAND):
+                self.extend_active_stroke(*points)
+        self.active_stroke = None
+        
+        # Strokes drawn at the same time by several hands are undone together
+        if all(hand.active_stroke is None for hand in self.hands.values()):
+            self.history.commit(self.surface, self.strokes)
+    
+    def share_strokes(self):
+        """Publish closed strokes to a shared canvas before an operation rewrites the canvas"""
+        if self.collab is not None:
+            self.collab.publish_strokes(self)
+    
+    def record(self, name, x=0, y=0, value=0.0, hand=None):
+        """Log an input event for replay when a recorder is attached"""
+        if self.recorder is not None:
+            self.recorder.record(name, self.hand_id if hand is None else hand, x, y, value)
+    
+    def undo(self):
+        """
+        Revert the last committed operation
+        Returns: True if anything was undone
+        """
+        self.record("undo")
+        self.end_all_strokes(cancel_shapes=True)
+        self.share_strokes()
+        if not self.history.can_undo():
+            return False
+        rects = self.history.undo(self.surface, self.strokes)
+        for rect in rects:
+            self.mark_dirty(*rect)
+        self.refresh_layers(rects)
+        if self.collab is not None:
+            self.collab.tiles_changed(self, rects)
+        return True
+    
+    def redo(self):
+        """
+        Re-apply the last undone operation
+        Returns: True if anything was redone
+        """
+        self.record("redo")
+        self.end_all_strokes(cancel_shapes=True)
+        self.share_strokes()
+        if not self.history.can_redo():
+            return False
+        rects = self.history.redo(self.surface, self.strokes)
+        for rect in rects:
+            self.mark_dirty(*rect)
+        self.refresh_layers(rects)
+        if self.collab is not None:
+            self.collab.tiles_changed(self, rects)
+        return True
+    
+    def rebuild_mask(self, width=None, height=None):
+        """
+        Re-rasterize the mask cache from the stroke store
+        Passing a size resizes the canvas without losing geometry
+        """
+        self.end_all_strokes()
+        if self.canvas is not None:
+            return self.rebuild_tiles(width, height)
+        if width and height and (width, height) != (self.strokes.width, self.strokes.height):
+            self.strokes.rescale(width, height)
+        
+        # An autosaved canvas is rebuilt into a freshly mapped file
+        mask = None
+        if self.autosave is not None:
+            mask = self.autosave.remap(self.strokes.width, self.strokes.height)
+        self.mask = self.strokes.rasterize(mask=mask)
+        self.height, self.width = self.mask.shape
+        self.rebuild_layers()
+        
+        # Tile deltas refer to the old raster
+        self.history.clear()
+        return self.mask
+    
+    def rebuild_tiles(self, width=None, height=None):
+        """
+        Re-rasterize the tiled canvas; a size only resizes the viewport
+        since strokes are kept in world coordinates
+        """
+        if width and height:
+            self.canvas.viewport.width, self.canvas.viewport.height = width, height
+            self.width, self.height = width, height
+        self.canvas.clear()
+        for index in range(len(self.strokes)):
+            self.canvas.draw_stroke(self.strokes, index)
+        self.history.clear()
+        return self.canvas
+    
+    def clear(self):
+        """Remove all strokes and reset the mask"""
+        self.record("clear")
+        self.end_all_strokes(cancel_shapes=True)
+        self.share_strokes()
+        
+        # Clearing is undoable like any other operation
+        self.history.begin(self.strokes, removes_from=0)
+        self.history.capture_all(self.surface)
+        self.strokes.clear()
+        if self.canvas is not None:
+            self.canvas.clear()
+        else:
+            self.mask.fill(MASK_BACKGROUND)
+            self.compositor.mark_all_dirty()
+        if self.layers is not None:
+            self.layers.clear()
+        if self.autosave is not None:
+            self.autosave.mark_all_dirty()
+        self.history.commit(self.surface, self.strokes)
+        if self.collab is not None:
+            self.collab.cleared()
+    
+    def refresh_layers(self, rects):
+        """Redraw the color layers where the mask was rewritten, e.g. by undo or shared tiles"""
+        if self.layers is not None:
+            self.layers.redraw(self.strokes, rects, self.mask)
+    
+    def rebuild_layers(self):
+        """Redraw the color layers from the stroke store at the mask's size"""
+        if self.layers is not None:
+            self.layers.rebuild(self.strokes, self.width, self.height, self.mask)
+    
+    def set_color(self, color):
+        """Set the BGR color of the selected hand's next strokes"""
+        color = tuple(int(v) for v in color)
+        self.record("color", value=color)
+        self.color = color
+        self.end_stroke()
+    
+    def set_thickness(self, thickness):
+        """Set the brush width of the selected hand's next strokes"""
+        self.record("width", x=thickness)
+        self.thickness = max(1, int(thickness))
+        self.end_stroke()
+    
+    def select_layer(self, index):
+        """
+        Draw into another layer, adding layers up to it
+        Returns: index of the active layer
+        """
+        self.record("layer", x=index)
+        if self.layers is None:
+            return 0
+        self.end_all_strokes()
+        return self.layers.select_layer(index)
+    
+    def set_layer_visible(self, index, visible):
+        """Show or hide a color layer"""
+        self.record("layer_visible", x=index, y=int(visible))
+        if self.layers is not None:
+            self.layers.set_visible(index, visible)
+    
+    def set_layer_opacity(self, index, opacity):
+        """Change the opacity of a color layer, 0 to 1"""
+        self.record("layer_opacity", x=index, value=opacity)
+        if self.layers is not None:
+            self.layers.set_opacity(index, opacity)
+    
+    def pan(self, dx, dy):
+        """Scroll the tiled canvas by a screen-space distance"""
+        self.record("pan", dx, dy)
+        if self.canvas is not None:
+            self.canvas.viewport.pan(dx, dy)
+    
+    def zoom(self, factor):
+        """Zoom the tiled canvas around the centre of the view"""
+        self.record("zoom", value=factor)
+        if self.canvas is not None:
+            self.canvas.viewport.zoom_at(factor)
+    
+    def get_canvas_image(self):
+        """
+        The drawing as one image: the fixed mask, the drawn extent of the
+        tiled canvas, or the flattened color layers
+        Returns: uint8 mask, or BGRA image with color layers
+        """
+        if self.canvas is not None:
+            return self.canvas.render()
+        if self.layers is not None:
+            return self.layers.flatten()
+        return self.mask
+    
+    def save_strokes(self, path):
+        """Save the drawing as vector strokes"""
+        self.strokes.save(path)
+    
+    def load_strokes(self, path):
+        """Load vector strokes and rebuild the mask"""
+        self.end_all_strokes()
+        self.strokes = StrokeStore.load(path)
+        self.rebuild_mask(self.width, self.height)
     
     def process_drawing(self, frame, finger_positions, is_drawing):
         """Process drawing based on current tool and finger positions"""
         x, y = finger_positions['index_tip']
+        self.record("draw" if is_drawing else "hover", x, y)
         
         if self.current_tool == "draw":
             if is_drawing:
                 self.draw_freehand((self.prev_x, self.prev_y), (x, y))
                 self.prev_x, self.prev_y = x, y
             else:
+                self.end_stroke()
                 self.prev_x, self.prev_y = x, y
         
         elif self.current_tool == "line":
@@ -112,10 +608,63 @@ class DrawingTools:
         elif self.current_tool == "erase":
             if is_drawing:
                 self.erase(frame, (x, y))
+            else:
+                self.end_stroke()
+        
+        elif self.current_tool == "erase strokes":
+            if is_drawing:
+                self.erase_strokes((x, y))
+            else:
+                self.end_stroke()
+        
+        elif self.current_tool == "move":
+            if is_drawing:
+                if not self.var_inits:
+                    self.start_x, self.start_y = x, y
+                    self.var_inits = True
+                    hits = self.strokes_under((x, y))
+                    self.selection = int(hits[-1]) if len(hits) else None
+                
+                # Strokes may have been cleared or hidden by another session meanwhile
+                if self.selection is not None and (self.selection >= len(self.strokes) or
+                                                   self.strokes.hidden.data[self.selection]):
+                    self.selection = None
+                if self.selection is not None:
+                    self.preview_move(frame, self.selection, x - self.start_x, y - self.start_y)
+            else:
+                if self.var_inits:
+                    if self.selection is not None:
+                        self.move_stroke(self.selection, x - self.start_x, y - self.start_y)
+                    self.selection = None
+                    self.var_inits = False
+    
+    def draw_preview(self, frame, finger_positions):
+        """
+        Redraw the selected hand's shape in progress without changing any state
+        Used for frames that reuse the last detection results.
+        """
+        if not self.var_inits:
+            return
+        x, y = finger_positions['index_tip']
+        start = (self.start_x, self.start_y)
+        if self.current_tool == "line":
+            self.draw_line(frame, start, (x, y), preview=True)
+        elif self.current_tool == "rectangle":
+            self.draw_rectangle(frame, start, (x, y), preview=True)
+        elif self.current_tool == "circle":
+            radius = int(((self.start_x - x)**2 + (self.start_y - y)**2)**0.5)
+            self.draw_circle(frame, start, radius, preview=True)
+        elif self.current_tool == "move" and self.selection is not None:
+            self.preview_move(frame, self.selection, x - self.start_x, y - self.start_y)
     
     def apply_mask_to_frame(self, frame):
         """Apply drawing mask to frame"""
-        masked_frame = cv2.bitwise_and(frame, frame, mask=self.mask)
-        frame[:, :, 1] = masked_frame[:, :, 1]
-        frame[:, :, 2] = masked_frame[:, :, 2]
-        return frame
+        if self.canvas is not None:
+            return self.canvas.composite(frame)
+        if self.layers is not None:
+            return self.layers.composite(frame)
+        
+        # Resized canvases need an overlay of the new size
+        if self.compositor.width != self.width or self.compositor.height != self.height:
+            self.compositor = CanvasCompositor(self.width, self.height)
+        return self.compositor.composite(frame, self.mask)
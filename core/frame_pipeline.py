@@ -0,0 +1,209 @@
+"""
+Per-frame processing shared by the camera, web and headless front ends
+"""
+import cv2
+from core.hand_detector import HandDetector
+from core.drawing_tools import DrawingTools
+from core.hand_tracker import HandTracker
+from core.gestures import PINCH, OPEN_PALM, FIST, TWO_FINGERS, GESTURE_NAMES
+from utils.ui_helpers import UIHelpers
+from utils.profiler import StageProfiler
+from config.settings import COLORS, GESTURE_CLEAR_FRAMES
+from config.resolution import ResolutionConfig
+
+class FramePipeline:
+    def __init__(self, hand_detector=None, drawing_tools=None, ui_helpers=None, verbose=False,
+                 profiler=None, resolution=None, gestures=None):
+        # Components not passed in are sized from the resolution configuration
+        self.resolution = resolution or ResolutionConfig()
+        self.hand_detector = hand_detector or HandDetector(detection_size=self.resolution.detection)
+        self.drawing_tools = drawing_tools or DrawingTools(*self.resolution.canvas_size)
+        self.ui_helpers = ui_helpers or UIHelpers()
+        self.tools_image = self.ui_helpers.load_tools_image()
+        self.verbose = verbose
+        
+        # Stable hand ids, so each hand keeps its own tool state
+        self.hand_tracker = HandTracker(self.hand_detector.max_hands)
+        self.hand_ids = []
+        
+        # Optional GestureRecognizer; without one the raised finger test decides drawing
+        self.gestures = gestures
+        
+        # Skeleton drawing; the adaptive quality controller turns it off under load
+        self.draw_landmarks = True
+        
+        # What the last render drew per hand, so redraw can repeat it on a new frame
+        self.overlays = []
+        
+        # Stage timings; disabled unless a profiler is passed in
+        self.profiler = profiler or StageProfiler()
+        self.hand_detector.set_profiler(self.profiler)
+    
+    def mirror(self, frame):
+        """Flip the frame horizontally for the mirror effect"""
+        with self.profiler.stage("flip"):
+            return cv2.flip(frame, 1)
+    
+    def detect(self, frame):
+        """Run hand detection on a frame"""
+        with self.profiler.stage("detect"):
+            return self.hand_detector.detect_hands(frame)
+    
+    def render(self, frame, results):
+        """
+        Apply detection results, drawing and UI to the frame
+        Returns: the composited frame
+        """
+        # Inputs of this frame are grouped for session replay
+        if self.drawing_tools.recorder is not None:
+            self.drawing_tools.recorder.next_frame()
+        
+        # Landmarks are normalized; map them to this frame's pixels
+        height, width = frame.shape[:2]
+        hands = self.hand_detector.get_landmarks(results)
+        self.overlays = []
+        with self.profiler.stage("tracking"):
+            hand_ids = self.track_hands(hands, width, height)
+        self.hand_ids = hand_ids
+        if self.gestures is not None:
+            with self.profiler.stage("gestures"):
+                gestures = self.gestures.update(hands, width, height, slots=hand_ids)
+        
+        if len(hands):
+            for hand_index, hand_id in enumerate(hand_ids.tolist()):
+                hand_landmarks = results.multi_hand_landmarks[hand_index]
+                hand_points = hands[hand_index]
+                self.drawing_tools.select_hand(hand_id)
+                
+                # Draw hand landmarks
+                if self.draw_landmarks:
+                    with self.profiler.stage("landmarks"):
+                        self.hand_detector.draw_landmarks(frame, hand_landmarks)
+                
+                # Get finger positions
+                finger_positions = self.hand_detector.get_finger_positions(hand_points, width, height)
+                x, y = finger_positions['index_tip']
+                
+                # An open palm pauses both drawing and tool selection
+                if self.gestures is not None and gestures[hand_index] == OPEN_PALM:
+                    self.drawing_tools.process_drawing(frame, finger_positions, False)
+                    self.overlays.append((hand_id, hand_landmarks, finger_positions, None))
+                    continue
+                
+                # Handle tool selection
+                selected_tool, selection_indicator = self.ui_helpers.handle_tool_selection(
+                    x, y, self.drawing_tools.get_tool_from_position
+                )
+                
+                if selected_tool:
+                    self.drawing_tools.set_current_tool(selected_tool)
+                    if self.verbose:
+                        print(f"Tool selected: {selected_tool}")
+                
+                # Check if user is drawing (pinch gesture, or index finger raised)
+                if self.gestures is not None:
+                    is_drawing = self.apply_gesture(hand_id, gestures[hand_index])
+                else:
+                    is_drawing = self.hand_detector.is_index_raised(
+                        finger_positions['middle_tip'][1],
+                        finger_positions['middle_pip'][1],
+                        height
+                    )
+                
+                # Process drawing
+                with self.profiler.stage("drawing"):
+                    self.drawing_tools.process_drawing(frame, finger_positions, is_drawing)
+                
+                # Draw selection indicator if active
+                if selection_indicator:
+                    x_sel, y_sel, radius = selection_indicator
+                    cv2.circle(frame, (x_sel, y_sel), radius, COLORS["ui_active"], 2)
+                self.overlays.append((hand_id, hand_landmarks, finger_positions, selection_indicator))
+            
+            # The header shows the tool of the first tracked hand
+            self.drawing_tools.select_hand(int(hand_ids.min()))
+        
+        return self.compose(frame)
+    
+    def redraw(self, frame):
+        """
+        Draw the last rendered hands on a new frame without applying them again
+        Drawing, smoothing, gestures, tracking and session recording only
+        advance on new detection results; frames in between use this.
+        Returns: the composited frame
+        """
+        for hand_id, hand_landmarks, finger_positions, selection_indicator in self.overlays:
+            self.drawing_tools.select_hand(hand_id)
+            if self.draw_landmarks:
+                with self.profiler.stage("landmarks"):
+                    self.hand_detector.draw_landmarks(frame, hand_landmarks)
+            self.drawing_tools.draw_preview(frame, finger_positions)
+            if selection_indicator:
+                x_sel, y_sel, radius = selection_indicator
+                cv2.circle(frame, (x_sel, y_sel), radius, COLORS["ui_active"], 2)
+        if self.overlays:
+            self.drawing_tools.select_hand(min(overlay[0] for overlay in self.overlays))
+        return self.compose(frame)
+    
+    def compose(self, frame):
+        """
+        Composite the drawing and draw the UI on a frame
+        Returns: the composited frame
+        """
+        # Publish closed strokes and apply other sessions' changes to a shared board
+        if self.drawing_tools.collab is not None:
+            with self.profiler.stage("collab"):
+                self.drawing_tools.collab.tick(self.drawing_tools)
+        
+        # Apply drawing mask to frame
+        with self.profiler.stage("composite"):
+            frame = self.drawing_tools.apply_mask_to_frame(frame)
+        
+        # Hand due saves to the autosave thread; never waits on disk
+        if self.drawing_tools.autosave is not None:
+            with self.profiler.stage("autosave"):
+                self.drawing_tools.autosave.tick(self.drawing_tools.strokes)
+        
+        # Draw UI elements
+        with self.profiler.stage("ui"):
+            self.ui_helpers.draw_ui_elements(
+                frame, self.tools_image, self.drawing_tools.current_tool
+            )
+        
+        self.profiler.end_frame()
+        self.profiler.draw_overlay(frame)
+        return frame
+    
+    def track_hands(self, hands, width, height):
+        """
+        Stable ids for this frame's hands; hands gone for good put their pen down
+        Returns: (hands,) int array of ids
+        """
+        hand_ids = self.hand_tracker.update(hands, width, height)
+        for hand_id in self.hand_tracker.released:
+            self.drawing_tools.lift_hand(hand_id)
+        return hand_ids
+    
+    def apply_gesture(self, hand_id, gesture):
+        """
+        Run the one-shot action of a hand's gesture
+        Two fingers switch to the next tool, a held fist clears the canvas.
+        Returns: True if the hand should draw
+        """
+        if self.gestures.held_for(hand_id, TWO_FINGERS, self.gestures.stable_frames):
+            tools = list(self.ui_helpers.tool_positions)
+            current = self.drawing_tools.current_tool
+            next_tool = tools[(tools.index(current) + 1) % len(tools)] if current in tools else tools[0]
+            self.drawing_tools.set_current_tool(next_tool)
+            if self.verbose:
+                print(f"Gesture {GESTURE_NAMES[gesture]}: tool {next_tool}")
+        elif self.gestures.held_for(hand_id, FIST, GESTURE_CLEAR_FRAMES):
+            self.drawing_tools.clear()
+            if self.verbose:
+                print(f"Gesture {GESTURE_NAMES[gesture]}: canvas cleared")
+        return gesture == PINCH
+    
+    def process_frame(self, frame):
+        """Detect hands and render a frame in one synchronous step"""
+        results = self.detect(frame)
+        return self.render(frame, results)
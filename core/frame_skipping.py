@@ -0,0 +1,125 @@
+"""
+Frame-skipping detection with constant-velocity landmark prediction
+"""
+import math
+import numpy as np
+from core.detector_backends import (
+    DetectorBackend, DetectionResults, INDEX_TIP, WRIST, results_to_array, array_to_results
+)
+from core.hand_tracker import linear_sum_assignment
+from config.settings import DETECTION_SKIP_FACTOR, SKIP_MOTION_THRESHOLD, MAX_NUM_HANDS, HAND_MATCH_DISTANCE
+
+class FrameSkippingBackend(DetectorBackend):
+    """
+    Wraps a backend and only runs real inference every few frames
+    In between, landmarks are extrapolated from the last two detections
+    with a constant-velocity model. In adaptive mode inference also runs
+    early when the predicted index tip has moved more than
+    SKIP_MOTION_THRESHOLD pixels since the last detection. Each hand is
+    paired with the nearest hand of the previous detection, so hands that
+    trade places in the detector's output keep their own velocity.
+    """
+    name = "skip"
+    
+    def __init__(self, backend, skip_factor=DETECTION_SKIP_FACTOR, adaptive=False,
+                 motion_threshold=SKIP_MOTION_THRESHOLD, max_hands=MAX_NUM_HANDS):
+        self.backend = backend
+        self.skip_factor = max(1, skip_factor)
+        self.adaptive = adaptive
+        self.motion_threshold = motion_threshold
+        self.max_hands = max_hands
+        
+        self.frame_count = 0
+        self.detections = 0
+        
+        # Last detection as a (hands, 21, 3) array and its per-frame velocity
+        self.last_frame = None
+        self.last_points = None
+        self.velocity = None
+    
+    def detect(self, frame):
+        frame_number = self.frame_count
+        self.frame_count += 1
+        
+        if self.should_detect(frame_number, frame.shape[1], frame.shape[0]):
+            return self.run_detection(frame, frame_number)
+        return self.predict(frame_number)
+    
+    def should_detect(self, frame_number, frame_width, frame_height):
+        """Decide whether this frame needs real inference"""
+        if self.last_frame is None:
+            return True
+        
+        frames_since = frame_number - self.last_frame
+        if frames_since >= self.skip_factor:
+            return True
+        
+        # Re-detect early when the hand moves faster than the model can follow
+        if self.adaptive and self.velocity is not None:
+            displacement = self.velocity[:, INDEX_TIP, :2] * frames_since
+            pixels = np.hypot(displacement[:, 0] * frame_width, displacement[:, 1] * frame_height)
+            if np.nanmax(pixels, initial=0.0) > self.motion_threshold:
+                return True
+        return False
+    
+    def run_detection(self, frame, frame_number):
+        """Run the wrapped backend and update the motion model"""
+        results = self.backend.detect(frame)
+        self.detections += 1
+        points = results_to_array(results, self.max_hands)
+        
+        # Velocity only makes sense for hands seen in both detections
+        if self.last_points is not None:
+            self.velocity = self.hand_velocity(points, frame_number, frame.shape[1], frame.shape[0])
+        else:
+            self.velocity = None
+        
+        self.last_frame = frame_number
+        self.last_points = points
+        return results
+    
+    def hand_velocity(self, points, frame_number, frame_width, frame_height):
+        """
+        Per-frame velocity of each hand since the last detection
+        Hands are paired with the last detection's hands by the closest
+        total wrist distance, up to HAND_MATCH_DISTANCE of the frame
+        diagonal; hands without a partner and empty slots get zero velocity.
+        Returns: (hands, 21, 3) float32 array in the slot order of points
+        """
+        velocity = np.zeros_like(points)
+        current = np.flatnonzero(~np.isnan(points).any(axis=(1, 2)))
+        last = np.flatnonzero(~np.isnan(self.last_points).any(axis=(1, 2)))
+        if not len(current) or not len(last):
+            return velocity
+        
+        offsets = points[current, None, WRIST, :2] - self.last_points[None, last, WRIST, :2]
+        offsets = offsets * (frame_width, frame_height)
+        cost = np.hypot(offsets[..., 0], offsets[..., 1])
+        limit = HAND_MATCH_DISTANCE * math.hypot(frame_width, frame_height)
+        frames = frame_number - self.last_frame
+        for row, col in zip(*linear_sum_assignment(cost)):
+            if cost[row, col] <= limit:
+                velocity[current[row]] = (points[current[row]] - self.last_points[last[col]]) / frames
+        return velocity
+    
+    def predict(self, frame_number):
+        """
+        Extrapolate landmarks to the given frame
+        Returns: DetectionResults built from the predicted landmarks
+        """
+        if self.last_points is None:
+            return DetectionResults()
+        if self.velocity is None:
+            return array_to_results(self.last_points)
+        
+        predicted = self.last_points + self.velocity * (frame_number - self.last_frame)
+        return array_to_results(predicted)
+    
+    def reset(self):
+        """Drop the motion model so the next frame runs inference"""
+        self.last_frame = None
+        self.last_points = None
+        self.velocity = None
+    
+    def close(self):
+        self.backend.close()
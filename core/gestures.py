@@ -0,0 +1,138 @@
+"""
+Hand gesture recognition from landmark arrays
+"""
+import numpy as np
+from core.detector_backends import WRIST, INDEX_TIP, MIDDLE_MCP
+from config.settings import (
+    GESTURE_BEND_THRESHOLD, GESTURE_PINCH_THRESHOLD, GESTURE_PINCH_REACH, GESTURE_STABLE_FRAMES,
+    MAX_NUM_HANDS
+)
+
+# Gesture codes
+NONE, POINT, PINCH, OPEN_PALM, FIST, TWO_FINGERS = range(6)
+GESTURE_NAMES = ("none", "point", "pinch", "open palm", "fist", "two fingers")
+
+# Wrist followed by the four joints of each finger, thumb to pinky
+FINGER_CHAINS = np.array([[WRIST] + [1 + finger * 4 + joint for joint in range(4)] for finger in range(5)])
+FINGER_TIPS = FINGER_CHAINS[:, -1]
+THUMB_TIP = FINGER_TIPS[0]
+
+# Extended fingers, thumb to pinky, of each table gesture; "?" matches either
+GESTURE_PATTERNS = (
+    ("?1000", POINT),
+    ("?1100", TWO_FINGERS),
+    ("?1111", OPEN_PALM),
+    ("?0000", FIST),
+)
+
+def build_gesture_table(patterns=GESTURE_PATTERNS):
+    """
+    Expand finger patterns into a lookup table
+    Returns: (32,) array mapping an extended-finger bitmask (bit 0 = thumb) to a gesture
+    """
+    table = np.full(32, NONE, dtype=np.int8)
+    for pattern, gesture in patterns:
+        for code in range(32):
+            bits = [(code >> finger) & 1 for finger in range(5)]
+            if all(c == "?" or int(c) == bit for c, bit in zip(pattern, bits)):
+                table[code] = gesture
+    return table
+
+class GestureRecognizer:
+    """
+    Classifies the gesture of every hand in a landmark array at once
+    Features are computed for all fingers of all hands in a few NumPy
+    operations: the total bend of each finger (sum of its joint angles),
+    how far each fingertip reaches from the wrist and the gap between
+    thumb and index tips, both in palm lengths so they do not depend on
+    hand size or distance. Bend thresholds turn the fingers into a 5-bit
+    code that indexes a gesture table; a pinch overrides the table. A
+    gesture only takes effect once it has lasted stable_frames frames,
+    so a single misdetected frame does not flip the drawing state.
+    """
+    
+    def __init__(self, bend_threshold=GESTURE_BEND_THRESHOLD, pinch_threshold=GESTURE_PINCH_THRESHOLD,
+                 pinch_reach=GESTURE_PINCH_REACH, stable_frames=GESTURE_STABLE_FRAMES,
+                 max_hands=MAX_NUM_HANDS, patterns=GESTURE_PATTERNS):
+        self.bend_threshold = bend_threshold
+        self.pinch_threshold = pinch_threshold
+        self.pinch_reach = pinch_reach
+        self.stable_frames = stable_frames
+        self.table = build_gesture_table(patterns)
+        self.finger_bits = 1 << np.arange(5)
+        
+        # Per-hand debounce state, indexed like the landmark array
+        self.candidate = np.full(max_hands, NONE, dtype=np.int8)
+        self.held = np.zeros(max_hands, dtype=np.int32)
+        self.stable = np.full(max_hands, NONE, dtype=np.int8)
+    
+    def features(self, points, width, height):
+        """
+        Joint-angle and distance features of every hand
+        Coordinates are scaled to pixels of a width x height frame first,
+        so angles are not skewed by the frame's aspect ratio.
+        Returns: (bend (hands, 5) degrees, reach (hands, 5), pinch (hands,))
+        """
+        xy = points[..., :2] * np.array((width, height), dtype=np.float32)
+        
+        # Angle between consecutive bones of each finger
+        bones = np.diff(xy[:, FINGER_CHAINS], axis=2)
+        lengths = np.sqrt((bones * bones).sum(axis=-1)) + 1e-6
+        cosines = (bones[:, :, 1:] * bones[:, :, :-1]).sum(axis=-1) / (lengths[:, :, 1:] * lengths[:, :, :-1])
+        bend = np.degrees(np.arccos(np.clip(cosines, -1.0, 1.0))).sum(axis=-1)
+        
+        # Distances in palm lengths (wrist to middle finger base)
+        palm = np.sqrt(((xy[:, MIDDLE_MCP] - xy[:, WRIST]) ** 2).sum(axis=-1)) + 1e-6
+        tips = xy[:, FINGER_TIPS] - xy[:, WRIST, None]
+        reach = np.sqrt((tips * tips).sum(axis=-1)) / palm[:, None]
+        gap = xy[:, THUMB_TIP] - xy[:, INDEX_TIP]
+        pinch = np.sqrt((gap * gap).sum(axis=-1)) / palm
+        return bend, reach, pinch
+    
+    def classify(self, points, width, height):
+        """
+        Gesture of every hand in this frame alone
+        Returns: (hands,) int8 array of gesture codes
+        """
+        bend, reach, pinch = self.features(points, width, height)
+        codes = (bend < self.bend_threshold) @ self.finger_bits
+        gestures = self.table[codes]
+        
+        # Thumb on an outstretched index tip; a fist brings the tips together too
+        pinching = (pinch < self.pinch_threshold) & (reach[:, 1] > self.pinch_reach)
+        gestures[pinching] = PINCH
+        return gestures
+    
+    def update(self, points, width, height, slots=None):
+        """
+        Classify a frame and update the per-hand debounce state
+        slots gives the state slot of each hand, such as its HandTracker
+        id; by default a hand's slot is its position in the array.
+        Returns: (hands,) array of gestures in effect
+        """
+        slots = np.arange(len(points)) if slots is None else np.asarray(slots)
+        raw = self.classify(points, width, height) if len(points) else self.candidate[:0]
+        
+        # A gesture takes effect once it has been seen stable_frames times in a row
+        held = np.where(self.candidate[slots] == raw, self.held[slots] + 1, 1)
+        self.held[slots] = held
+        self.candidate[slots] = raw
+        self.stable[slots] = np.where(held >= self.stable_frames, raw, self.stable[slots])
+        
+        # Hands that left the frame start over
+        absent = np.ones(len(self.held), dtype=bool)
+        absent[slots] = False
+        self.candidate[absent] = NONE
+        self.held[absent] = 0
+        self.stable[absent] = NONE
+        return self.stable[slots]
+    
+    def held_for(self, slot, gesture, frames):
+        """True on the one frame a hand's gesture has been held for exactly frames frames"""
+        return self.stable[slot] == gesture and self.held[slot] == frames
+    
+    def reset(self):
+        """Forget every hand"""
+        self.candidate[:] = NONE
+        self.held[:] = 0
+        self.stable[:] = NONE
@@ -1,54 +1,114 @@
 """
 Hand detection and tracking using MediaPipe
 """
-import mediapipe as mp
-import cv2
-from config.settings import MIN_DETECTION_CONFIDENCE, MIN_TRACKING_CONFIDENCE, MAX_NUM_HANDS, WINDOW_WIDTH, WINDOW_HEIGHT
+import numpy as np
+from core.detector_backends import (
+    MediaPipeBackend, create_backend, extract_landmarks, NUM_LANDMARKS, INDEX_TIP, MIDDLE_MCP, MIDDLE_TIP
+)
+from core.roi_tracker import RoiTrackingBackend
+from core.frame_skipping import FrameSkippingBackend
+from core.downscaling import DownscalingBackend
+from config.settings import (
+    DETECTOR_BACKEND, ROI_TRACKING, DETECTION_SKIP_FACTOR, ADAPTIVE_SKIP, INDEX_FINGER_THRESHOLD,
+    MAX_NUM_HANDS
+)
+
+# Landmarks mapped to pixels by get_finger_positions; 'middle_pip' has
+# always been landmark 9, the middle finger's base (MCP) joint
+FINGER_POINTS = {
+    'index_tip': INDEX_TIP,
+    'middle_tip': MIDDLE_TIP,
+    'middle_pip': MIDDLE_MCP,
+}
+FINGER_INDICES = list(FINGER_POINTS.values())
 
 class HandDetector:
-    def __init__(self):
-        self.hands = mp.solutions.hands
-        self.hand_landmark = self.hands.Hands(
-            min_detection_confidence=MIN_DETECTION_CONFIDENCE,
-            min_tracking_confidence=MIN_TRACKING_CONFIDENCE,
-            max_num_hands=MAX_NUM_HANDS
-        )
-        self.draw_utils = mp.solutions.drawing_utils
+    def __init__(self, backend=None, roi_tracking=ROI_TRACKING, skip_factor=DETECTION_SKIP_FACTOR,
+                 adaptive_skip=ADAPTIVE_SKIP, adaptive_quality=False, detection_size=None,
+                 max_hands=MAX_NUM_HANDS):
+        # Backend defaults to MediaPipe; pass an instance to swap it out.
+        # ROI tracking feeds it both crops and full frames, which video-mode
+        # tracking cannot follow, so each image is then detected on its own
+        self.max_hands = max_hands
+        if backend is None:
+            static = roi_tracking and DETECTOR_BACKEND == MediaPipeBackend.name
+            options = {"static_image_mode": True} if static else {}
+            backend = create_backend(DETECTOR_BACKEND, max_num_hands=max_hands, **options)
+        self.backend = backend
+        
+        # Detect on a copy no larger than detection_size; a quality
+        # controller may lower the detection resolution further at runtime
+        if detection_size is not None or adaptive_quality:
+            self.backend = DownscalingBackend(self.backend, size=detection_size)
+        
+        # Optionally detect on a cropped window around the last hand
+        if roi_tracking:
+            self.backend = RoiTrackingBackend(self.backend, max_hands=max_hands)
+        
+        # Optionally skip inference and predict landmarks in between
+        if skip_factor > 1 or adaptive_skip or adaptive_quality:
+            self.backend = FrameSkippingBackend(self.backend, skip_factor, adaptive_skip, max_hands=max_hands)
+        
+        # Landmarks of the latest results, reused every frame
+        self.landmarks = np.full((max_hands, NUM_LANDMARKS, 3), np.nan, dtype=np.float32)
     
     def detect_hands(self, frame):
         """
         Detect hands in the given frame
-        Returns: processed results from MediaPipe
+        Returns: processed results from the detector backend
         """
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        return self.hand_landmark.process(rgb_frame)
+        return self.backend.detect(frame)
     
     def draw_landmarks(self, frame, hand_landmarks):
         """Draw hand landmarks on the frame"""
-        self.draw_utils.draw_landmarks(
-            frame, hand_landmarks, self.hands.HAND_CONNECTIONS
-        )
-    
-    def get_finger_positions(self, hand_landmarks):
-        """
-        Extract finger positions from hand landmarks
-        Returns: dict with finger positions
-        """
-        positions = {}
-        positions['index_tip'] = (
-            int(hand_landmarks.landmark[8].x * WINDOW_WIDTH),
-            int(hand_landmarks.landmark[8].y * WINDOW_HEIGHT)
-        )
-        positions['middle_tip'] = (
-            int(hand_landmarks.landmark[12].x * WINDOW_WIDTH),
-            int(hand_landmarks.landmark[12].y * WINDOW_HEIGHT)
-        )
-        positions['middle_pip'] = (
-            int(hand_landmarks.landmark[9].y * WINDOW_HEIGHT)
-        )
-        return positions
-    
-    def is_index_raised(self, middle_tip_y, middle_pip_y):
-        """Check if index finger is raised based on finger positions"""
-        from config.settings import INDEX_FINGER_THRESHOLD
-        return (middle_pip_y - middle_tip_y) > INDEX_FINGER_THRESHOLD
+        self.backend.draw_landmarks(frame, hand_landmarks)
+    
+    def set_profiler(self, profiler):
+        """Hand a StageProfiler to the backend and every backend it wraps"""
+        backend = self.backend
+        while backend is not None:
+            backend.profiler = profiler
+            backend = getattr(backend, "backend", None)
+    
+    def set_detection_quality(self, scale, skip_factor):
+        """
+        Set the detection resolution scale and frame-skip factor
+        Returns: False if the detector was not built with adaptive_quality
+        """
+        applied = False
+        backend = self.backend
+        while backend is not None:
+            if isinstance(backend, DownscalingBackend):
+                backend.scale = scale
+                applied = True
+            elif isinstance(backend, FrameSkippingBackend):
+                backend.skip_factor = max(1, skip_factor)
+            backend = getattr(backend, "backend", None)
+        return applied
+    
+    def close(self):
+        """Release the detector backend"""
+        self.backend.close()
+    
+    def get_landmarks(self, results):
+        """
+        Landmarks of all detected hands as one array, in a single pass
+        The array is a view of a buffer reused by the next call; copy it
+        to keep it longer.
+        Returns: (hands, 21, 3) float32 array of normalized (x, y, z)
+        """
+        count = extract_landmarks(results, self.landmarks)
+        return self.landmarks[:count]
+    
+    def get_finger_positions(self, hand_points, width, height):
+        """
+        Map normalized finger landmarks to pixels of a width x height canvas
+        hand_points is one hand of get_landmarks, a (21, 3) array.
+        Returns: dict of (x, y) finger positions
+        """
+        pixels = (hand_points[FINGER_INDICES, :2] * (width, height)).astype(np.int32).tolist()
+        return {name: tuple(point) for name, point in zip(FINGER_POINTS, pixels)}
+    
+    def is_index_raised(self, middle_tip_y, middle_pip_y, height):
+        """Check if index finger is raised based on finger positions on a canvas of the given height"""
+        return (middle_pip_y - middle_tip_y) > INDEX_FINGER_THRESHOLD * height
@@ -0,0 +1,143 @@
+"""
+Stable identities for detected hands across frames
+"""
+import math
+import numpy as np
+from core.detector_backends import WRIST
+from config.settings import MAX_NUM_HANDS, HAND_MATCH_DISTANCE, HAND_LOST_FRAMES
+
+def linear_sum_assignment(cost):
+    """
+    Minimum-cost assignment of rows to columns (Hungarian algorithm)
+    Plain Python, O(n^3); meant for the handful of hands in a frame.
+    Returns: (rows, cols) lists of matched indices, one pair per row or
+    column, whichever there are fewer of
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    rows, cols = cost.shape
+    if rows == 0:
+        return [], []
+    cost = cost.tolist()
+    
+    # Potentials u, v and the row matched to each column (1-based, 0 = none)
+    u = [0.0] * (rows + 1)
+    v = [0.0] * (cols + 1)
+    match = [0] * (cols + 1)
+    way = [0] * (cols + 1)
+    for row in range(1, rows + 1):
+        match[0] = row
+        col0 = 0
+        min_slack = [math.inf] * (cols + 1)
+        used = [False] * (cols + 1)
+        while True:
+            used[col0] = True
+            row0 = match[col0]
+            delta, col1 = math.inf, 0
+            for col in range(1, cols + 1):
+                if not used[col]:
+                    slack = cost[row0 - 1][col - 1] - u[row0] - v[col]
+                    if slack < min_slack[col]:
+                        min_slack[col] = slack
+                        way[col] = col0
+                    if min_slack[col] < delta:
+                        delta, col1 = min_slack[col], col
+            for col in range(cols + 1):
+                if used[col]:
+                    u[match[col]] += delta
+                    v[col] -= delta
+                else:
+                    min_slack[col] -= delta
+            col0 = col1
+            if match[col0] == 0:
+                break
+        
+        # Flip the augmenting path
+        while col0:
+            col1 = way[col0]
+            match[col0] = match[col1]
+            col0 = col1
+    
+    pairs = sorted((match[col] - 1, col - 1) for col in range(1, cols + 1) if match[col])
+    matched_rows = [row for row, _ in pairs]
+    matched_cols = [col for _, col in pairs]
+    if transposed:
+        pairs = sorted(zip(matched_cols, matched_rows))
+        return [row for row, _ in pairs], [col for _, col in pairs]
+    return matched_rows, matched_cols
+
+class HandTracker:
+    """
+    Gives each detected hand an id that stays the same across frames
+    Ids are slots 0..max_hands-1. Every frame the wrists of the detected
+    hands are matched to the last known wrist of each tracked hand by a
+    minimum-total-distance assignment; pairs further apart than
+    match_distance (a fraction of the frame diagonal) are not matched.
+    Unmatched detections take a free slot. A tracked hand that goes
+    unseen keeps its slot for lost_frames frames, so a brief detection
+    dropout does not hand its id to someone else; after that it is
+    released.
+    """
+    
+    def __init__(self, max_hands=MAX_NUM_HANDS, match_distance=HAND_MATCH_DISTANCE,
+                 lost_frames=HAND_LOST_FRAMES):
+        self.max_hands = max_hands
+        self.match_distance = match_distance
+        self.lost_frames = lost_frames
+        
+        # Last wrist position of each slot in pixels, NaN when free
+        self.positions = np.full((max_hands, 2), np.nan)
+        self.missing = np.zeros(max_hands, dtype=np.int32)
+        
+        # Slots freed or handed to a new hand by the latest update
+        self.released = []
+    
+    def update(self, points, width, height):
+        """
+        Assign ids to the hands of a (hands, 21, 3) landmark array
+        Returns: (hands,) int array of ids
+        """
+        wrists = points[:, WRIST, :2].astype(np.float64) * (width, height)
+        tracked = np.flatnonzero(~np.isnan(self.positions[:, 0]))
+        ids = np.full(len(points), -1, dtype=np.int64)
+        
+        # Closest overall pairing of detections and tracked hands
+        if len(points) and len(tracked):
+            offsets = wrists[:, None] - self.positions[None, tracked]
+            cost = np.sqrt((offsets * offsets).sum(axis=-1))
+            limit = self.match_distance * math.hypot(width, height)
+            for row, col in zip(*linear_sum_assignment(cost)):
+                if cost[row, col] <= limit:
+                    ids[row] = tracked[col]
+        
+        # New hands take free slots, or the slot of the longest-lost hand
+        evicted = []
+        for row in np.flatnonzero(ids < 0):
+            taken = set(ids[ids >= 0].tolist())
+            free = [slot for slot in range(self.max_hands)
+                    if slot not in taken and np.isnan(self.positions[slot, 0])]
+            if free:
+                ids[row] = free[0]
+            else:
+                lost = [slot for slot in range(self.max_hands) if slot not in taken]
+                ids[row] = max(lost, key=lambda slot: self.missing[slot])
+                evicted.append(int(ids[row]))
+        
+        # Age hands that were not seen and release those gone too long
+        seen = np.zeros(self.max_hands, dtype=bool)
+        seen[ids] = True
+        self.missing[seen] = 0
+        self.missing[~seen] += 1
+        self.positions[ids] = wrists
+        expired = ~seen & ~np.isnan(self.positions[:, 0]) & (self.missing > self.lost_frames)
+        self.released = evicted + np.flatnonzero(expired).tolist()
+        self.positions[expired] = np.nan
+        return ids
+    
+    def reset(self):
+        """Forget every hand"""
+        self.positions[:] = np.nan
+        self.missing[:] = 0
+        self.released = []
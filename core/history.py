@@ -0,0 +1,215 @@
+"""
+Undo/redo history storing compressed tile deltas of the drawing mask
+"""
+import zlib
+from collections import deque
+import numpy as np
+from config.settings import HISTORY_TILE_SIZE, HISTORY_MEMORY_BUDGET
+
+def compress_tile(data):
+    """zlib-compress a tile; unallocated tiles (None) become empty bytes"""
+    return b"" if data is None else zlib.compress(data.tobytes(), 1)
+
+def decompress_tile(data, shape):
+    """Inverse of compress_tile"""
+    if not data:
+        return None
+    return np.frombuffer(zlib.decompress(data), dtype=np.uint8).reshape(shape).copy()
+
+def snapshot_nbytes(snapshot):
+    """Bytes held by a stroke snapshot"""
+    return sum(array.nbytes for array in snapshot.values())
+
+class HistoryEntry:
+    """One committed operation: changed tiles before/after, stroke tails and hidden strokes"""
+    __slots__ = ("tiles", "common", "strokes_before", "strokes_after", "hidden", "nbytes")
+    
+    def __init__(self, tiles, common, strokes_before, strokes_after, hidden):
+        # tiles: list of (row, col, shape, compressed before, compressed after)
+        self.tiles = tiles
+        self.common = common
+        self.strokes_before = strokes_before
+        self.strokes_after = strokes_after
+        self.hidden = hidden
+        self.nbytes = (sum(len(before) + len(after) for _, _, _, before, after in tiles)
+                       + snapshot_nbytes(strokes_before) + snapshot_nbytes(strokes_after) + hidden.nbytes)
+
+class CanvasHistory:
+    """
+    Undo/redo stack for DrawingTools
+    Works on the fixed mask array or on a TiledCanvas, whose tile size
+    must then match. Before a tile is first modified by an operation its
+    contents are copied; when the operation is committed only those
+    tiles are stored, zlib-compressed, together with the strokes the
+    operation removed or added and the older strokes it hid. The oldest
+    entries are evicted once the stack exceeds its memory budget.
+    """
+    
+    def __init__(self, tile_size=HISTORY_TILE_SIZE, memory_budget=HISTORY_MEMORY_BUDGET):
+        self.tile_size = tile_size
+        self.memory_budget = memory_budget
+        
+        self.undo_stack = deque()
+        self.redo_stack = []
+        self.nbytes = 0
+        
+        # State of the operation in progress
+        self.open = False
+        self.captured = {}
+        self.common = 0
+        self.strokes_before = None
+        self.hidden = []
+    
+    def begin(self, strokes, removes_from=None):
+        """
+        Start an operation unless one is already in progress
+        Operations that delete strokes pass the index of the first
+        stroke they remove so it can be restored on undo.
+        """
+        if self.open:
+            return
+        self.open = True
+        self.captured = {}
+        self.common = len(strokes) if removes_from is None else removes_from
+        self.strokes_before = strokes.snapshot(self.common)
+        self.hidden = []
+    
+    def hide(self, strokes, indices):
+        """Hide existing strokes as part of the operation in progress"""
+        strokes.set_hidden(indices)
+        if self.open:
+            self.hidden.extend(int(index) for index in indices)
+    
+    def capture(self, surface, x1, y1, x2, y2):
+        """Save tiles in the rectangle that this operation has not touched yet"""
+        if not self.open:
+            return
+        tile = self.tile_size
+        if isinstance(surface, np.ndarray):
+            height, width = surface.shape[:2]
+            x1, y1 = max(0, int(x1)), max(0, int(y1))
+            x2, y2 = min(width, int(x2)), min(height, int(y2))
+        if x2 <= x1 or y2 <= y1:
+            return
+        
+        for row in range(int(y1) // tile, (int(y2) - 1) // tile + 1):
+            for col in range(int(x1) // tile, (int(x2) - 1) // tile + 1):
+                if (row, col) not in self.captured:
+                    self.captured[(row, col)] = self.read_tile(surface, row, col)
+    
+    def capture_all(self, surface):
+        """Save every non-blank tile of the surface"""
+        if isinstance(surface, np.ndarray):
+            self.capture(surface, 0, 0, surface.shape[1], surface.shape[0])
+        elif self.open:
+            for key in surface.tiles:
+                if key not in self.captured:
+                    self.captured[key] = surface.read_tile(*key)
+    
+    def read_tile(self, surface, row, col):
+        """Copy of one tile of a mask array or TiledCanvas (None if unallocated)"""
+        if isinstance(surface, np.ndarray):
+            tile = self.tile_size
+            return surface[row * tile:(row + 1) * tile, col * tile:(col + 1) * tile].copy()
+        return surface.read_tile(row, col)
+    
+    def write_tile(self, surface, row, col, data):
+        """Write one tile back into a mask array or TiledCanvas"""
+        if isinstance(surface, np.ndarray):
+            tile = self.tile_size
+            surface[row * tile:row * tile + data.shape[0], col * tile:col * tile + data.shape[1]] = data
+        else:
+            surface.write_tile(row, col, data)
+    
+    def commit(self, surface, strokes):
+        """Finish the operation in progress and push it onto the undo stack"""
+        if not self.open:
+            return
+        self.open = False
+        
+        tiles = []
+        for (row, col), before in self.captured.items():
+            after = self.read_tile(surface, row, col)
+            if before is None and after is None:
+                continue
+            if before is not None and after is not None and np.array_equal(before, after):
+                continue
+            shape = (before if before is not None else after).shape
+            tiles.append((row, col, shape, compress_tile(before), compress_tile(after)))
+        self.captured = {}
+        
+        strokes_after = strokes.snapshot(self.common)
+        hidden = np.array(self.hidden, dtype=np.int64)
+        self.hidden = []
+        if (not tiles and not len(self.strokes_before["kinds"]) and not len(strokes_after["kinds"])
+                and not len(hidden)):
+            return
+        self.push(HistoryEntry(tiles, self.common, self.strokes_before, strokes_after, hidden))
+        self.strokes_before = None
+    
+    def push(self, entry):
+        """Add a committed entry, dropping redo history and old entries"""
+        self.undo_stack.append(entry)
+        self.nbytes += entry.nbytes
+        for redo_entry in self.redo_stack:
+            self.nbytes -= redo_entry.nbytes
+        self.redo_stack = []
+        
+        while self.nbytes > self.memory_budget and len(self.undo_stack) > 1:
+            self.nbytes -= self.undo_stack.popleft().nbytes
+    
+    def can_undo(self):
+        return bool(self.undo_stack)
+    
+    def can_redo(self):
+        return bool(self.redo_stack)
+    
+    def undo(self, surface, strokes):
+        """
+        Revert the most recent operation
+        Returns: list of changed (x1, y1, x2, y2) rectangles
+        """
+        if not self.undo_stack:
+            return []
+        entry = self.undo_stack.pop()
+        self.redo_stack.append(entry)
+        strokes.truncate(entry.common)
+        strokes.restore(entry.strokes_before)
+        strokes.set_hidden(entry.hidden, False)
+        return self.apply_tiles(surface, entry, before=True)
+    
+    def redo(self, surface, strokes):
+        """
+        Re-apply the most recently undone operation
+        Returns: list of changed (x1, y1, x2, y2) rectangles
+        """
+        if not self.redo_stack:
+            return []
+        entry = self.redo_stack.pop()
+        self.undo_stack.append(entry)
+        strokes.truncate(entry.common)
+        strokes.restore(entry.strokes_after)
+        strokes.set_hidden(entry.hidden)
+        return self.apply_tiles(surface, entry, before=False)
+    
+    def apply_tiles(self, surface, entry, before):
+        """
+        Write the stored before or after tiles back into the surface
+        Returns: list of changed (x1, y1, x2, y2) rectangles
+        """
+        tile = self.tile_size
+        rects = []
+        for row, col, shape, compressed_before, compressed_after in entry.tiles:
+            data = decompress_tile(compressed_before if before else compressed_after, shape)
+            self.write_tile(surface, row, col, data)
+            rects.append((col * tile, row * tile, col * tile + shape[1], row * tile + shape[0]))
+        return rects
+    
+    def clear(self):
+        """Forget all history"""
+        self.undo_stack.clear()
+        self.redo_stack = []
+        self.nbytes = 0
+        self.open = False
+        self.captured = {}
+        self.hidden = []
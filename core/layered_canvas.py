@@ -0,0 +1,269 @@
+"""
+Colored drawing layers, flattened into cached groups for compositing
+"""
+import cv2
+import numpy as np
+from config.settings import COMPOSITE_TILE_SIZE, DEFAULT_STROKE_COLOR, MASK_BACKGROUND, MAX_LAYERS
+from core.stroke_store import ERASE
+
+# Layer groups, bottom to top
+BELOW, ACTIVE, ABOVE = range(3)
+
+def blend_layers(layers, x1, y1, x2, y2):
+    """
+    Premultiplied "over" of visible layers inside a rectangle, bottom first
+    Returns: (float32 premultiplied BGR, float32 alpha in 0..1)
+    """
+    color = np.zeros((y2 - y1, x2 - x1, 3), dtype=np.float32)
+    alpha = np.zeros((y2 - y1, x2 - x1), dtype=np.float32)
+    for layer in layers:
+        if not layer.visible or layer.opacity <= 0:
+            continue
+        image = layer.image[y1:y2, x1:x2]
+        layer_alpha = image[:, :, 3] * np.float32(layer.opacity / 255.0)
+        keep = 1.0 - layer_alpha
+        color *= keep[:, :, None]
+        color += image[:, :, :3] * layer_alpha[:, :, None]
+        alpha *= keep
+        alpha += layer_alpha
+    return color, alpha
+
+class Layer:
+    """One BGRA drawing layer with its visibility and opacity"""
+    
+    def __init__(self, width, height):
+        self.image = np.zeros((height, width, 4), dtype=np.uint8)
+        self.visible = True
+        self.opacity = 1.0
+
+class LayerGroup:
+    """
+    Consecutive layers flattened into one blend, refreshed by region
+    Holds the premultiplied color of the group and 255 minus its alpha
+    in all three channels, so blending into a frame is one multiply and
+    one saturating add. Like CanvasCompositor, only tile rows holding
+    ink are touched when blending.
+    """
+    
+    def __init__(self, width, height, tile_size=COMPOSITE_TILE_SIZE):
+        self.width = width
+        self.height = height
+        self.tile_size = tile_size
+        
+        self.color = np.zeros((height, width, 3), dtype=np.uint8)
+        self.inverse = np.full((height, width, 3), 255, dtype=np.uint8)
+        rows = (height + tile_size - 1) // tile_size
+        cols = (width + tile_size - 1) // tile_size
+        self.tile_ink = np.zeros((rows, cols), dtype=bool)
+        
+        # Per tile row: (x1, x2) pixel span covering all ink tiles, or None
+        self.row_spans = [None] * rows
+    
+    def refresh(self, layers, x1, y1, x2, y2):
+        """Re-flatten the layers inside a rectangle already clipped to the canvas"""
+        color, alpha = blend_layers(layers, x1, y1, x2, y2)
+        self.color[y1:y2, x1:x2] = np.rint(color)
+        self.inverse[y1:y2, x1:x2] = np.rint(255.0 - alpha * 255.0)[:, :, None]
+        
+        # Re-check ink in every tile overlapping the region
+        tile = self.tile_size
+        row1, row2 = y1 // tile, (y2 - 1) // tile + 1
+        col1, col2 = x1 // tile, (x2 - 1) // tile + 1
+        block = self.inverse[row1 * tile:row2 * tile, col1 * tile:col2 * tile, 0]
+        tile_min = np.minimum.reduceat(block, np.arange(0, block.shape[0], tile), axis=0)
+        tile_min = np.minimum.reduceat(tile_min, np.arange(0, block.shape[1], tile), axis=1)
+        self.tile_ink[row1:row2, col1:col2] = tile_min != 255
+        
+        for row in range(row1, row2):
+            cols = np.flatnonzero(self.tile_ink[row])
+            if len(cols):
+                self.row_spans[row] = (cols[0] * tile, min(self.width, (cols[-1] + 1) * tile))
+            else:
+                self.row_spans[row] = None
+    
+    def composite(self, frame):
+        """Blend the group into the frame in place"""
+        tile = self.tile_size
+        for row, span in enumerate(self.row_spans):
+            if span is None:
+                continue
+            y1, y2 = row * tile, min(self.height, (row + 1) * tile)
+            x1, x2 = span
+            region = frame[y1:y2, x1:x2]
+            cv2.multiply(region, self.inverse[y1:y2, x1:x2], dst=region, scale=1.0 / 255.0)
+            cv2.add(region, self.color[y1:y2, x1:x2], dst=region)
+
+class LayeredCanvas:
+    """
+    Ordered stack of colored layers, a color cache of the stroke store
+    Strokes are rasterized in their own color into the layer they were
+    drawn on; the eraser clears every layer, as it clears the coverage
+    mask. For compositing the stack is kept as three cached groups: the
+    layers below the active one, the active layer and the layers above.
+    Drawing only refreshes the active group inside the stroke's bounds,
+    so a frame blends the active layer between two cached flattened
+    groups instead of every layer, and the groups are only rebuilt when
+    another layer is selected or changes.
+    """
+    
+    def __init__(self, width, height, tile_size=COMPOSITE_TILE_SIZE):
+        self.width = width
+        self.height = height
+        self.tile_size = tile_size
+        self.layers = [Layer(width, height)]
+        self.active = 0
+        self.groups = [LayerGroup(width, height, tile_size) for _ in range(3)]
+        
+        # Full-size image strokes are redrawn into before copying a region back
+        self.scratch = None
+    
+    def group_layers(self, group):
+        """Layers flattened into a group, bottom first"""
+        if group == BELOW:
+            return self.layers[:self.active]
+        if group == ACTIVE:
+            return self.layers[self.active:self.active + 1]
+        return self.layers[self.active + 1:]
+    
+    def group_of(self, layer):
+        """Group a layer is flattened into"""
+        if layer < self.active:
+            return BELOW
+        return ACTIVE if layer == self.active else ABOVE
+    
+    def refresh(self, x1, y1, x2, y2, groups=(BELOW, ACTIVE, ABOVE)):
+        """Re-flatten groups inside a rectangle"""
+        x1, y1 = max(0, int(x1)), max(0, int(y1))
+        x2, y2 = min(self.width, int(x2)), min(self.height, int(y2))
+        if x2 <= x1 or y2 <= y1:
+            return
+        for group in groups:
+            self.groups[group].refresh(self.group_layers(group), x1, y1, x2, y2)
+    
+    def refresh_all(self, groups=(BELOW, ACTIVE, ABOVE)):
+        """Re-flatten groups over the whole canvas"""
+        self.refresh(0, 0, self.width, self.height, groups)
+    
+    def ensure_layer(self, index):
+        """Add layers until index exists, e.g. for strokes drawn on another canvas"""
+        while len(self.layers) <= index:
+            self.layers.append(Layer(self.width, self.height))
+    
+    def select_layer(self, index):
+        """
+        Make a layer the one strokes go into, adding layers up to it
+        Returns: index of the active layer
+        """
+        index = max(0, min(int(index), MAX_LAYERS - 1))
+        self.ensure_layer(index)
+        if index != self.active:
+            self.active = index
+            self.refresh_all()
+        return self.active
+    
+    def set_visible(self, index, visible):
+        """Show or hide a layer"""
+        self.ensure_layer(index)
+        self.layers[index].visible = bool(visible)
+        self.refresh_all([self.group_of(index)])
+    
+    def set_opacity(self, index, opacity):
+        """Change how opaque a layer is, 0 to 1"""
+        self.ensure_layer(index)
+        self.layers[index].opacity = min(1.0, max(0.0, float(opacity)))
+        self.refresh_all([self.group_of(index)])
+    
+    def stroke_value(self, strokes, index):
+        """BGRA drawing color of a stroke; erase strokes clear to transparent"""
+        if strokes.kinds.data[index] == ERASE:
+            return (0, 0, 0, 0)
+        return tuple(int(v) for v in strokes.colors.data[index]) + (255,)
+    
+    def draw_stroke(self, strokes, index, first_point=0):
+        """Rasterize a stroke (or its tail) into its layer and refresh that layer's group"""
+        value = self.stroke_value(strokes, index)
+        bounds = strokes.bounds(index, first_point)
+        if strokes.kinds.data[index] == ERASE:
+            for layer in self.layers:
+                strokes.rasterize_stroke(layer.image, index, first_point=first_point, value=value)
+            self.refresh(*bounds)
+            return
+        
+        layer = int(strokes.layers.data[index])
+        self.ensure_layer(layer)
+        strokes.rasterize_stroke(self.layers[layer].image, index, first_point=first_point, value=value)
+        self.refresh(*bounds, groups=[self.group_of(layer)])
+    
+    def redraw(self, strokes, rects, mask=None):
+        """
+        Re-rasterize the strokes crossing each rectangle, e.g. after undo
+        A coverage mask clips the result to where it holds ink, and ink
+        no local stroke explains (tiles from another canvas) is painted
+        in the default color on the bottom layer.
+        """
+        if len(strokes):
+            self.ensure_layer(int(strokes.layers.view().max()))
+        if self.scratch is None or self.scratch.shape[:2] != (self.height, self.width):
+            self.scratch = np.zeros((self.height, self.width, 4), dtype=np.uint8)
+        
+        for x1, y1, x2, y2 in rects:
+            x1, y1 = max(0, int(x1)), max(0, int(y1))
+            x2, y2 = min(self.width, int(x2)), min(self.height, int(y2))
+            if x2 <= x1 or y2 <= y1:
+                continue
+            crossing = strokes.query(x1, y1, x2, y2)
+            
+            # Strokes are drawn whole into the scratch image, since OpenCV
+            # clips thin lines to a smaller image along a slightly different
+            # path, and in order so later erase strokes clear earlier ink
+            for number, layer in enumerate(self.layers):
+                self.scratch[y1:y2, x1:x2] = 0
+                for index in crossing:
+                    if strokes.kinds.data[index] == ERASE or strokes.layers.data[index] == number:
+                        strokes.rasterize_stroke(self.scratch, index, value=self.stroke_value(strokes, index))
+                layer.image[y1:y2, x1:x2] = self.scratch[y1:y2, x1:x2]
+            
+            if mask is not None:
+                empty = mask[y1:y2, x1:x2] == MASK_BACKGROUND
+                covered = np.zeros(empty.shape, dtype=bool)
+                for layer in self.layers:
+                    layer.image[y1:y2, x1:x2][empty] = 0
+                    covered |= layer.image[y1:y2, x1:x2, 3] != 0
+                self.layers[0].image[y1:y2, x1:x2][~empty & ~covered] = DEFAULT_STROKE_COLOR + (255,)
+            self.refresh(x1, y1, x2, y2)
+    
+    def rebuild(self, strokes, width=None, height=None, mask=None):
+        """Re-rasterize every layer from the strokes, optionally at a new size"""
+        if width and height and (width, height) != (self.width, self.height):
+            self.width, self.height = width, height
+            for layer in self.layers:
+                layer.image = np.zeros((height, width, 4), dtype=np.uint8)
+            self.groups = [LayerGroup(width, height, self.tile_size) for _ in range(3)]
+        self.redraw(strokes, [(0, 0, self.width, self.height)], mask)
+    
+    def clear(self):
+        """Make every layer transparent; the stack itself is kept"""
+        for layer in self.layers:
+            layer.image.fill(0)
+        self.refresh_all()
+    
+    def composite(self, frame):
+        """
+        Blend the layer stack into the frame in place
+        Returns: the same frame object
+        """
+        for group in self.groups:
+            group.composite(frame)
+        return frame
+    
+    def flatten(self):
+        """
+        The visible layers merged into one image
+        Returns: uint8 BGRA image with straight (not premultiplied) alpha
+        """
+        color, alpha = blend_layers(self.layers, 0, 0, self.width, self.height)
+        image = np.zeros((self.height, self.width, 4), dtype=np.uint8)
+        inked = alpha > 0
+        image[inked, :3] = np.rint(color[inked] / alpha[inked, None])
+        image[:, :, 3] = np.rint(alpha * 255.0)
+        return image
@@ -0,0 +1,104 @@
+"""
+Adaptive quality: trade detection resolution and rate for frame latency
+"""
+from config.settings import (
+    QUALITY_LATENCY_BUDGET, QUALITY_RECOVER_RATIO, QUALITY_DEGRADE_FRAMES, QUALITY_RECOVER_FRAMES,
+    QUALITY_SMOOTHING, QUALITY_LEVELS
+)
+
+class QualityController:
+    """
+    Steps a FramePipeline through QUALITY_LEVELS to hold a latency budget
+    Each level sets the detection resolution scale, the frame-skip factor
+    and whether the hand skeleton is drawn; level 0 is full quality. The
+    smoothed latency must stay over budget for degrade_frames frames to
+    drop a level, and under recover_ratio of the budget for the longer
+    recover_frames to climb back, so quality does not oscillate around
+    the budget. The pipeline's HandDetector needs adaptive_quality=True
+    for the resolution and skip factor to take effect.
+    """
+    
+    def __init__(self, pipeline, budget_ms=QUALITY_LATENCY_BUDGET, levels=QUALITY_LEVELS,
+                 recover_ratio=QUALITY_RECOVER_RATIO, degrade_frames=QUALITY_DEGRADE_FRAMES,
+                 recover_frames=QUALITY_RECOVER_FRAMES, smoothing=QUALITY_SMOOTHING, verbose=True):
+        self.pipeline = pipeline
+        self.budget_ms = budget_ms
+        self.levels = levels
+        self.recover_ratio = recover_ratio
+        self.degrade_frames = degrade_frames
+        self.recover_frames = recover_frames
+        self.smoothing = smoothing
+        self.verbose = verbose
+        
+        # Exponential moving average of the measured latency
+        self.latency_ms = None
+        self.frames_over = 0
+        self.frames_under = 0
+        self.level_changes = 0
+        
+        self.level = 0
+        self.apply()
+    
+    def update(self, latency_ms):
+        """
+        Feed one frame's end-to-end latency
+        Returns: the quality level for the next frame
+        """
+        if self.latency_ms is None:
+            self.latency_ms = latency_ms
+        else:
+            self.latency_ms += self.smoothing * (latency_ms - self.latency_ms)
+        
+        # Consecutive frames on either side of the hysteresis band
+        if self.latency_ms > self.budget_ms:
+            self.frames_over += 1
+            self.frames_under = 0
+        elif self.latency_ms < self.budget_ms * self.recover_ratio:
+            self.frames_under += 1
+            self.frames_over = 0
+        else:
+            self.frames_over = 0
+            self.frames_under = 0
+        
+        if self.frames_over >= self.degrade_frames and self.level < len(self.levels) - 1:
+            self.set_level(self.level + 1)
+        elif self.frames_under >= self.recover_frames and self.level > 0:
+            self.set_level(self.level - 1)
+        return self.level
+    
+    def set_level(self, level):
+        """Switch to a quality level and restart the hysteresis counters"""
+        level = max(0, min(level, len(self.levels) - 1))
+        if level != self.level:
+            self.level_changes += 1
+            if self.verbose:
+                scale, skip_factor, landmarks = self.levels[level]
+                print(f"Quality level {level}: detection scale {scale}, skip factor {skip_factor}, "
+                      f"landmarks {'on' if landmarks else 'off'} (latency {self.latency_ms:.1f} ms)")
+        self.level = level
+        self.frames_over = 0
+        self.frames_under = 0
+        self.apply()
+    
+    def apply(self):
+        """Push the current level's settings into the pipeline"""
+        scale, skip_factor, landmarks = self.levels[self.level]
+        self.pipeline.hand_detector.set_detection_quality(scale, skip_factor)
+        self.pipeline.draw_landmarks = landmarks
+    
+    def metrics(self):
+        """
+        Current quality state for dashboards and logs
+        Returns: dict of the level, smoothed latency and budget
+        """
+        scale, skip_factor, landmarks = self.levels[self.level]
+        return {
+            "quality_level": self.level,
+            "max_level": len(self.levels) - 1,
+            "latency_ms": self.latency_ms or 0.0,
+            "budget_ms": self.budget_ms,
+            "detection_scale": scale,
+            "skip_factor": skip_factor,
+            "landmarks": landmarks,
+            "level_changes": self.level_changes,
+        }
@@ -0,0 +1,123 @@
+"""
+Region-of-interest tracking around the previously detected hand
+"""
+import cv2
+import numpy as np
+from core.detector_backends import DetectorBackend, NUM_LANDMARKS, extract_landmarks, array_to_results
+from config.settings import ROI_EXPANSION, ROI_INFERENCE_SIZE, ROI_MIN_SIZE, ROI_RESCAN_INTERVAL
+
+class RoiTrackingBackend(DetectorBackend):
+    """
+    Wraps a backend and runs it on a crop around the last known hand
+    The crop is an expanded square around the previous landmarks,
+    downscaled to at most ROI_INFERENCE_SIZE before detection. When
+    the hand is lost the next frame falls back to a full-frame scan.
+    While fewer than max_hands are tracked, the full frame is also
+    scanned every rescan_interval frames so a hand entering outside
+    the crop is found.
+    """
+    name = "roi"
+    
+    def __init__(self, backend, expansion=ROI_EXPANSION, inference_size=ROI_INFERENCE_SIZE,
+                 min_size=ROI_MIN_SIZE, max_hands=1, rescan_interval=ROI_RESCAN_INTERVAL):
+        self.backend = backend
+        self.expansion = expansion
+        self.inference_size = inference_size
+        self.min_size = min_size
+        self.max_hands = max_hands
+        self.rescan_interval = rescan_interval
+        
+        # (x1, y1, x2, y2) in frame pixels, None when tracking is lost
+        self.roi = None
+        self.roi_hits = 0
+        self.full_scans = 0
+        
+        # Hands found by the last detection and frames since the last full scan
+        self.tracked = 0
+        self.since_full_scan = 0
+    
+    def detect(self, frame):
+        frame_height, frame_width = frame.shape[:2]
+        self.since_full_scan += 1
+        rescan = self.tracked < self.max_hands and self.since_full_scan >= self.rescan_interval
+        
+        if self.roi is not None and not rescan:
+            x1, y1, x2, y2 = self.roi
+            crop = frame[y1:y2, x1:x2]
+            crop_width, crop_height = x2 - x1, y2 - y1
+            
+            # Only ever downscale the crop
+            scale = min(1.0, self.inference_size / max(crop_width, crop_height))
+            if scale < 1.0:
+                crop = cv2.resize(crop, (int(crop_width * scale), int(crop_height * scale)),
+                                  interpolation=cv2.INTER_AREA)
+            
+            results = self.backend.detect(crop)
+            if results is not None and results.multi_hand_landmarks:
+                self.roi_hits += 1
+                mapped = self.map_to_frame(results, self.roi, frame_width, frame_height)
+                self.roi = self.compute_roi(mapped, frame_width, frame_height)
+                self.tracked = len(mapped.multi_hand_landmarks)
+                return mapped
+        
+        # No ROI yet, hand lost inside it or time to look for more hands: scan the full frame
+        self.full_scans += 1
+        self.since_full_scan = 0
+        results = self.backend.detect(frame)
+        if results is not None and results.multi_hand_landmarks:
+            self.roi = self.compute_roi(results, frame_width, frame_height)
+            self.tracked = len(results.multi_hand_landmarks)
+        else:
+            self.roi = None
+            self.tracked = 0
+        return results
+    
+    def map_to_frame(self, results, roi, frame_width, frame_height):
+        """
+        Map crop-normalized landmarks back to frame-normalized coordinates
+        Returns: new DetectionResults, the backend's results are not modified
+        """
+        x1, y1, x2, y2 = roi
+        scale_x = (x2 - x1) / frame_width
+        scale_y = (y2 - y1) / frame_height
+        offset_x = x1 / frame_width
+        offset_y = y1 / frame_height
+        
+        points = np.empty((len(results.multi_hand_landmarks), NUM_LANDMARKS, 3), dtype=np.float32)
+        extract_landmarks(results, points)
+        points *= (scale_x, scale_y, scale_x)
+        points += (offset_x, offset_y, 0.0)
+        return array_to_results(points)
+    
+    def compute_roi(self, results, frame_width, frame_height):
+        """
+        Expanded square around all detected landmarks, clipped to the frame
+        Returns: (x1, y1, x2, y2) in pixels, or None if it collapses
+        """
+        points = np.empty((len(results.multi_hand_landmarks), NUM_LANDMARKS, 3), dtype=np.float32)
+        extract_landmarks(results, points)
+        xy = points[..., :2].reshape(-1, 2)
+        min_x, min_y = xy.min(axis=0)
+        max_x, max_y = xy.max(axis=0)
+        
+        center_x = float(min_x + max_x) / 2 * frame_width
+        center_y = float(min_y + max_y) / 2 * frame_height
+        side = max(float(max_x - min_x) * frame_width, float(max_y - min_y) * frame_height)
+        side = max(side * self.expansion, self.min_size)
+        
+        x1 = max(0, int(center_x - side / 2))
+        y1 = max(0, int(center_y - side / 2))
+        x2 = min(frame_width, int(center_x + side / 2))
+        y2 = min(frame_height, int(center_y + side / 2))
+        
+        if x2 - x1 < 2 or y2 - y1 < 2:
+            return None
+        return (x1, y1, x2, y2)
+    
+    def reset(self):
+        """Forget the tracked region so the next frame is a full scan"""
+        self.roi = None
+        self.tracked = 0
+    
+    def close(self):
+        self.backend.close()
@@ -0,0 +1,280 @@
+"""
+Recording and deterministic replay of drawing sessions
+"""
+import hashlib
+import time
+import numpy as np
+from core.drawing_tools import DrawingTools
+from core.stroke_store import GrowableArray, STROKE_ARRAYS
+
+RECORDING_VERSION = 2
+
+# Event kinds, by the DrawingTools call they stand for
+EVENT_NAMES = ("hover", "draw", "tool", "undo", "redo", "clear", "lift", "pan", "zoom",
+               "color", "width", "layer", "layer_visible", "layer_opacity")
+EVENT_CODES = {name: code for code, name in enumerate(EVENT_NAMES)}
+(HOVER, DRAW, TOOL, UNDO, REDO, CLEAR, LIFT, PAN, ZOOM,
+ COLOR, WIDTH, LAYER, LAYER_VISIBLE, LAYER_OPACITY) = range(len(EVENT_NAMES))
+TOOL_NAMES = ("select tool", "line", "rectangle", "draw", "circle", "erase", "erase strokes", "move")
+
+# Events whose value field is used
+VALUE_CODES = (ZOOM, COLOR, LAYER_OPACITY)
+
+# One input event: frame it happened in, kind, hand and arguments (a
+# fingertip or pan distance in x/y, tool, width or layer index in x,
+# visibility in y, zoom factor, packed BGR color or opacity in value)
+EVENT_DTYPE = np.dtype([("frame", "<u4"), ("code", "u1"), ("hand", "u1"),
+                        ("x", "<i2"), ("y", "<i2"), ("value", "<f8")])
+
+def canvas_checksum(drawing_tools):
+    """
+    Fingerprint of the drawn canvas, to check that a replay matches
+    Returns: hex SHA-256 of the canvas image and its shape
+    """
+    image = np.ascontiguousarray(drawing_tools.get_canvas_image())
+    digest = hashlib.sha256(str(image.shape).encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+class SessionRecorder:
+    """
+    Records what a session fed into DrawingTools as a compact timeline
+    Instead of video, every frame only adds the fingertip of each hand
+    and whether it was drawing, plus the rare tool, undo, redo, clear,
+    pan, zoom, color and layer events, each tagged with its frame; frame times are
+    kept separately for real-time playback. Tool hovering, gestures and
+    hand tracking are recorded through their effect, so a replay does
+    not depend on timers or the detector. The strokes already on the
+    canvas when recording starts are stored too, and the canvas checksum
+    at save time lets a replay confirm it reproduced the drawing exactly.
+    """
+    
+    def __init__(self):
+        self.events = GrowableArray(EVENT_DTYPE, capacity=4096)
+        self.frame_times = GrowableArray(np.float64, capacity=4096)
+        self.start_time = None
+        self.frame = 0
+        self.drawing_tools = None
+        self.initial = None
+        self.viewport = (0.0, 0.0, 1.0)
+        self.initial_layers = None
+    
+    def attach(self, drawing_tools):
+        """Start recording drawing_tools from its current canvas"""
+        drawing_tools.end_all_strokes()
+        self.drawing_tools = drawing_tools
+        self.initial = drawing_tools.strokes.snapshot()
+        viewport = drawing_tools.canvas.viewport if drawing_tools.canvas is not None else None
+        self.viewport = (viewport.offset_x, viewport.offset_y, viewport.zoom) if viewport else (0.0, 0.0, 1.0)
+        layers = drawing_tools.layers
+        if layers is not None:
+            self.initial_layers = (np.array([layer.visible for layer in layers.layers]),
+                                   np.array([layer.opacity for layer in layers.layers]), layers.active)
+        self.start_time = time.perf_counter()
+        drawing_tools.recorder = self
+        
+        # Tool, color and width every hand already had
+        for hand_id, hand in drawing_tools.hands.items():
+            self.record("tool", hand_id, hand.current_tool)
+            self.record("color", hand_id, value=hand.color)
+            self.record("width", hand_id, hand.thickness)
+    
+    def next_frame(self):
+        """Start a new frame (called once per rendered frame)"""
+        self.frame = len(self.frame_times)
+        self.frame_times.append(time.perf_counter() - self.start_time)
+    
+    def record(self, name, hand, x=0, y=0, value=0.0):
+        """Append one event of the current frame (called by DrawingTools); tools are given by name, colors as BGR"""
+        if name == "tool":
+            x = TOOL_NAMES.index(x)
+        elif name == "color":
+            value = float(value[0] << 16 | value[1] << 8 | value[2])
+        self.events.append((self.frame, EVENT_CODES[name], hand, x, y, value))
+    
+    def save(self, path):
+        """Write the timeline and the current canvas checksum to a compressed .npz file"""
+        drawing_tools = self.drawing_tools
+        visible, opacity, active = self.initial_layers or (np.array([True]), np.array([1.0]), 0)
+        np.savez_compressed(
+            path,
+            version=np.array(RECORDING_VERSION),
+            size=np.array([drawing_tools.width, drawing_tools.height]),
+            tiled=np.array(drawing_tools.canvas is not None),
+            smoothing=np.array(drawing_tools.smoothing),
+            color=np.array(drawing_tools.layers is not None),
+            layer_visible=visible,
+            layer_opacity=opacity,
+            active_layer=np.array(active),
+            viewport=np.array(self.viewport),
+            checksum=np.array(canvas_checksum(drawing_tools)),
+            **self.columns(),
+            **{"initial_" + name: self.initial[name] for name in STROKE_ARRAYS}
+        )
+    
+    def columns(self):
+        """
+        The timeline as small, slowly changing columns, which compress far
+        better than interleaved records: frame durations in milliseconds,
+        frame steps between events, and event fields one array each, with
+        values only for the events that use them
+        Returns: dict of arrays
+        """
+        events = self.events.view()
+        milliseconds = np.rint(self.frame_times.view() * 1000.0).astype(np.int64)
+        columns = {
+            "frame_ms": np.diff(milliseconds, prepend=0).clip(0, 65535).astype(np.uint16),
+            "event_frame_steps": np.diff(events["frame"].astype(np.int64), prepend=0).astype(np.uint32),
+            "event_values": events["value"][np.isin(events["code"], VALUE_CODES)],
+        }
+        for name in ("code", "hand", "x", "y"):
+            columns["event_" + name] = events[name]
+        return columns
+    
+    def close(self):
+        """Stop recording"""
+        if self.drawing_tools is not None:
+            self.drawing_tools.recorder = None
+            self.drawing_tools = None
+
+class SessionRecording:
+    """A recorded timeline loaded from disk"""
+    
+    def __init__(self, path):
+        with np.load(path) as data:
+            version = int(data["version"])
+            if version not in (1, RECORDING_VERSION):
+                raise ValueError(f"Unsupported recording version {version}")
+            self.width, self.height = (int(v) for v in data["size"])
+            self.tiled = bool(data["tiled"])
+            self.smoothing = bool(data["smoothing"])
+            self.color = bool(data["color"]) if "color" in data else False
+            if "layer_visible" in data:
+                self.layers = (data["layer_visible"], data["layer_opacity"], int(data["active_layer"]))
+            else:
+                self.layers = (np.array([True]), np.array([1.0]), 0)
+            self.viewport = tuple(float(v) for v in data["viewport"])
+            self.frame_times = np.cumsum(data["frame_ms"], dtype=np.int64) / 1000.0
+            self.events = np.zeros(len(data["event_code"]), dtype=EVENT_DTYPE)
+            self.events["frame"] = np.cumsum(data["event_frame_steps"], dtype=np.int64)
+            for name in ("code", "hand", "x", "y"):
+                self.events[name] = data["event_" + name]
+            if version == 1:
+                self.events["value"][self.events["code"] == ZOOM] = data["zoom_factors"]
+            else:
+                self.events["value"][np.isin(self.events["code"], VALUE_CODES)] = data["event_values"]
+            self.checksum = str(data["checksum"])
+            self.initial = {name: data["initial_" + name] for name in STROKE_ARRAYS
+                            if "initial_" + name in data}
+    
+    @property
+    def duration(self):
+        """Recorded seconds"""
+        return float(self.frame_times[-1]) if len(self.frame_times) else 0.0
+
+class SessionReplay:
+    """
+    Pushes a recorded timeline through DrawingTools
+    Events are replayed in order through the same DrawingTools calls
+    that produced them, at full speed or paced by the recorded frame
+    times, so the canvas ends up identical to the recorded one.
+    """
+    
+    def __init__(self, recording, realtime=False, speed=1.0):
+        self.recording = recording
+        self.realtime = realtime
+        self.speed = speed
+    
+    def create_drawing_tools(self):
+        """
+        Fresh DrawingTools matching the recorded canvas, with its initial strokes
+        Returns: DrawingTools
+        """
+        recording = self.recording
+        drawing_tools = DrawingTools(recording.width, recording.height, tiled=recording.tiled,
+                                     smoothing=recording.smoothing, color=recording.color)
+        if drawing_tools.canvas is not None:
+            viewport = drawing_tools.canvas.viewport
+            viewport.offset_x, viewport.offset_y, viewport.zoom = recording.viewport
+        if drawing_tools.layers is not None:
+            visible, opacity, active = recording.layers
+            for index in range(len(visible)):
+                drawing_tools.layers.set_visible(index, visible[index])
+                drawing_tools.layers.set_opacity(index, opacity[index])
+            drawing_tools.layers.select_layer(active)
+        if len(recording.initial["kinds"]):
+            drawing_tools.strokes.restore(recording.initial)
+            drawing_tools.rebuild_mask()
+        return drawing_tools
+    
+    def run(self, drawing_tools=None, on_frame=None):
+        """
+        Replay every event
+        on_frame(drawing_tools, frame_index) is called after each recorded
+        frame's events, e.g. to show or encode the canvas.
+        Returns: the DrawingTools drawn into
+        """
+        drawing_tools = drawing_tools or self.create_drawing_tools()
+        recording = self.recording
+        
+        # Plain tuples; indexing a structured array per event is much slower
+        events = list(zip(*(recording.events[name].tolist() for name in EVENT_DTYPE.names)))
+        
+        # Shape previews land on a scratch frame, as they would on the camera frame
+        scratch = np.zeros((recording.height, recording.width, 3), dtype=np.uint8)
+        start = time.perf_counter()
+        index = 0
+        for frame in range(len(recording.frame_times)):
+            if self.realtime:
+                delay = recording.frame_times[frame] / self.speed - (time.perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            while index < len(events) and events[index][0] == frame:
+                self.apply(drawing_tools, events[index], scratch)
+                index += 1
+            if on_frame is not None:
+                on_frame(drawing_tools, frame)
+        
+        # Events of a recording that never rendered a frame
+        for event in events[index:]:
+            self.apply(drawing_tools, event, scratch)
+        return drawing_tools
+    
+    def apply(self, drawing_tools, event, scratch):
+        """Make the DrawingTools call one (frame, code, hand, x, y, value) event stands for"""
+        _, code, hand, x, y, value = event
+        drawing_tools.select_hand(hand)
+        if code == HOVER or code == DRAW:
+            drawing_tools.process_drawing(scratch, {"index_tip": (x, y)}, code == DRAW)
+        elif code == TOOL:
+            drawing_tools.set_current_tool(TOOL_NAMES[x])
+        elif code == UNDO:
+            drawing_tools.undo()
+        elif code == REDO:
+            drawing_tools.redo()
+        elif code == CLEAR:
+            drawing_tools.clear()
+        elif code == LIFT:
+            drawing_tools.lift_hand(hand)
+        elif code == PAN:
+            drawing_tools.pan(x, y)
+        elif code == ZOOM:
+            drawing_tools.zoom(value)
+        elif code == COLOR:
+            packed = int(value)
+            drawing_tools.set_color((packed >> 16 & 255, packed >> 8 & 255, packed & 255))
+        elif code == WIDTH:
+            drawing_tools.set_thickness(x)
+        elif code == LAYER:
+            drawing_tools.select_layer(x)
+        elif code == LAYER_VISIBLE:
+            drawing_tools.set_layer_visible(x, y)
+        elif code == LAYER_OPACITY:
+            drawing_tools.set_layer_opacity(x, value)
+    
+    def verify(self, drawing_tools):
+        """
+        Check a replayed canvas against the recorded checksum
+        Returns: True if they are identical
+        """
+        return canvas_checksum(drawing_tools) == self.recording.checksum
@@ -0,0 +1,82 @@
+"""
+Uniform-grid spatial index over stroke bounding boxes
+"""
+from bisect import bisect_left
+import numpy as np
+from config.settings import STROKE_INDEX_CELL_SIZE
+
+class StrokeIndex:
+    """
+    Buckets stroke indices by the grid cells their bounding box covers
+    Each cell keeps its strokes in ascending order, so dropping the
+    newest strokes (undo) only pops from the cell ends and a query's
+    candidates come back in drawing order. Only cells that hold a
+    stroke exist, so the grid also works for an unbounded canvas.
+    """
+    
+    def __init__(self, cell_size=STROKE_INDEX_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+        
+        # Array copies of the cells queries read, dropped when a cell changes
+        self.arrays = {}
+    
+    def cell_range(self, x1, y1, x2, y2):
+        """(cx, cy) keys of every cell overlapping a rectangle with exclusive right/bottom edges"""
+        cell = self.cell_size
+        for cy in range(int(y1) // cell, (int(y2) - 1) // cell + 1):
+            for cx in range(int(x1) // cell, (int(x2) - 1) // cell + 1):
+                yield cx, cy
+    
+    def add(self, index, extent):
+        """Index a stroke by its (x1, y1, x2, y2) extent, usually the newest stroke"""
+        for key in self.cell_range(*extent):
+            bucket = self.cells.get(key)
+            if bucket is None:
+                self.cells[key] = [index]
+            elif bucket[-1] < index:
+                bucket.append(index)
+            elif bucket[-1] != index:
+                # An open stroke of one hand grew into a cell of another hand's newer stroke
+                position = bisect_left(bucket, index)
+                if bucket[position] == index:
+                    continue
+                bucket.insert(position, index)
+            else:
+                continue
+            self.arrays.pop(key, None)
+    
+    def remove_newest(self, count, extents):
+        """Drop strokes from index count onwards, given the extents they were indexed by"""
+        for extent in extents:
+            for key in self.cell_range(*extent):
+                bucket = self.cells.get(key)
+                if bucket is None or bucket[-1] < count:
+                    continue
+                while bucket and bucket[-1] >= count:
+                    bucket.pop()
+                if not bucket:
+                    del self.cells[key]
+                self.arrays.pop(key, None)
+    
+    def candidates(self, x1, y1, x2, y2):
+        """
+        Strokes whose cells overlap a rectangle; their extents may still miss it
+        Returns: int array of stroke indices, repeated for strokes in several of the cells
+        """
+        arrays = []
+        for key in self.cell_range(x1, y1, x2, y2):
+            array = self.arrays.get(key)
+            if array is None:
+                bucket = self.cells.get(key)
+                if bucket is None:
+                    continue
+                array = self.arrays[key] = np.array(bucket, dtype=np.int64)
+            arrays.append(array)
+        if not arrays:
+            return np.zeros(0, dtype=np.int64)
+        return arrays[0] if len(arrays) == 1 else np.concatenate(arrays)
+    
+    def clear(self):
+        self.cells = {}
+        self.arrays = {}
@@ -0,0 +1,185 @@
+"""
+Streaming smoothing and resampling of freehand stroke samples
+"""
+import math
+import numpy as np
+from config.settings import (
+    SMOOTHING_MIN_CUTOFF, SMOOTHING_BETA, SMOOTHING_DERIVATIVE_CUTOFF, SMOOTHING_FRAME_RATE,
+    SMOOTHING_MIN_DISTANCE, SPLINE_TOLERANCE, SPLINE_MAX_SUBDIVISIONS
+)
+
+def smoothing_factor(dt, cutoff):
+    """Exponential smoothing factor of a low-pass filter at the given cutoff (Hz)"""
+    tau = 1.0 / (2.0 * math.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+class OneEuroFilter:
+    """
+    One-Euro filter of a 2-D point stream
+    A low-pass filter whose cutoff rises with speed: slow, jittery motion
+    is smoothed heavily while fast strokes keep up with the finger.
+    """
+    
+    def __init__(self, min_cutoff=SMOOTHING_MIN_CUTOFF, beta=SMOOTHING_BETA,
+                 derivative_cutoff=SMOOTHING_DERIVATIVE_CUTOFF):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.derivative_cutoff = derivative_cutoff
+        self.reset()
+    
+    def reset(self):
+        """Forget the filter state before a new stroke"""
+        self.value = None
+        self.derivative = np.zeros(2)
+        self.timestamp = None
+    
+    def filter(self, point, timestamp):
+        """
+        Filter one sample taken at timestamp (seconds)
+        Returns: the filtered point as a float array
+        """
+        point = np.asarray(point, dtype=np.float64)
+        if self.value is None or timestamp <= self.timestamp:
+            self.value = point
+            self.timestamp = timestamp
+            return point
+        
+        dt = timestamp - self.timestamp
+        self.timestamp = timestamp
+        derivative = (point - self.value) / dt
+        alpha = smoothing_factor(dt, self.derivative_cutoff)
+        self.derivative = self.derivative + alpha * (derivative - self.derivative)
+        
+        cutoff = self.min_cutoff + self.beta * math.hypot(*self.derivative)
+        alpha = smoothing_factor(dt, cutoff)
+        self.value = self.value + alpha * (point - self.value)
+        return self.value
+
+def catmull_rom(p0, p1, p2, p3, count):
+    """
+    Sample the centripetal Catmull-Rom segment from p1 to p2
+    Returns: (count, 2) array of points after p1, ending exactly at p2
+    """
+    # Centripetal knots keep the curve from looping on uneven spacing
+    t1 = max(np.linalg.norm(p1 - p0) ** 0.5, 1e-6)
+    t2 = t1 + max(np.linalg.norm(p2 - p1) ** 0.5, 1e-6)
+    t3 = t2 + max(np.linalg.norm(p3 - p2) ** 0.5, 1e-6)
+    t = np.linspace(t1, t2, count + 1)[1:, None]
+    
+    a1 = (t1 - t) / t1 * p0 + t / t1 * p1
+    a2 = (t2 - t) / (t2 - t1) * p1 + (t - t1) / (t2 - t1) * p2
+    a3 = (t3 - t) / (t3 - t2) * p2 + (t - t2) / (t3 - t2) * p3
+    b1 = (t2 - t) / t2 * a1 + t / t2 * a2
+    b2 = (t3 - t) / (t3 - t1) * a2 + (t - t1) / (t3 - t1) * a3
+    points = (t2 - t) / (t2 - t1) * b1 + (t - t1) / (t2 - t1) * b2
+    points[-1] = p2
+    return points
+
+class StrokeSmoother:
+    """
+    Turns raw fingertip samples into smooth, sparse stroke points
+    Each sample goes through a One-Euro filter; filtered points closer
+    than min_distance to the last kept point are dropped, and the kept
+    points are joined with centripetal Catmull-Rom splines, flattened
+    into just enough line segments to stay within tolerance pixels of
+    the curve. A spline segment needs the control point after it, so
+    committed output trails the finger by at most one kept point;
+    finish() emits the rest when the stroke ends.
+    """
+    
+    def __init__(self, min_distance=SMOOTHING_MIN_DISTANCE, tolerance=SPLINE_TOLERANCE,
+                 max_subdivisions=SPLINE_MAX_SUBDIVISIONS, frame_rate=SMOOTHING_FRAME_RATE,
+                 one_euro=None):
+        self.min_distance = min_distance
+        self.tolerance = tolerance
+        self.max_subdivisions = max_subdivisions
+        self.frame_rate = frame_rate
+        self.one_euro = one_euro or OneEuroFilter()
+        
+        # Running totals for benchmarks and logs
+        self.samples = 0
+        self.segments = 0
+        self.reset()
+    
+    def reset(self):
+        """Drop any stroke in progress"""
+        self.one_euro.reset()
+        self.controls = []
+        self.last_filtered = None
+        self.sample_index = 0
+    
+    @property
+    def active(self):
+        """True while a stroke is being smoothed"""
+        return bool(self.controls)
+    
+    def add(self, point, timestamp=None):
+        """
+        Feed one raw sample of the current stroke
+        Timestamps default to a steady SMOOTHING_FRAME_RATE, which keeps
+        results the same however fast frames are processed.
+        Returns: list of (x, y) points to append to the stroke; the first
+        call of a stroke returns its start point
+        """
+        if timestamp is None:
+            timestamp = self.sample_index / self.frame_rate
+        self.sample_index += 1
+        self.samples += 1
+        
+        filtered = self.one_euro.filter(point, timestamp)
+        self.last_filtered = filtered
+        if not self.controls:
+            self.controls.append(filtered.copy())
+            return [self.to_pixel(filtered)]
+        
+        # Sub-threshold moves are jitter, not drawing
+        if np.linalg.norm(filtered - self.controls[-1]) < self.min_distance:
+            return []
+        self.controls.append(filtered.copy())
+        
+        # The segment before the newest control point is now fully determined
+        if len(self.controls) < 3:
+            return []
+        if len(self.controls) > 4:
+            del self.controls[0]
+        return self.emit_segment(len(self.controls) - 3)
+    
+    def finish(self):
+        """
+        End the stroke, emitting the segments still waiting for a successor
+        Returns: list of (x, y) points to append to the stroke
+        """
+        points = []
+        
+        # Keep the final resting position even below the distance threshold
+        if self.controls and np.linalg.norm(self.last_filtered - self.controls[-1]) >= 0.5:
+            self.controls.append(self.last_filtered.copy())
+            if len(self.controls) >= 3:
+                points += self.emit_segment(len(self.controls) - 3)
+            if len(self.controls) > 4:
+                del self.controls[0]
+        if len(self.controls) >= 2:
+            points += self.emit_segment(len(self.controls) - 2)
+        self.reset()
+        return points
+    
+    def emit_segment(self, index):
+        """
+        Flatten the spline from controls[index] to controls[index + 1]
+        Missing outer neighbours are mirrored across the segment ends.
+        Returns: list of (x, y) points after the segment start
+        """
+        p1, p2 = self.controls[index], self.controls[index + 1]
+        p0 = self.controls[index - 1] if index > 0 else 2 * p1 - p2
+        p3 = self.controls[index + 2] if index + 2 < len(self.controls) else 2 * p2 - p1
+        
+        # Linear error shrinks with the square of the subdivisions
+        middle = catmull_rom(p0, p1, p2, p3, 2)[0]
+        deviation = np.linalg.norm(middle - (p1 + p2) / 2)
+        count = min(self.max_subdivisions, max(1, math.ceil(math.sqrt(deviation / self.tolerance))))
+        self.segments += count
+        return [self.to_pixel(p) for p in catmull_rom(p0, p1, p2, p3, count)]
+    
+    def to_pixel(self, point):
+        """Round a point to integer pixel coordinates"""
+        return (int(round(point[0])), int(round(point[1])))
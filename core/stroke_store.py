@@ -0,0 +1,562 @@
+"""
+Retained-mode stroke storage for the drawing canvas
+"""
+import cv2
+import numpy as np
+from config.settings import MASK_BACKGROUND, DEFAULT_STROKE_COLOR
+from config.resolution import CANVAS_WIDTH, CANVAS_HEIGHT
+from core.stroke_index import StrokeIndex
+
+LINE, RECTANGLE, CIRCLE, FREEHAND, ERASE = range(5)
+KIND_NAMES = ("line", "rectangle", "circle", "freehand", "erase")
+
+# Arrays of a stroke snapshot; colors, layers and hidden may be missing from older files
+STROKE_ARRAYS = ("points", "kinds", "counts", "thicknesses", "values", "radii", "colors", "layers", "hidden")
+
+def segment_distances(point, starts, ends, squared=False):
+    """
+    Distance from a point to each of several line segments
+    Returns: float array, one distance (or squared distance) per segment
+    """
+    direction = ends - starts
+    offset = point - starts
+    length = np.maximum(np.einsum("ij,ij->i", direction, direction), 1e-12)
+    t = np.clip(np.einsum("ij,ij->i", offset, direction) / length, 0.0, 1.0)
+    offset -= direction * t[:, None]
+    distances = np.einsum("ij,ij->i", offset, offset)
+    return distances if squared else np.sqrt(distances)
+
+def boxes_touch(table, x0, y0, boxes):
+    """
+    Check boxes against the marked pixels of a summed-area table whose corner is at (x0, y0)
+    Returns: bool array, True for each (x1, y1, x2, y2) box covering a marked pixel
+    """
+    height, width = table.shape[0] - 1, table.shape[1] - 1
+    x1 = np.clip(boxes[:, 0] - x0, 0, width)
+    y1 = np.clip(boxes[:, 1] - y0, 0, height)
+    x2 = np.clip(boxes[:, 2] - x0, 0, width)
+    y2 = np.clip(boxes[:, 3] - y0, 0, height)
+    return table[y2, x2] - table[y1, x2] - table[y2, x1] + table[y1, x1] > 0
+
+def point_boxes(starts, ends, pads):
+    """
+    Pixel boxes around segments (or single points when starts is ends), as bounds() pads them
+    Returns: (n, 4) int64 array of (x1, y1, x2, y2)
+    """
+    pads = pads[:, None]
+    low = np.floor(np.minimum(starts, ends)).astype(np.int64) - pads
+    high = np.ceil(np.maximum(starts, ends)).astype(np.int64) + pads + 1
+    return np.hstack((low, high))
+
+class GrowableArray:
+    """Append-only NumPy buffer that doubles its capacity when full"""
+    
+    def __init__(self, dtype, shape=(), capacity=64):
+        self.data = np.empty((capacity,) + shape, dtype=dtype)
+        self.size = 0
+    
+    def append(self, value):
+        if self.size == len(self.data):
+            self.reserve(self.size * 2)
+        self.data[self.size] = value
+        self.size += 1
+    
+    def extend(self, values):
+        values = np.asarray(values, dtype=self.data.dtype)
+        needed = self.size + len(values)
+        if needed > len(self.data):
+            self.reserve(max(needed, self.size * 2))
+        self.data[self.size:needed] = values
+        self.size = needed
+    
+    def reserve(self, capacity):
+        data = np.empty((capacity,) + self.data.shape[1:], dtype=self.data.dtype)
+        data[:self.size] = self.data[:self.size]
+        self.data = data
+    
+    def view(self):
+        """The filled part of the buffer, without copying"""
+        return self.data[:self.size]
+    
+    def clear(self):
+        self.size = 0
+    
+    def __len__(self):
+        return self.size
+
+class StrokeStore:
+    """
+    Stores committed primitives as struct-of-arrays NumPy buffers
+    Every stroke owns a run of points in one shared point buffer plus a
+    row in the per-stroke arrays (kind, thickness, mask value, radius,
+    BGR color, layer and whether it was removed). Strokes are never
+    deleted from the middle: the object eraser and moves only hide
+    them, which keeps indices stable for undo and for the grid index
+    of stroke extents used by region queries and hit tests.
+    Coordinates are canvas pixels at the store's reference resolution,
+    so the canvas can be re-rasterized at any other resolution.
+    """
+    
+    def __init__(self, width=CANVAS_WIDTH, height=CANVAS_HEIGHT):
+        self.width = width
+        self.height = height
+        
+        self.points = GrowableArray(np.float32, (2,), capacity=1024)
+        self.kinds = GrowableArray(np.uint8)
+        self.starts = GrowableArray(np.int32)
+        self.counts = GrowableArray(np.int32)
+        self.thicknesses = GrowableArray(np.uint16)
+        self.values = GrowableArray(np.uint8)
+        self.radii = GrowableArray(np.float32)
+        self.colors = GrowableArray(np.uint8, (3,))
+        self.layers = GrowableArray(np.uint8)
+        self.hidden = GrowableArray(np.bool_)
+        
+        # Derived from the points: pixel extent of every stroke, and the grid over them
+        self.extents = GrowableArray(np.int32, (4,))
+        self.index = StrokeIndex()
+    
+    @property
+    def buffers(self):
+        """Every per-stroke buffer, in snapshot order after the points, then derived ones"""
+        return (self.kinds, self.starts, self.counts, self.thicknesses, self.values, self.radii,
+                self.colors, self.layers, self.hidden, self.extents)
+    
+    def __len__(self):
+        return len(self.kinds)
+    
+    def add_stroke(self, kind, points, thickness, value, radius=0.0, color=DEFAULT_STROKE_COLOR, layer=0):
+        """
+        Record a new stroke
+        Returns: index of the stroke
+        """
+        self.starts.append(len(self.points))
+        self.counts.append(len(points))
+        self.points.extend(points)
+        self.kinds.append(kind)
+        self.thicknesses.append(thickness)
+        self.values.append(value)
+        self.radii.append(radius)
+        self.colors.append(color)
+        self.layers.append(layer)
+        self.hidden.append(False)
+        index = len(self) - 1
+        self.extents.append(self.bounds(index))
+        self.index.add(index, self.extents.data[index])
+        return index
+    
+    def extend_stroke(self, index, point):
+        """
+        Append a point to a stroke
+        The points of later strokes move up one place in the shared
+        buffer, which is cheap for the open strokes several hands draw
+        at the end of the store.
+        """
+        end = self.starts.data[index] + self.counts.data[index]
+        self.points.append(point)
+        if index != len(self) - 1:
+            size = len(self.points)
+            self.points.data[end + 1:size] = self.points.data[end:size - 1]
+            self.points.data[end] = point
+            self.starts.data[index + 1:len(self)] += 1
+        self.counts.data[index] += 1
+        
+        # Grow the extent by the new point and index any cells it reaches
+        extent = self.extents.data[index]
+        x1, y1, x2, y2 = self.bounds(index, -1)
+        grown = (min(extent[0], x1), min(extent[1], y1), max(extent[2], x2), max(extent[3], y2))
+        if grown != tuple(extent):
+            extent[:] = grown
+            self.index.add(index, extent)
+    
+    def get_points(self, index, first_point=0):
+        """
+        Points of one stroke as an (n, 2) float32 view
+        A negative first_point selects only the last few points.
+        """
+        start = self.starts.data[index]
+        count = self.counts.data[index]
+        if first_point < 0:
+            first_point = max(0, count + first_point)
+        return self.points.data[start + first_point:start + count]
+    
+    def bounds(self, index, first_point=0):
+        """
+        Pixel bounding box of a stroke, optionally from a given point on
+        Returns: (x1, y1, x2, y2) with exclusive right/bottom edges
+        """
+        points = self.get_points(index, first_point)
+        pad = int(self.thicknesses.data[index]) // 2 + 2
+        if self.kinds.data[index] in (CIRCLE, ERASE):
+            pad += int(np.ceil(self.radii.data[index]))
+        x1, y1 = np.floor(points.min(axis=0)).astype(int) - pad
+        x2, y2 = np.ceil(points.max(axis=0)).astype(int) + pad + 1
+        return (x1, y1, x2, y2)
+    
+    def compute_extents(self, first=0):
+        """
+        Pixel extents of the strokes from index first onwards, as bounds() computes them
+        Returns: (n, 4) int32 array of (x1, y1, x2, y2)
+        """
+        counts = self.counts.view()[first:]
+        if not len(counts):
+            return np.zeros((0, 4), dtype=np.int32)
+        starts = self.starts.view()[first:]
+        points = self.points.view()[starts[0]:]
+        offsets = starts - starts[0]
+        low = np.floor(np.minimum.reduceat(points, offsets, axis=0)).astype(np.int64)
+        high = np.ceil(np.maximum.reduceat(points, offsets, axis=0)).astype(np.int64)
+        pad = self.thicknesses.view()[first:].astype(np.int64) // 2 + 2
+        kinds = self.kinds.view()[first:]
+        round_kinds = (kinds == CIRCLE) | (kinds == ERASE)
+        pad[round_kinds] += np.ceil(self.radii.view()[first:][round_kinds]).astype(np.int64)
+        return np.column_stack((low - pad[:, None], high + pad[:, None] + 1)).astype(np.int32)
+    
+    def reindex(self, first=0):
+        """Recompute extents and grid cells of the strokes from index first onwards"""
+        if first == 0:
+            self.index.clear()
+        self.extents.size = first
+        self.extents.extend(self.compute_extents(first))
+        for index in range(first, len(self)):
+            self.index.add(index, self.extents.data[index])
+    
+    def query(self, x1, y1, x2, y2):
+        """
+        Visible strokes whose extent overlaps a rectangle
+        Returns: int array of stroke indices in drawing order
+        """
+        candidates = self.index.candidates(x1, y1, x2, y2)
+        if not len(candidates):
+            return candidates
+        extents = self.extents.data[candidates]
+        overlap = ((extents[:, 0] < x2) & (extents[:, 2] > x1) & (extents[:, 1] < y2) & (extents[:, 3] > y1)
+                   & ~self.hidden.data[candidates])
+        return np.unique(candidates[overlap])
+    
+    def hit_test(self, x, y, radius):
+        """
+        Visible strokes drawn within radius of a point; erase strokes are never hit
+        Returns: int array of stroke indices in drawing order, newest last
+        """
+        candidates = self.query(x - radius, y - radius, x + radius + 1, y + radius + 1)
+        candidates = candidates[self.kinds.data[candidates] != ERASE]
+        reach = radius + self.thicknesses.data[candidates] / 2.0
+        return candidates[self.distances(candidates, x, y) <= reach]
+    
+    def distances(self, indices, x, y):
+        """
+        Distance from a point to the outline of each stroke, all at once
+        Returns: float array, one distance per stroke
+        """
+        point = np.array((x, y), dtype=np.float32)
+        kinds = self.kinds.data[indices]
+        starts = self.starts.data[indices]
+        distances = np.zeros(len(indices), dtype=np.float64)
+        
+        # Circles: distance to the ring around the center
+        ring = kinds == CIRCLE
+        centers = self.points.data[starts[ring]]
+        distances[ring] = np.abs(np.hypot(*(centers - point).T) - self.radii.data[indices[ring]])
+        
+        # Rectangles: distance to the outline, from inside or outside the box
+        box = kinds == RECTANGLE
+        corners = self.points.data[starts[box]], self.points.data[starts[box] + 1]
+        low, high = np.minimum(*corners), np.maximum(*corners)
+        outside = np.hypot(*np.maximum(np.maximum(low - point, point - high), 0.0).T)
+        inside = np.minimum(point - low, high - point).min(axis=1)
+        distances[box] = np.where(outside > 0, outside, inside)
+        
+        # Lines and freehand: nearest of all consecutive-point segments,
+        # a single point counting as a segment of zero length
+        polyline = ~(ring | box)
+        if polyline.any():
+            counts = self.counts.data[indices[polyline]]
+            segments = np.maximum(counts - 1, 1)
+            first = np.cumsum(segments) - segments
+            a = np.repeat(starts[polyline] - first, segments) + np.arange(first[-1] + segments[-1])
+            b = a + np.repeat(counts > 1, segments)
+            nearest = segment_distances(point, self.points.data[a], self.points.data[b], squared=True)
+            distances[polyline] = np.sqrt(np.minimum.reduceat(nearest, first))
+        return distances
+    
+    def set_hidden(self, indices, hidden=True):
+        """Hide strokes (object eraser, moves) or show them again (undo)"""
+        self.hidden.data[np.asarray(indices, dtype=np.int64)] = hidden
+    
+    def snapshot(self, start=0):
+        """
+        Copy strokes from index start onwards
+        Returns: dict of arrays accepted by restore()
+        """
+        first_point = self.starts.data[start] if start < len(self) else len(self.points)
+        return {
+            "points": self.points.view()[first_point:].copy(),
+            "kinds": self.kinds.view()[start:].copy(),
+            "counts": self.counts.view()[start:].copy(),
+            "thicknesses": self.thicknesses.view()[start:].copy(),
+            "values": self.values.view()[start:].copy(),
+            "radii": self.radii.view()[start:].copy(),
+            "colors": self.colors.view()[start:].copy(),
+            "layers": self.layers.view()[start:].copy(),
+            "hidden": self.hidden.view()[start:].copy(),
+        }
+    
+    def select(self, indices):
+        """
+        Copy the chosen strokes, in the given order
+        Returns: dict of arrays accepted by restore()
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        starts = self.starts.view()[indices]
+        counts = self.counts.view()[indices]
+        
+        # Index of every point of the chosen strokes in the shared point buffer
+        offsets = np.repeat(starts - np.concatenate(([0], np.cumsum(counts)[:-1])), counts)
+        point_index = offsets + np.arange(counts.sum())
+        return {
+            "points": self.points.view()[point_index],
+            "kinds": self.kinds.view()[indices],
+            "counts": counts.copy(),
+            "thicknesses": self.thicknesses.view()[indices],
+            "values": self.values.view()[indices],
+            "radii": self.radii.view()[indices],
+            "colors": self.colors.view()[indices],
+            "layers": self.layers.view()[indices],
+            "hidden": self.hidden.view()[indices],
+        }
+    
+    def truncate(self, count):
+        """Drop every stroke from index count onwards"""
+        if count >= len(self):
+            return
+        self.index.remove_newest(count, self.extents.view()[count:])
+        self.points.size = self.starts.data[count]
+        for buffer in self.buffers:
+            buffer.size = count
+    
+    def restore(self, snapshot):
+        """Append strokes previously copied with snapshot(); missing colors, layers and hidden get defaults"""
+        first = len(self)
+        counts = snapshot["counts"]
+        if len(counts):
+            offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            self.starts.extend(len(self.points) + offsets)
+        self.points.extend(snapshot["points"])
+        for name in ("kinds", "counts", "thicknesses", "values", "radii"):
+            getattr(self, name).extend(snapshot[name])
+        self.colors.extend(snapshot["colors"] if "colors" in snapshot else
+                           np.tile(np.array(DEFAULT_STROKE_COLOR, dtype=np.uint8), (len(counts), 1)))
+        self.layers.extend(snapshot["layers"] if "layers" in snapshot else np.zeros(len(counts)))
+        self.hidden.extend(snapshot["hidden"] if "hidden" in snapshot else np.zeros(len(counts), dtype=bool))
+        self.reindex(first)
+    
+    def clear(self):
+        """Remove every stroke"""
+        self.points.clear()
+        for buffer in self.buffers:
+            buffer.clear()
+        self.index.clear()
+    
+    @property
+    def nbytes(self):
+        """Bytes used by the stored strokes"""
+        return self.points.view().nbytes + sum(buffer.view().nbytes for buffer in self.buffers)
+    
+    def rasterize(self, width=None, height=None, mask=None):
+        """
+        Render every stroke into a single-channel mask
+        Returns: uint8 mask of shape (height, width)
+        """
+        width = width or self.width
+        height = height or self.height
+        if mask is None:
+            mask = np.full((height, width), MASK_BACKGROUND, dtype=np.uint8)
+        
+        scale_x = width / self.width
+        scale_y = height / self.height
+        for index in range(len(self)):
+            self.rasterize_stroke(mask, index, scale_x, scale_y)
+        return mask
+    
+    def redraw_regions(self, mask, rects):
+        """
+        Redraw rectangles of the mask after strokes crossing them were hidden
+        Only the segments, circles and eraser stamps reaching a rectangle
+        are drawn, each whole, into a scratch buffer covering them, so
+        thin lines keep the exact pixels they had on the mask. Then only
+        the rectangles are copied back.
+        """
+        height, width = mask.shape
+        rects = np.array(rects, dtype=np.int64).reshape(-1, 4)
+        rects[:, :2] = np.maximum(rects[:, :2], 0)
+        rects[:, 2:] = np.minimum(rects[:, 2:], (width, height))
+        rects = rects[(rects[:, 2] > rects[:, 0]) & (rects[:, 3] > rects[:, 1])]
+        if not len(rects):
+            return
+        
+        # Summed-area table of the pixels to redraw, for testing many boxes against them at once
+        x0, y0 = rects[:, :2].min(axis=0)
+        x3, y3 = rects[:, 2:].max(axis=0)
+        table = np.zeros((y3 - y0 + 1, x3 - x0 + 1), dtype=np.int32)
+        for x1, y1, x2, y2 in (rects - (x0, y0, x0, y0)).tolist():
+            table[y1 + 1:y2 + 1, x1 + 1:x2 + 1] = 1
+        table = table.cumsum(axis=0).cumsum(axis=1)
+        crossing = self.query(x0, y0, x3, y3)
+        crossing = crossing[boxes_touch(table, x0, y0, self.extents.data[crossing])]
+        kinds = self.kinds.data[crossing]
+        starts = self.starts.data[crossing]
+        counts = self.counts.data[crossing]
+        thicknesses = np.maximum(self.thicknesses.data[crossing].astype(np.int64), 1)
+        pads = self.thicknesses.data[crossing].astype(np.int64) // 2 + 2
+        radii = self.radii.data[crossing]
+        
+        # Lines and freehand strokes: runs of consecutive segments reaching
+        # a rectangle, kept as polylines (a single point draws nothing)
+        polyline = np.flatnonzero((kinds == LINE) | (kinds == FREEHAND))
+        segments = counts[polyline] - 1
+        first = np.cumsum(segments) - segments
+        a = np.repeat(starts[polyline] - first, segments) + np.arange(segments.sum())
+        path_owners = np.repeat(polyline, segments)
+        path_boxes = point_boxes(self.points.data[a], self.points.data[a + 1], pads[path_owners])
+        kept = boxes_touch(table, x0, y0, path_boxes)
+        a, path_owners, path_boxes = a[kept], path_owners[kept], path_boxes[kept]
+        path_ends = np.flatnonzero(np.diff(a) != 1) + 1
+        if len(a):
+            path_ends = np.append(path_ends, len(a))
+        path_lengths = np.diff(path_ends, prepend=0) + 1
+        paths = self.points.data[np.insert(a, path_ends, a[path_ends - 1] + 1)]
+        path_owners = path_owners[path_ends - 1]
+        
+        # Rectangles: the outline edges reaching a rectangle
+        box = np.flatnonzero(kinds == RECTANGLE)
+        corner1, corner2 = self.points.data[starts[box]], self.points.data[starts[box] + 1]
+        corners = np.stack((corner1, np.column_stack((corner2[:, 0], corner1[:, 1])),
+                            corner2, np.column_stack((corner1[:, 0], corner2[:, 1]))), axis=1)
+        edges = np.stack((corners, np.roll(corners, -1, axis=1)), axis=2).reshape(-1, 2, 2)
+        edge_owners = np.repeat(box, 4)
+        edge_boxes = point_boxes(edges[:, 0], edges[:, 1], pads[edge_owners])
+        kept = boxes_touch(table, x0, y0, edge_boxes)
+        edges, edge_owners, edge_boxes = edges[kept], edge_owners[kept], edge_boxes[kept]
+        
+        # Circles are drawn whole, eraser strokes as one disc per point
+        circles = np.flatnonzero(kinds == CIRCLE)
+        erase = np.flatnonzero(kinds == ERASE)
+        stamps = np.repeat(starts[erase] - (np.cumsum(counts[erase]) - counts[erase]), counts[erase]) \
+            + np.arange(counts[erase].sum())
+        disc_centers = np.concatenate((self.points.data[starts[circles]], self.points.data[stamps]))
+        disc_owners = np.concatenate((circles, np.repeat(erase, counts[erase])))
+        disc_boxes = point_boxes(disc_centers, disc_centers,
+                                 pads[disc_owners] + np.ceil(radii[disc_owners]).astype(np.int64))
+        kept = boxes_touch(table, x0, y0, disc_boxes)
+        disc_centers, disc_owners, disc_boxes = disc_centers[kept], disc_owners[kept], disc_boxes[kept]
+        
+        boxes = np.concatenate((rects, path_boxes, edge_boxes, disc_boxes))
+        ux1, uy1 = np.maximum(boxes[:, :2].min(axis=0), 0)
+        ux2, uy2 = np.minimum(boxes[:, 2:].max(axis=0), (width, height))
+        scratch = np.full((uy2 - uy1, ux2 - ux1), MASK_BACKGROUND, dtype=np.uint8)
+        offset = np.array((ux1, uy1), dtype=np.float32)
+        paths = np.rint(paths - offset).astype(np.int32)
+        path_ends = np.cumsum(path_lengths)
+        paths = [paths[start:end] for start, end in zip((path_ends - path_lengths).tolist(), path_ends.tolist())]
+        paths += list(np.rint(edges - offset).astype(np.int32))
+        path_owners = np.concatenate((path_owners, edge_owners))
+        disc_centers = np.rint(disc_centers - offset).astype(np.int32)
+        
+        # Ink and erased pixels only depend on the order of strokes with
+        # different mask values, so each run of equal values is drawn with
+        # one polylines call per thickness
+        values = self.values.data[crossing]
+        runs = np.concatenate(([0], np.cumsum(values[1:] != values[:-1])))
+        path_runs, disc_runs = runs[path_owners], runs[disc_owners]
+        disc_thicknesses = np.where(kinds[disc_owners] == ERASE, -1, thicknesses[disc_owners])
+        for run in range(int(runs[-1]) + 1 if len(crossing) else 0):
+            value = int(values[np.searchsorted(runs, run)])
+            selected = np.flatnonzero(path_runs == run)
+            path_thicknesses = thicknesses[path_owners[selected]]
+            for thickness in np.unique(path_thicknesses).tolist():
+                group = [paths[i] for i in selected[path_thicknesses == thickness].tolist()]
+                cv2.polylines(scratch, group, False, value, thickness)
+            selected = disc_runs == run
+            for center, radius, thickness in zip(disc_centers[selected].tolist(),
+                                                 radii[disc_owners[selected]].astype(int).tolist(),
+                                                 disc_thicknesses[selected].tolist()):
+                cv2.circle(scratch, tuple(center), radius, value, thickness)
+        
+        for x1, y1, x2, y2 in rects.tolist():
+            mask[y1:y2, x1:x2] = scratch[y1 - uy1:y2 - uy1, x1 - ux1:x2 - ux1]
+    
+    def rasterize_stroke(self, mask, index, scale_x=1.0, scale_y=1.0, first_point=0, offset=None, value=None):
+        """
+        Render one stroke into the mask
+        first_point limits drawing to the tail of the stroke (e.g. -2 for
+        the newest segment) and offset is subtracted from the scaled
+        coordinates, for drawing into a tile of a larger canvas. value
+        overrides the stroke's mask value, e.g. with a BGRA color for a
+        4-channel layer.
+        """
+        if self.hidden.data[index]:
+            return
+        kind = self.kinds.data[index]
+        if value is None:
+            value = int(self.values.data[index])
+        thickness = max(1, int(round(self.thicknesses.data[index] * min(scale_x, scale_y))))
+        points = self.get_points(index, first_point)
+        if scale_x != 1.0 or scale_y != 1.0:
+            points = points * (scale_x, scale_y)
+        if offset is not None:
+            points = points - offset
+        points = np.rint(points).astype(np.int32)
+        
+        if kind == LINE or kind == FREEHAND:
+            for start, end in zip(points[:-1], points[1:]):
+                cv2.line(mask, tuple(start), tuple(end), value, thickness)
+        elif kind == RECTANGLE:
+            cv2.rectangle(mask, tuple(points[0]), tuple(points[1]), value, thickness)
+        elif kind == CIRCLE or kind == ERASE:
+            radius = self.radii.data[index]
+            if kind == ERASE:
+                thickness = -1
+            for center in points:
+                if scale_x == scale_y:
+                    cv2.circle(mask, tuple(center), int(radius * scale_x), value, thickness)
+                else:
+                    axes = (int(radius * scale_x), int(radius * scale_y))
+                    cv2.ellipse(mask, tuple(center), axes, 0, 0, 360, value, thickness)
+    
+    def rescale(self, width, height):
+        """Change the reference resolution, scaling every stroke to match"""
+        scale_x = width / self.width
+        scale_y = height / self.height
+        self.points.view()[:] *= (scale_x, scale_y)
+        self.radii.view()[:] *= min(scale_x, scale_y)
+        thicknesses = np.rint(self.thicknesses.view() * min(scale_x, scale_y))
+        self.thicknesses.view()[:] = np.maximum(1, thicknesses)
+        self.width, self.height = width, height
+        self.reindex()
+    
+    def save(self, path):
+        """Serialize the strokes to a compressed .npz file"""
+        np.savez_compressed(
+            path,
+            size=np.array([self.width, self.height]),
+            points=self.points.view(),
+            kinds=self.kinds.view(),
+            starts=self.starts.view(),
+            counts=self.counts.view(),
+            thicknesses=self.thicknesses.view(),
+            values=self.values.view(),
+            radii=self.radii.view(),
+            colors=self.colors.view(),
+            layers=self.layers.view(),
+            hidden=self.hidden.view(),
+        )
+    
+    @classmethod
+    def load(cls, path):
+        """Load strokes saved with save()"""
+        data = np.load(path)
+        width, height = (int(v) for v in data["size"])
+        store = cls(width, height)
+        store.restore({name: data[name] for name in STROKE_ARRAYS if name in data})
+        return store
@@ -0,0 +1,233 @@
+"""
+Unbounded drawing canvas made of lazily allocated tiles
+"""
+import cv2
+import numpy as np
+from config.settings import CANVAS_TILE_SIZE, MASK_BACKGROUND, MIN_ZOOM, MAX_ZOOM
+from core.stroke_store import ERASE
+
+class Viewport:
+    """Maps screen pixels to canvas (world) coordinates with pan and zoom"""
+    
+    def __init__(self, width, height, offset_x=0.0, offset_y=0.0, zoom=1.0):
+        self.width = width
+        self.height = height
+        self.offset_x = offset_x
+        self.offset_y = offset_y
+        self.zoom = zoom
+    
+    def to_world(self, x, y):
+        """Screen pixel to world coordinates"""
+        return (self.offset_x + x / self.zoom, self.offset_y + y / self.zoom)
+    
+    def to_screen(self, x, y):
+        """World coordinates to screen pixel"""
+        return ((x - self.offset_x) * self.zoom, (y - self.offset_y) * self.zoom)
+    
+    def world_rect(self):
+        """Visible world rectangle as (x1, y1, x2, y2)"""
+        return (self.offset_x, self.offset_y,
+                self.offset_x + self.width / self.zoom, self.offset_y + self.height / self.zoom)
+    
+    def pan(self, dx, dy):
+        """Move the view by a screen-space distance"""
+        self.offset_x -= dx / self.zoom
+        self.offset_y -= dy / self.zoom
+    
+    def zoom_at(self, factor, x=None, y=None):
+        """Zoom by a factor keeping the screen point (x, y) fixed"""
+        x = self.width / 2 if x is None else x
+        y = self.height / 2 if y is None else y
+        world_x, world_y = self.to_world(x, y)
+        self.zoom = min(MAX_ZOOM, max(MIN_ZOOM, self.zoom * factor))
+        self.offset_x = world_x - x / self.zoom
+        self.offset_y = world_y - y / self.zoom
+
+class TiledCanvas:
+    """
+    Sparse canvas of fixed-size uint8 tiles keyed by (row, col)
+    A tile is allocated the first time ink lands on it and freed again
+    when erasing leaves it blank, so memory follows the drawn area.
+    Compositing only visits allocated tiles inside the viewport.
+    """
+    
+    def __init__(self, viewport, tile_size=CANVAS_TILE_SIZE):
+        self.viewport = viewport
+        self.tile_size = tile_size
+        self.tiles = {}
+        
+        # (row, col) -> (screen size, 3-channel overlay) at the current zoom
+        self.overlays = {}
+        self.overlay_zoom = viewport.zoom
+    
+    @property
+    def nbytes(self):
+        """Bytes held by allocated tiles"""
+        return len(self.tiles) * self.tile_size * self.tile_size
+    
+    def tile_range(self, x1, y1, x2, y2):
+        """(row, col) keys of every tile overlapping a world rectangle"""
+        tile = self.tile_size
+        for row in range(int(np.floor(y1 / tile)), int(np.floor((y2 - 1) / tile)) + 1):
+            for col in range(int(np.floor(x1 / tile)), int(np.floor((x2 - 1) / tile)) + 1):
+                yield row, col
+    
+    def read_tile(self, row, col):
+        """Copy of a tile, or None if it was never drawn on"""
+        tile = self.tiles.get((row, col))
+        return None if tile is None else tile.copy()
+    
+    def write_tile(self, row, col, data):
+        """Replace a tile; None frees it"""
+        if data is None:
+            self.tiles.pop((row, col), None)
+        else:
+            self.tiles[(row, col)] = data.copy()
+        self.overlays.pop((row, col), None)
+    
+    def draw_stroke(self, strokes, index, first_point=0, clip=None):
+        """
+        Rasterize a stroke (or its tail) into every tile it overlaps
+        clip limits drawing to a world rectangle, for redrawing a region.
+        Returns: list of touched (row, col) keys
+        """
+        # Draw once into a scratch buffer covering the stroke: OpenCV clips
+        # thick lines differently per tile, which would leave seams
+        x1, y1, x2, y2 = strokes.bounds(index, first_point)
+        value = int(strokes.values.data[index])
+        scratch = np.full((y2 - y1, x2 - x1), 255 - value, dtype=np.uint8)
+        strokes.rasterize_stroke(scratch, index, first_point=first_point, offset=(x1, y1))
+        coverage = scratch == value
+        
+        tile = self.tile_size
+        erasing = strokes.kinds.data[index] == ERASE
+        touched = []
+        cx1, cy1, cx2, cy2 = (x1, y1, x2, y2) if clip is None else clip
+        for key in self.tile_range(max(x1, cx1), max(y1, cy1), min(x2, cx2), min(y2, cy2)):
+            row, col = key
+            tx, ty = col * tile, row * tile
+            ix1, iy1 = max(x1, tx, cx1), max(y1, ty, cy1)
+            ix2, iy2 = min(x2, tx + tile, cx2), min(y2, ty + tile, cy2)
+            if ix2 <= ix1 or iy2 <= iy1:
+                continue
+            region = coverage[iy1 - y1:iy2 - y1, ix1 - x1:ix2 - x1]
+            if not region.any():
+                continue
+            
+            data = self.tiles.get(key)
+            if data is None:
+                # Erasing a blank tile changes nothing
+                if erasing:
+                    continue
+                data = np.full((tile, tile), MASK_BACKGROUND, dtype=np.uint8)
+                self.tiles[key] = data
+            data[iy1 - ty:iy2 - ty, ix1 - tx:ix2 - tx][region] = value
+            
+            if erasing and data.min() == MASK_BACKGROUND:
+                del self.tiles[key]
+            self.overlays.pop(key, None)
+            touched.append(key)
+        return touched
+    
+    def redraw(self, strokes, indices, x1, y1, x2, y2):
+        """Blank a world rectangle and draw the given strokes into it again, in order"""
+        x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
+        tile = self.tile_size
+        for key in self.tile_range(x1, y1, x2, y2):
+            data = self.tiles.get(key)
+            if data is None:
+                continue
+            row, col = key
+            tx, ty = col * tile, row * tile
+            data[max(y1, ty) - ty:min(y2, ty + tile) - ty, max(x1, tx) - tx:min(x2, tx + tile) - tx] = MASK_BACKGROUND
+            self.overlays.pop(key, None)
+        for index in indices:
+            if not strokes.hidden.data[index]:
+                self.draw_stroke(strokes, index, clip=(x1, y1, x2, y2))
+        
+        # Tiles left blank are freed, as erasing does
+        for key in self.tile_range(x1, y1, x2, y2):
+            data = self.tiles.get(key)
+            if data is not None and data.min() == MASK_BACKGROUND:
+                del self.tiles[key]
+    
+    def clear(self):
+        """Free every tile"""
+        self.tiles = {}
+        self.overlays = {}
+    
+    def get_overlay(self, key, width, height):
+        """3-channel AND overlay of a tile scaled to its on-screen size"""
+        cached = self.overlays.get(key)
+        if cached is not None and cached[0] == (width, height):
+            return cached[1]
+        
+        data = self.tiles[key]
+        if data.shape != (height, width):
+            data = cv2.resize(data, (width, height), interpolation=cv2.INTER_NEAREST)
+        overlay = np.empty((height, width, 3), dtype=np.uint8)
+        overlay[:, :, 0] = 255
+        overlay[:, :, 1] = data
+        overlay[:, :, 2] = data
+        self.overlays[key] = ((width, height), overlay)
+        return overlay
+    
+    def composite(self, frame):
+        """
+        Blend the visible tiles into the frame in place
+        Returns: the same frame object
+        """
+        viewport = self.viewport
+        if viewport.zoom != self.overlay_zoom:
+            self.overlays = {}
+            self.overlay_zoom = viewport.zoom
+        
+        tile = self.tile_size
+        frame_height, frame_width = frame.shape[:2]
+        for key in self.tile_range(*viewport.world_rect()):
+            if key not in self.tiles:
+                continue
+            row, col = key
+            
+            # Screen rectangle of the tile; neighbours share rounded edges
+            sx1, sy1 = (int(round(v)) for v in viewport.to_screen(col * tile, row * tile))
+            sx2, sy2 = (int(round(v)) for v in viewport.to_screen((col + 1) * tile, (row + 1) * tile))
+            if sx2 <= sx1 or sy2 <= sy1:
+                continue
+            overlay = self.get_overlay(key, sx2 - sx1, sy2 - sy1)
+            
+            # Clip to the frame
+            cx1, cy1 = max(0, sx1), max(0, sy1)
+            cx2, cy2 = min(frame_width, sx2), min(frame_height, sy2)
+            if cx2 <= cx1 or cy2 <= cy1:
+                continue
+            region = frame[cy1:cy2, cx1:cx2]
+            cv2.bitwise_and(region, overlay[cy1 - sy1:cy2 - sy1, cx1 - sx1:cx2 - sx1], dst=region)
+        return frame
+    
+    def render(self, x1=None, y1=None, x2=None, y2=None):
+        """
+        Flatten a world rectangle into one mask, the drawn extent by default
+        Returns: uint8 mask
+        """
+        tile = self.tile_size
+        if x1 is None:
+            if not self.tiles:
+                return np.full((1, 1), MASK_BACKGROUND, dtype=np.uint8)
+            rows = [row for row, _ in self.tiles]
+            cols = [col for _, col in self.tiles]
+            x1, y1 = min(cols) * tile, min(rows) * tile
+            x2, y2 = (max(cols) + 1) * tile, (max(rows) + 1) * tile
+        
+        x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
+        mask = np.full((y2 - y1, x2 - x1), MASK_BACKGROUND, dtype=np.uint8)
+        for key in self.tile_range(x1, y1, x2, y2):
+            data = self.tiles.get(key)
+            if data is None:
+                continue
+            row, col = key
+            tx, ty = col * tile, row * tile
+            ix1, iy1 = max(x1, tx), max(y1, ty)
+            ix2, iy2 = min(x2, tx + tile), min(y2, ty + tile)
+            mask[iy1 - y1:iy2 - y1, ix1 - x1:ix2 - x1] = data[iy1 - ty:iy2 - ty, ix1 - tx:ix2 - tx]
+        return mask
@@ -0,0 +1,252 @@
+"""
+Virtual Drawing Application using Machine Learning - Headless Version
+Runs the drawing pipeline offline on a recorded video or an image directory
+"""
+import argparse
+import cv2
+import numpy as np
+import sys
+import os
+import time
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from core.frame_pipeline import FramePipeline
+from core.drawing_tools import DrawingTools
+from core.hand_detector import HandDetector
+from core.detector_backends import ReplayBackend, RecordingBackend
+from core.gestures import GestureRecognizer
+from core.session_recording import SessionRecorder
+from utils.profiler import StageProfiler
+from config.resolution import ResolutionConfig, parse_resolution
+from config.settings import (
+    ROI_TRACKING, DETECTION_SKIP_FACTOR, ADAPTIVE_SKIP, PROFILING, CANVAS_RESOLUTION,
+    DETECTION_RESOLUTION, GESTURE_CONTROL, MAX_NUM_HANDS, COLOR_CANVAS
+)
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    RESOURCE_AVAILABLE = False
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+def iter_frames(input_path):
+    """
+    Read frames from a video file or a directory of images
+    Yields: BGR frames in file order
+    """
+    if os.path.isdir(input_path):
+        names = sorted(n for n in os.listdir(input_path) if n.lower().endswith(IMAGE_EXTENSIONS))
+        for name in names:
+            frame = cv2.imread(os.path.join(input_path, name))
+            if frame is not None:
+                yield frame
+        return
+    
+    cap = cv2.VideoCapture(input_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Could not open video: {input_path}")
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield frame
+    finally:
+        cap.release()
+
+def get_peak_rss_mb():
+    """Peak resident set size of this process in MB, None if unavailable"""
+    if not RESOURCE_AVAILABLE:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+class FrameWriter:
+    def __init__(self, output_path, fps):
+        self.output_path = output_path
+        self.fps = fps
+        self.video_writer = None
+        self.frame_index = 0
+        
+        # Paths without an extension are treated as image directories
+        self.to_directory = output_path is not None and not os.path.splitext(output_path)[1]
+        if self.to_directory:
+            os.makedirs(output_path, exist_ok=True)
+    
+    def write(self, frame):
+        """Write one composited frame"""
+        if self.output_path is None:
+            return
+        if self.to_directory:
+            cv2.imwrite(os.path.join(self.output_path, f"frame_{self.frame_index:06d}.png"), frame)
+        else:
+            if self.video_writer is None:
+                fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+                height, width = frame.shape[:2]
+                self.video_writer = cv2.VideoWriter(self.output_path, fourcc, self.fps, (width, height))
+            self.video_writer.write(frame)
+        self.frame_index += 1
+    
+    def close(self):
+        """Flush the video file if one was opened"""
+        if self.video_writer is not None:
+            self.video_writer.release()
+            self.video_writer = None
+
+class HeadlessRunner:
+    def __init__(self, pipeline=None, flip=True):
+        self.pipeline = pipeline or FramePipeline()
+        self.flip = flip
+    
+    def run(self, input_path, output_path=None, canvas_path=None, max_frames=None, fps=30.0):
+        """
+        Process every frame of the input and write the results
+        Returns: dict with throughput and latency statistics
+        """
+        writer = FrameWriter(output_path, fps)
+        latencies = []
+        
+        start_time = time.perf_counter()
+        try:
+            for frame in iter_frames(input_path):
+                if max_frames is not None and len(latencies) >= max_frames:
+                    break
+                
+                frame_start = time.perf_counter()
+                
+                # Match the live pipeline: canvas resolution, mirrored
+                width, height = self.pipeline.drawing_tools.width, self.pipeline.drawing_tools.height
+                if frame.shape[1] != width or frame.shape[0] != height:
+                    frame = cv2.resize(frame, (width, height))
+                if self.flip:
+                    frame = self.pipeline.mirror(frame)
+                
+                frame = self.pipeline.process_frame(frame)
+                latencies.append(time.perf_counter() - frame_start)
+                
+                writer.write(frame)
+        finally:
+            writer.close()
+        total_time = time.perf_counter() - start_time
+        
+        if canvas_path:
+            cv2.imwrite(canvas_path, self.pipeline.drawing_tools.get_canvas_image())
+        
+        return self.build_report(latencies, total_time)
+    
+    def build_report(self, latencies, total_time):
+        """Summarize per-frame latencies (seconds) into a report"""
+        report = {
+            "frames": len(latencies),
+            "total_seconds": total_time,
+            "fps": len(latencies) / total_time if total_time > 0 else 0.0,
+            "peak_rss_mb": get_peak_rss_mb(),
+            "stages": self.pipeline.profiler.snapshot()["stages"] if self.pipeline.profiler.enabled else None,
+        }
+        if latencies:
+            latencies_ms = np.array(latencies) * 1000.0
+            p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+            report.update({"p50_ms": p50, "p95_ms": p95, "p99_ms": p99})
+        else:
+            report.update({"p50_ms": None, "p95_ms": None, "p99_ms": None})
+        return report
+
+def print_report(report):
+    """Print a throughput report"""
+    print(f"Frames processed: {report['frames']}")
+    print(f"Total time: {report['total_seconds']:.2f} s")
+    print(f"Throughput: {report['fps']:.1f} frames/sec")
+    if report["p50_ms"] is not None:
+        print(f"Latency p50/p95/p99: {report['p50_ms']:.2f} / "
+              f"{report['p95_ms']:.2f} / {report['p99_ms']:.2f} ms")
+    if report["peak_rss_mb"] is not None:
+        print(f"Peak RSS: {report['peak_rss_mb']:.1f} MB")
+    if report["stages"]:
+        print("Stage timings (last window, ms):")
+        for name, summary in report["stages"].items():
+            print(f"  {name:<10} mean {summary['mean_ms']:7.3f}  p50 {summary['p50_ms']:7.3f}  "
+                  f"p95 {summary['p95_ms']:7.3f}  max {summary['max_ms']:7.3f}")
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Run the drawing pipeline on recorded input")
+    parser.add_argument("input", help="video file or directory of images")
+    parser.add_argument("--output", help="output video file, or directory for PNG frames")
+    parser.add_argument("--canvas", help="path for the final canvas image")
+    parser.add_argument("--max-frames", type=int, help="stop after this many frames")
+    parser.add_argument("--fps", type=float, default=30.0, help="frame rate of the output video")
+    parser.add_argument("--no-flip", action="store_true", help="do not mirror input frames")
+    parser.add_argument("--replay-landmarks", help="replay landmarks from a .npy file instead of detecting")
+    parser.add_argument("--record-landmarks", help="save detected landmarks to a .npy file")
+    parser.add_argument("--record-session", help="save the drawing input as a .npz timeline for replay.py")
+    parser.add_argument("--roi-tracking", action="store_true", default=ROI_TRACKING,
+                        help="detect on a downscaled crop around the previous hand")
+    parser.add_argument("--skip-factor", type=int, default=DETECTION_SKIP_FACTOR,
+                        help="run inference every N frames and predict landmarks in between")
+    parser.add_argument("--adaptive-skip", action="store_true", default=ADAPTIVE_SKIP,
+                        help="also run inference early when the hand moves fast")
+    parser.add_argument("--profile", action="store_true", default=PROFILING,
+                        help="report per-stage timings")
+    parser.add_argument("--canvas-size", type=parse_resolution, default=CANVAS_RESOLUTION,
+                        help="resolution frames are drawn and composited at, WIDTHxHEIGHT")
+    parser.add_argument("--detection-size", type=parse_resolution, default=DETECTION_RESOLUTION,
+                        help="largest frame fed to the hand detector (default: canvas)")
+    parser.add_argument("--gestures", action="store_true", default=GESTURE_CONTROL,
+                        help="drive drawing with hand gestures")
+    parser.add_argument("--hands", type=int, default=MAX_NUM_HANDS,
+                        help="hands that can draw at once, each with its own tool")
+    parser.add_argument("--color", action="store_true", default=COLOR_CANVAS,
+                        help="draw in colors on layers; the canvas image is then BGRA")
+    args = parser.parse_args()
+    
+    # Recordings hold one full-frame result per frame, so replaying them through
+    # ROI crops or skipped frames would misplace landmarks and lose sync
+    if args.replay_landmarks and (args.roi_tracking or args.skip_factor > 1 or args.adaptive_skip):
+        parser.error("--replay-landmarks cannot be combined with "
+                     "--roi-tracking, --skip-factor or --adaptive-skip")
+    return args
+
+if __name__ == "__main__":
+    args = parse_args()
+    try:
+        if args.replay_landmarks:
+            backend = ReplayBackend(args.replay_landmarks, loop=False, max_num_hands=args.hands)
+        else:
+            backend = None  # HandDetector builds the configured detector
+        
+        resolution = ResolutionConfig(canvas=args.canvas_size, detection=args.detection_size)
+        hand_detector = HandDetector(backend, roi_tracking=args.roi_tracking,
+                                     skip_factor=args.skip_factor, adaptive_skip=args.adaptive_skip,
+                                     detection_size=resolution.detection, max_hands=args.hands)
+        
+        # Record the outermost backend: the full-frame results the pipeline
+        # sees, once per frame, after ROI crops and skipped frames
+        if args.record_landmarks:
+            hand_detector.backend = recording = RecordingBackend(hand_detector.backend, max_hands=args.hands)
+        # Stage timings go into the report instead of the output frames
+        profiler = StageProfiler(enabled=args.profile, overlay=False)
+        drawing_tools = DrawingTools(*resolution.canvas_size, color=args.color)
+        pipeline = FramePipeline(hand_detector=hand_detector, drawing_tools=drawing_tools,
+                                 profiler=profiler, resolution=resolution,
+                                 gestures=GestureRecognizer(max_hands=args.hands) if args.gestures else None)
+        recorder = SessionRecorder() if args.record_session else None
+        if recorder:
+            recorder.attach(pipeline.drawing_tools)
+        runner = HeadlessRunner(pipeline, flip=not args.no_flip)
+        report = runner.run(args.input, args.output, args.canvas, args.max_frames, args.fps)
+        print_report(report)
+        
+        if args.record_landmarks:
+            recording.save(args.record_landmarks)
+        if recorder:
+            recorder.save(args.record_session)
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
@@ -2,6 +2,7 @@
 Virtual Drawing Application using Machine Learning
 Main application entry point
 """
+import argparse
 import cv2
 import sys
 import os
@@ -9,27 +10,103 @@ import os
 # Add project root to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from core.frame_pipeline import FramePipeline
+from core.detection_worker import DetectionWorker
+from utils.fps_counter import FPSCounter
+from utils.profiler import StageProfiler
+from utils.frame_buffers import FrameBuffers
 from core.hand_detector import HandDetector
 from core.drawing_tools import DrawingTools
-from utils.ui_helpers import UIHelpers
-from config.settings import WINDOW_WIDTH, WINDOW_HEIGHT
+from core.autosave import CanvasAutosave
+from core.gestures import GestureRecognizer
+from core.session_recording import SessionRecorder
+from config.resolution import ResolutionConfig, parse_resolution
+from config.settings import (
+    PIPELINED_DETECTION, ROI_TRACKING, DETECTION_SKIP_FACTOR, ADAPTIVE_SKIP, TILED_CANVAS, PAN_STEP,
+    ZOOM_STEP, PROFILING, COLORS, CAPTURE_RESOLUTION, CANVAS_RESOLUTION, DETECTION_RESOLUTION,
+    DISPLAY_RESOLUTION, AUTOSAVE, STROKE_SMOOTHING, GESTURE_CONTROL, MAX_NUM_HANDS, COLOR_CANVAS,
+    PALETTE, BRUSH_WIDTHS, MAX_LAYERS
+)
+
+# Pan direction of each key on the tiled canvas
+PAN_KEYS = {
+    ord('w'): (0, PAN_STEP),
+    ord('a'): (PAN_STEP, 0),
+    ord('s'): (0, -PAN_STEP),
+    ord('d'): (-PAN_STEP, 0),
+}
+
+# Tools without a place in the header, picked from the keyboard
+TOOL_KEYS = {
+    ord('o'): "erase strokes",
+    ord('m'): "move",
+}
 
 class VirtualDrawingApp:
-    def __init__(self):
-        self.hand_detector = HandDetector()
-        self.drawing_tools = DrawingTools()
-        self.ui_helpers = UIHelpers()
-        self.tools_image = self.ui_helpers.load_tools_image()
-        
-        # Initialize camera
+    def __init__(self, pipelined=PIPELINED_DETECTION, roi_tracking=ROI_TRACKING,
+                 skip_factor=DETECTION_SKIP_FACTOR, adaptive_skip=ADAPTIVE_SKIP, tiled=TILED_CANVAS,
+                 profile=PROFILING, resolution=None, autosave=AUTOSAVE,
+                 smoothing=STROKE_SMOOTHING, gestures=GESTURE_CONTROL, max_hands=MAX_NUM_HANDS,
+                 record_path=None, color=COLOR_CANVAS):
+        # Initialize camera at the requested capture resolution
+        resolution = resolution or ResolutionConfig()
         self.cap = cv2.VideoCapture(0)
         if not self.cap.isOpened():
             raise RuntimeError("Could not open camera")
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, resolution.capture[0])
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, resolution.capture[1])
+        
+        # Cameras may not honor the request; unset stages follow what they deliver
+        capture = (int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        if all(capture):
+            resolution = resolution.with_capture(capture)
+        self.resolution = resolution
+        print(f"Resolutions: {resolution.describe()}")
+        
+        hand_detector = HandDetector(roi_tracking=roi_tracking, skip_factor=skip_factor,
+                                     adaptive_skip=adaptive_skip, detection_size=resolution.detection,
+                                     max_hands=max_hands)
+        drawing_tools = DrawingTools(*resolution.canvas_size, tiled=tiled, smoothing=smoothing, color=color)
+        self.pipeline = FramePipeline(hand_detector, drawing_tools, verbose=True,
+                                      profiler=StageProfiler(enabled=profile), resolution=resolution,
+                                      gestures=GestureRecognizer(max_hands=max_hands) if gestures else None)
+        self.hand_detector = self.pipeline.hand_detector
+        self.drawing_tools = self.pipeline.drawing_tools
+        self.ui_helpers = self.pipeline.ui_helpers
+        
+        # Optionally keep the canvas on disk and pick up the last drawing
+        self.autosave = CanvasAutosave("local") if autosave else None
+        if self.autosave and self.autosave.attach(self.drawing_tools):
+            print(f"Restored {len(self.drawing_tools.strokes)} strokes from {self.autosave.strokes_path}")
+        
+        # Optionally record the session's drawing input for replay
+        self.record_path = record_path
+        self.recorder = SessionRecorder() if record_path else None
+        if self.recorder:
+            self.recorder.attach(self.drawing_tools)
+        
+        # Optional background detection thread
+        self.pipelined = pipelined
+        self.detection_worker = DetectionWorker(self.hand_detector) if pipelined else None
+        self.results_sequence = 0
+        self.render_fps = FPSCounter()
+        self.detection_fps = FPSCounter()
+        
+        # Canvas-sized and display-sized buffers reused by every frame
+        self.frame_buffers = FrameBuffers(*resolution.canvas_size, display_size=resolution.display_size)
     
     def run(self):
         """Main application loop"""
         print("Virtual Drawing Application Started")
-        print("Press ESC to exit")
+        print("Press ESC to exit, Z to undo, Y to redo, O for the stroke eraser, M to move strokes")
+        if self.drawing_tools.canvas is not None:
+            print("Press W/A/S/D to pan and +/- to zoom the canvas")
+        if self.drawing_tools.layers is not None:
+            print("Press C for the next color, B for the next brush width, [ and ] to change layer, "
+                  "H to hide or show the layer")
+        
+        if self.detection_worker:
+            self.detection_worker.start()
         
         while True:
             ret, frame = self.cap.read()
@@ -37,70 +114,156 @@ class VirtualDrawingApp:
                 print("Failed to read from camera")
                 break
             
-            # Flip frame horizontally for mirror effect
-            frame = cv2.flip(frame, 1)
+            # Fit the frame to the canvas and flip it horizontally for mirror effect
+            with self.pipeline.profiler.stage("flip"):
+                frame = self.frame_buffers.prepare(frame)
             
             # Detect hands
-            results = self.hand_detector.detect_hands(frame)
+            if self.detection_worker:
+                # Hand a copy to the detector since the frame is drawn on below
+                self.detection_worker.submit(frame.copy())
+                results, sequence = self.detection_worker.get_latest_results()
+                new_results = sequence != self.results_sequence
+                self.results_sequence = sequence
+            else:
+                results = self.pipeline.detect(frame)
+                new_results = True
+                self.detection_fps.tick()
             
-            if results.multi_hand_landmarks:
-                for hand_landmarks in results.multi_hand_landmarks:
-                    # Draw hand landmarks
-                    self.hand_detector.draw_landmarks(frame, hand_landmarks)
-                    
-                    # Get finger positions
-                    finger_positions = self.hand_detector.get_finger_positions(hand_landmarks)
-                    x, y = finger_positions['index_tip']
-                    
-                    # Handle tool selection
-                    selected_tool, selection_indicator = self.ui_helpers.handle_tool_selection(
-                        x, y, self.drawing_tools.get_tool_from_position
-                    )
-                    
-                    if selected_tool:
-                        self.drawing_tools.set_current_tool(selected_tool)
-                        print(f"Tool selected: {selected_tool}")
-                    
-                    # Check if user is drawing (index finger raised)
-                    is_drawing = self.hand_detector.is_index_raised(
-                        finger_positions['middle_tip'][1],
-                        finger_positions['middle_pip']
-                    )
-                    
-                    # Process drawing
-                    self.drawing_tools.process_drawing(frame, finger_positions, is_drawing)
-                    
-                    # Draw selection indicator if active
-                    if selection_indicator:
-                        x_sel, y_sel, radius = selection_indicator
-                        cv2.circle(frame, (x_sel, y_sel), radius, (0, 255, 255), 2)
+            # Apply landmarks, drawing and UI; results already applied are only redrawn
+            if new_results:
+                frame = self.pipeline.render(frame, results)
+            else:
+                frame = self.pipeline.redraw(frame)
             
-            # Apply drawing mask to frame
-            frame = self.drawing_tools.apply_mask_to_frame(frame)
-            
-            # Draw UI elements
-            self.ui_helpers.draw_ui_elements(
-                frame, self.tools_image, self.drawing_tools.current_tool
-            )
+            # Draw per-stage frame rates
+            self.render_fps.tick()
+            self.draw_fps(frame)
             
             # Display frame
-            cv2.imshow("Virtual Drawing App", frame)
+            cv2.imshow("Virtual Drawing App", self.frame_buffers.present(frame))
             
-            # Check for exit
-            if cv2.waitKey(1) & 0xFF == 27:  # ESC key
+            # Check for exit, undo and redo
+            key = cv2.waitKey(1) & 0xFF
+            if key == 27:  # ESC key
                 break
+            elif key == ord('z'):
+                self.drawing_tools.undo()
+            elif key == ord('y'):
+                self.drawing_tools.redo()
+            elif key in TOOL_KEYS:
+                self.select_tool(TOOL_KEYS[key])
+            elif key in PAN_KEYS:
+                self.drawing_tools.pan(*PAN_KEYS[key])
+            elif key in (ord('+'), ord('=')):
+                self.drawing_tools.zoom(ZOOM_STEP)
+            elif key == ord('-'):
+                self.drawing_tools.zoom(1 / ZOOM_STEP)
+            elif self.drawing_tools.layers is not None:
+                self.handle_layer_key(key)
         
         self.cleanup()
     
+    def select_tool(self, tool):
+        """Give every hand the same tool"""
+        for hand_id in list(self.drawing_tools.hands):
+            self.drawing_tools.select_hand(hand_id)
+            self.drawing_tools.set_current_tool(tool)
+        print(f"Tool selected: {tool}")
+    
+    def handle_layer_key(self, key):
+        """Cycle colors and brush widths of every hand, or change the active layer"""
+        drawing_tools = self.drawing_tools
+        layers = drawing_tools.layers
+        if key == ord('c') or key == ord('b'):
+            colors = list(PALETTE.values())
+            for hand_id, hand in list(drawing_tools.hands.items()):
+                drawing_tools.select_hand(hand_id)
+                if key == ord('c'):
+                    index = colors.index(hand.color) + 1 if hand.color in colors else 0
+                    drawing_tools.set_color(colors[index % len(colors)])
+                else:
+                    index = BRUSH_WIDTHS.index(hand.thickness) + 1 if hand.thickness in BRUSH_WIDTHS else 0
+                    drawing_tools.set_thickness(BRUSH_WIDTHS[index % len(BRUSH_WIDTHS)])
+        elif key == ord('['):
+            print(f"Layer {drawing_tools.select_layer(max(0, layers.active - 1)) + 1}")
+        elif key == ord(']'):
+            print(f"Layer {drawing_tools.select_layer(min(MAX_LAYERS - 1, layers.active + 1)) + 1}")
+        elif key == ord('h'):
+            drawing_tools.set_layer_visible(layers.active, not layers.layers[layers.active].visible)
+    
+    def draw_fps(self, frame):
+        """Draw render and detection frame rates in the bottom-right corner"""
+        if self.detection_worker:
+            detection_fps = self.detection_worker.get_fps()
+        else:
+            detection_fps = self.detection_fps.get_fps()
+        
+        text = f"Render: {self.render_fps.get_fps():.1f} FPS  Detect: {detection_fps:.1f} FPS"
+        height, width = frame.shape[:2]
+        cv2.putText(frame, text, (width - 320, height - 20),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, COLORS["ui_text"], 1)
+    
     def cleanup(self):
         """Clean up resources"""
+        if self.detection_worker:
+            self.detection_worker.stop()
+        if self.recorder:
+            self.recorder.save(self.record_path)
+            print(f"Session recorded to {self.record_path}")
+        if self.autosave:
+            self.autosave.close(self.drawing_tools)
         self.cap.release()
         cv2.destroyAllWindows()
         print("Application closed")
 
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Virtual Drawing Application")
+    parser.add_argument("--pipelined", action="store_true", default=PIPELINED_DETECTION,
+                        help="run hand detection on a background thread")
+    parser.add_argument("--roi-tracking", action="store_true", default=ROI_TRACKING,
+                        help="detect on a downscaled crop around the previous hand")
+    parser.add_argument("--skip-factor", type=int, default=DETECTION_SKIP_FACTOR,
+                        help="run inference every N frames and predict landmarks in between")
+    parser.add_argument("--adaptive-skip", action="store_true", default=ADAPTIVE_SKIP,
+                        help="also run inference early when the hand moves fast")
+    parser.add_argument("--tiled", action="store_true", default=TILED_CANVAS,
+                        help="draw on an infinite canvas that can be panned and zoomed")
+    parser.add_argument("--profile", action="store_true", default=PROFILING,
+                        help="time each pipeline stage and show the results on screen")
+    parser.add_argument("--autosave", action="store_true", default=AUTOSAVE,
+                        help="save the canvas in the background and restore it on the next start")
+    parser.add_argument("--smooth", action="store_true", default=STROKE_SMOOTHING,
+                        help="filter and spline-fit freehand strokes")
+    parser.add_argument("--gestures", action="store_true", default=GESTURE_CONTROL,
+                        help="pinch to draw, open palm to pause, two fingers to switch tool, fist to clear")
+    parser.add_argument("--hands", type=int, default=MAX_NUM_HANDS,
+                        help="hands that can draw at once, each with its own tool")
+    parser.add_argument("--color", action="store_true", default=COLOR_CANVAS,
+                        help="draw in colors on a stack of layers (fixed canvas only)")
+    parser.add_argument("--record", metavar="PATH",
+                        help="record the drawing input to a .npz timeline for replay.py")
+    parser.add_argument("--capture-size", type=parse_resolution, default=CAPTURE_RESOLUTION,
+                        help="resolution requested from the camera, WIDTHxHEIGHT")
+    parser.add_argument("--canvas-size", type=parse_resolution, default=CANVAS_RESOLUTION,
+                        help="resolution drawn and composited at (default: capture)")
+    parser.add_argument("--detection-size", type=parse_resolution, default=DETECTION_RESOLUTION,
+                        help="largest frame fed to the hand detector (default: canvas)")
+    parser.add_argument("--display-size", type=parse_resolution, default=DISPLAY_RESOLUTION,
+                        help="resolution of the window (default: canvas)")
+    return parser.parse_args()
+
 if __name__ == "__main__":
+    args = parse_args()
     try:
-        app = VirtualDrawingApp()
+        resolution = ResolutionConfig(args.capture_size, args.canvas_size,
+                                      args.detection_size, args.display_size)
+        app = VirtualDrawingApp(pipelined=args.pipelined, roi_tracking=args.roi_tracking,
+                                skip_factor=args.skip_factor, adaptive_skip=args.adaptive_skip,
+                                tiled=args.tiled, profile=args.profile, autosave=args.autosave,
+                                smoothing=args.smooth, gestures=args.gestures, max_hands=args.hands,
+                                record_path=args.record, color=args.color, resolution=resolution)
         app.run()
     except Exception as e:
         print(f"Error: {e}")
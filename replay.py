@@ -0,0 +1,67 @@
+"""
+Virtual Drawing Application using Machine Learning - Session Replay
+Replays a recorded drawing session and checks it reproduces the canvas
+"""
+import argparse
+import cv2
+import numpy as np
+import sys
+import os
+import time
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from core.session_recording import SessionRecording, SessionReplay
+from headless import FrameWriter
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Replay a recorded drawing session")
+    parser.add_argument("recording", help=".npz timeline written by main.py --record or headless.py --record-session")
+    parser.add_argument("--realtime", action="store_true", help="replay at the recorded pace instead of full speed")
+    parser.add_argument("--speed", type=float, default=1.0, help="pace multiplier for --realtime")
+    parser.add_argument("--show", action="store_true", help="show the canvas in a window while replaying")
+    parser.add_argument("--output", help="video file, or directory for PNG frames, of the replayed canvas")
+    parser.add_argument("--fps", type=float, default=30.0, help="frame rate of the output video")
+    parser.add_argument("--canvas", help="path for the final canvas image")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    try:
+        recording = SessionRecording(args.recording)
+        replay = SessionReplay(recording, realtime=args.realtime, speed=args.speed)
+        print(f"Recording: {recording.width}x{recording.height}, {len(recording.frame_times)} frames, "
+              f"{len(recording.events)} events, {recording.duration:.1f} s")
+        
+        # Frames are only composited when something shows or stores them
+        writer = FrameWriter(args.output, args.fps)
+        background = np.full((recording.height, recording.width, 3), 255, dtype=np.uint8)
+        def on_frame(drawing_tools, frame_index):
+            frame = drawing_tools.apply_mask_to_frame(background.copy())
+            writer.write(frame)
+            if args.show:
+                cv2.imshow("Session Replay", frame)
+                cv2.waitKey(1)
+        
+        start = time.perf_counter()
+        try:
+            drawing_tools = replay.run(on_frame=on_frame if args.show or args.output else None)
+        finally:
+            writer.close()
+            if args.show:
+                cv2.destroyAllWindows()
+        elapsed = time.perf_counter() - start
+        
+        print(f"Replayed in {elapsed:.3f} s ({len(recording.frame_times) / max(elapsed, 1e-9):.0f} frames/sec)")
+        if args.canvas:
+            cv2.imwrite(args.canvas, drawing_tools.get_canvas_image())
+        if replay.verify(drawing_tools):
+            print("Canvas matches the recording")
+        else:
+            print("Canvas differs from the recording")
+            sys.exit(2)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
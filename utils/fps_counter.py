@@ -0,0 +1,32 @@
+"""
+Frame rate counters for the frame pipeline stages
+"""
+import time
+import threading
+from collections import deque
+from config.settings import FPS_WINDOW_SIZE
+
+class FPSCounter:
+    def __init__(self, window_size=FPS_WINDOW_SIZE):
+        self.timestamps = deque(maxlen=window_size)
+        self.lock = threading.Lock()
+    
+    def tick(self):
+        """Record that one frame went through this stage"""
+        with self.lock:
+            self.timestamps.append(time.perf_counter())
+    
+    def get_fps(self):
+        """
+        Compute the rate over the rolling window
+        Returns: frames per second, 0.0 until two ticks are recorded
+        """
+        with self.lock:
+            if len(self.timestamps) < 2:
+                return 0.0
+            elapsed = self.timestamps[-1] - self.timestamps[0]
+            count = len(self.timestamps) - 1
+        
+        if elapsed <= 0:
+            return 0.0
+        return count / elapsed
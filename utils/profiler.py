@@ -0,0 +1,180 @@
+"""
+Opt-in per-stage timing of the frame pipeline
+"""
+import time
+import threading
+from bisect import bisect_right
+from collections import deque
+import cv2
+import numpy as np
+from config.settings import PROFILE_WINDOW_SIZE, PROFILE_LOG_INTERVAL, COLORS
+
+# Histogram bin edges in milliseconds, four bins per decade from 10 us to 1 s
+BIN_EDGES_MS = tuple(float(edge) for edge in np.geomspace(0.01, 1000.0, 21))
+
+# Seconds between refreshes of the on-screen table
+OVERLAY_REFRESH = 0.5
+
+# Stages in the order they run, for the overlay and log line
+STAGE_ORDER = ("flip", "downscale", "color", "detect", "landmarks", "tracking", "gestures", "drawing", "collab", "composite", "ui", "frame")
+
+class NullStage:
+    """Context manager that does nothing, shared by every disabled stage"""
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        return False
+
+NULL_STAGE = NullStage()
+
+class TimedStage:
+    """Context manager that records its duration into a profiler stage"""
+    __slots__ = ("profiler", "name", "start")
+    
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.profiler.record(self.name, (time.perf_counter() - self.start) * 1000.0)
+        return False
+
+class RollingHistogram:
+    """Fixed-bin histogram and raw samples over the last window_size values"""
+    
+    def __init__(self, window_size=PROFILE_WINDOW_SIZE):
+        self.samples = deque(maxlen=window_size)
+        self.counts = [0] * (len(BIN_EDGES_MS) + 1)
+        self.total = 0
+    
+    def add(self, value):
+        # Evict the oldest sample from its bin before the deque drops it
+        if len(self.samples) == self.samples.maxlen:
+            self.counts[bisect_right(BIN_EDGES_MS, self.samples[0])] -= 1
+        self.samples.append(value)
+        self.counts[bisect_right(BIN_EDGES_MS, value)] += 1
+        self.total += 1
+    
+    def summary(self):
+        """
+        Statistics of the current window
+        Returns: dict with count, mean/p50/p95/max in ms and bin counts
+        """
+        if not self.samples:
+            return {"count": 0, "total": self.total, "mean_ms": 0.0, "p50_ms": 0.0,
+                    "p95_ms": 0.0, "max_ms": 0.0, "histogram": list(self.counts)}
+        
+        values = np.fromiter(self.samples, dtype=np.float64, count=len(self.samples))
+        p50, p95 = np.percentile(values, [50, 95])
+        return {
+            "count": len(values),
+            "total": self.total,
+            "mean_ms": float(values.mean()),
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "max_ms": float(values.max()),
+            "histogram": list(self.counts),
+        }
+
+class StageProfiler:
+    """
+    Times named pipeline stages into rolling histograms
+    Wrap a stage in "with profiler.stage(name):" and call end_frame()
+    once per frame. Disabled profilers hand out a shared no-op context
+    manager, so instrumented code costs one method call per stage.
+    """
+    
+    def __init__(self, enabled=False, window_size=PROFILE_WINDOW_SIZE,
+                 log_interval=PROFILE_LOG_INTERVAL, overlay=True):
+        self.enabled = enabled
+        self.overlay = overlay
+        self.window_size = window_size
+        self.log_interval = log_interval
+        
+        self.stages = {}
+        self.lock = threading.Lock()
+        self.frame_start = None
+        self.last_log = time.perf_counter()
+        
+        # Overlay text is rebuilt periodically, not every frame
+        self.overlay_lines = []
+        self.last_overlay = 0.0
+    
+    def stage(self, name):
+        """Context manager timing one stage"""
+        if not self.enabled:
+            return NULL_STAGE
+        return TimedStage(self, name)
+    
+    def record(self, name, duration_ms):
+        """Add a duration in milliseconds to a stage"""
+        with self.lock:
+            histogram = self.stages.get(name)
+            if histogram is None:
+                histogram = self.stages[name] = RollingHistogram(self.window_size)
+            histogram.add(duration_ms)
+    
+    def end_frame(self):
+        """Record the whole-frame time and print the log line when due"""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if self.frame_start is not None:
+            self.record("frame", (now - self.frame_start) * 1000.0)
+        self.frame_start = now
+        
+        if self.log_interval and now - self.last_log >= self.log_interval:
+            self.last_log = now
+            print(self.format_line())
+        
+        if self.overlay and now - self.last_overlay >= OVERLAY_REFRESH:
+            self.last_overlay = now
+            stages = self.snapshot()["stages"]
+            self.overlay_lines = [
+                f"{name:<10}{stages[name]['p50_ms']:6.2f} {stages[name]['p95_ms']:6.2f} ms"
+                for name in self.ordered_stages(stages)
+            ]
+    
+    def snapshot(self):
+        """
+        Current statistics of every stage
+        Returns: dict of stage name -> summary dict, plus "bin_edges_ms"
+        """
+        with self.lock:
+            stages = {name: histogram.summary() for name, histogram in self.stages.items()}
+        return {"stages": stages, "bin_edges_ms": BIN_EDGES_MS}
+    
+    def ordered_stages(self, stages):
+        """Stage names in pipeline order, unknown stages last"""
+        known = [name for name in STAGE_ORDER if name in stages]
+        return known + sorted(name for name in stages if name not in STAGE_ORDER)
+    
+    def format_line(self):
+        """One-line p50/p95 summary of every stage"""
+        stages = self.snapshot()["stages"]
+        parts = [f"{name} {stages[name]['p50_ms']:.2f}/{stages[name]['p95_ms']:.2f}"
+                 for name in self.ordered_stages(stages)]
+        return "[profile] p50/p95 ms: " + " | ".join(parts)
+    
+    def draw_overlay(self, frame, x=None, y=100):
+        """Draw a per-stage p50/p95 table on the frame"""
+        if not self.enabled or not self.overlay:
+            return
+        x = frame.shape[1] - 210 if x is None else x
+        for text in self.overlay_lines:
+            cv2.putText(frame, text, (x, y), cv2.FONT_HERSHEY_PLAIN, 0.9, COLORS["ui_text"], 1)
+            y += 16
+    
+    def reset(self):
+        """Drop every recorded sample"""
+        with self.lock:
+            self.stages = {}
+        self.frame_start = None
+        self.overlay_lines = []
@@ -16,6 +16,10 @@ class UIHelpers:
             "erase": (TOOL_MARGIN_LEFT + 200, 10, TOOL_MARGIN_LEFT + 250, 10 + TOOL_HEIGHT),
         }
         
+        # Pre-rendered header and footer for the last (tool, frame size)
+        self.ui_cache_key = None
+        self.ui_overlays = []
+    
     def load_tools_image(self):
         """Load tools image if available, otherwise return None"""
         try:
@@ -28,23 +32,75 @@ class UIHelpers:
     
     def draw_ui_elements(self, frame, tools_image, current_tool):
         """Draw UI elements on the frame"""
-        # Draw header background
-        cv2.rectangle(frame, (0, 0), (WINDOW_WIDTH, UI_HEADER_HEIGHT), COLORS["ui_background"], -1)
+        # Header and footer only change with the tool or the frame size
+        height, width = frame.shape[:2]
+        key = (current_tool, width, height, id(tools_image))
+        if key != self.ui_cache_key:
+            self.ui_cache_key = key
+            self.ui_overlays = [
+                self.render_header(width, tools_image, current_tool),
+                self.render_footer(height, current_tool),
+            ]
+        
+        for overlay in self.ui_overlays:
+            self.blit_overlay(frame, overlay)
+        return frame
+    
+    def render_header(self, width, tools_image, current_tool):
+        """
+        Pre-render the opaque header with the tool boxes
+        Returns: (x, y, BGR image, alpha mask or None)
+        """
+        # cv2.rectangle fills the bottom edge row too
+        header = np.empty((UI_HEADER_HEIGHT + 1, width, 3), dtype=np.uint8)
+        header[:] = COLORS["ui_background"]
+        
+        # Tool icons from tools.png, blended into the header like the original app
+        if tools_image is not None:
+            x1, y1 = self.tool_positions["line"][:2]
+            strip = header[y1:y1 + tools_image.shape[0], x1:x1 + tools_image.shape[1]]
+            icons = tools_image[:strip.shape[0], :strip.shape[1]]
+            strip[:] = cv2.addWeighted(icons, 0.7, strip, 0.3, 0)
         
         # Draw tool boxes
         for tool_name, (x1, y1, x2, y2) in self.tool_positions.items():
             color = COLORS["ui_active"] if tool_name == current_tool else COLORS["ui_text"]
-            cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+            cv2.rectangle(header, (x1, y1), (x2, y2), color, 2)
             
-            # Add tool text
-            cv2.putText(frame, tool_name, (x1 + 5, y1 + 30), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.4, color, 1)
+            # Label the tool when there is no icon for it
+            if tools_image is None:
+                cv2.putText(header, tool_name, (x1 + 5, y1 + 30), 
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.4, color, 1)
+        return (0, 0, header, None)
+    
+    def render_footer(self, height, current_tool):
+        """
+        Pre-render the "Tool: X" indicator as a transparent overlay
+        Returns: (x, y, BGR image, float32 alpha mask)
+        """
+        text = f"Tool: {current_tool}"
+        (text_width, text_height), baseline = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)
+        x, top = 10, max(0, height - 20 - text_height - 2)
         
-        # Draw current tool indicator
-        cv2.putText(frame, f"Tool: {current_tool}", (10, WINDOW_HEIGHT - 20), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, COLORS["ui_text"], 2)
+        # Text rendered in white gives its (anti-aliased) coverage
+        alpha = np.zeros((text_height + baseline + 4, text_width + 4), dtype=np.uint8)
+        cv2.putText(alpha, text, (0, height - 20 - top), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, 255, 2)
+        image = np.empty(alpha.shape + (3,), dtype=np.uint8)
+        image[:] = COLORS["ui_text"]
+        return (x, top, image, alpha.astype(np.float32) / 255.0)
+    
+    def blit_overlay(self, frame, overlay):
+        """Copy a pre-rendered overlay into the frame, clipped to its bounds"""
+        x, y, image, alpha = overlay
+        region = frame[y:y + image.shape[0], x:x + image.shape[1]]
+        height, width = region.shape[:2]
+        if alpha is None:
+            region[:] = image[:height, :width]
+            return
         
-        return frame
+        alpha = alpha[:height, :width]
+        region[:] = cv2.blendLinear(image[:height, :width], region, alpha, 1.0 - alpha)
     
     def handle_tool_selection(self, x, y, get_tool_function):
         """Handle tool selection based on cursor position"""